@@ -0,0 +1,94 @@
+# columns.py
+# Shared semantic column resolver for the rapport sub-tabs.
+# One pass over the headers finds every column we care about, and the
+# result is cached per header tuple so files from the same taxameter
+# model are only scanned once. Also holds the number coercion the
+# sub-tabs share.
+from functools import lru_cache
+
+import pandas as pd
+
+SEMANTIC_COLUMNS = ("loyve", "kontant", "kreditt", "bomtur", "subtotal", "tips", "sjaafor", "driver")
+DRIVER_WORDS = ("sjaafor", "sjåfør", "sjafor", "sjåfor", "driver", "sjåførid", "sjaforid")
+
+def is_sjaafor_column(colname):
+    c = str(colname).lower()
+    return ("skiftnr" in c or "sjaafor" in c or "sjåfør" in c or "sjafor" in c)
+
+def is_date_column(colname):
+    return str(colname).lower().startswith("start_dato") or str(colname).lower().startswith("slutt_dato")
+
+def safe_float_series(series):
+    # Vectorized safe_float for a whole column
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.astype("float64").fillna(0.0)
+    text = series.astype(str).str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(text, errors="coerce").fillna(0.0).astype("float64")
+
+def scan_headers(headers):
+    found = {}
+    kontant_partial = None
+    tips_partial = None
+    for col in headers:
+        name = str(col).strip().lower()
+        if "loyve" not in found and name in ("løyve", "loyve"):
+            found["loyve"] = col
+        if "kontant" not in found:
+            # exact "kontant" wins over e.g. "Kontant_Eier"
+            if name == "kontant":
+                found["kontant"] = col
+            elif kontant_partial is None and "kontant" in name:
+                kontant_partial = col
+        if "kreditt" not in found and "kreditt" in name:
+            found["kreditt"] = col
+        if "bomtur" not in found and "bomtur" in name:
+            found["bomtur"] = col
+        if "subtotal" not in found and ("sub_total" in name or "subtotal" in name):
+            found["subtotal"] = col
+        if "tips" not in found:
+            # "kreditt_tips" wins over any other tips column
+            if "kreditt_tips" in name:
+                found["tips"] = col
+            elif tips_partial is None and "tips" in name:
+                tips_partial = col
+        if "sjaafor" not in found and is_sjaafor_column(name):
+            found["sjaafor"] = col
+        if "driver" not in found and any(word in name for word in DRIVER_WORDS):
+            found["driver"] = col
+    found.setdefault("kontant", kontant_partial)
+    found.setdefault("tips", tips_partial)
+    return {key: found.get(key) for key in SEMANTIC_COLUMNS}
+
+@lru_cache(maxsize=128)
+def _resolve_cached(headers):
+    return tuple(scan_headers(headers).items())
+
+def resolve_columns(df):
+    if df is None:
+        return dict.fromkeys(SEMANTIC_COLUMNS)
+    headers = tuple(df.columns)
+    try:
+        return dict(_resolve_cached(headers))
+    except TypeError:
+        return scan_headers(headers)
+
+def find_loyve_column(df):
+    return resolve_columns(df)["loyve"]
+
+def find_kontant_column(df):
+    return resolve_columns(df)["kontant"]
+
+def find_bomtur_column(df):
+    return resolve_columns(df)["bomtur"]
+
+def find_kreditt_column(df):
+    return resolve_columns(df)["kreditt"]
+
+def find_subtotal_column(df):
+    return resolve_columns(df)["subtotal"]
+
+def find_tips_column(df):
+    return resolve_columns(df)["tips"]
+
+def find_driver_column(df):
+    return resolve_columns(df)["driver"]
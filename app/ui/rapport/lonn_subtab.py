@@ -8,6 +8,10 @@ import pandas as pd
 import os
 import json
 from datetime import datetime
+from .columns import (
+    find_loyve_column, find_kontant_column, find_bomtur_column, find_subtotal_column,
+    find_tips_column, find_driver_column, safe_float_series
+)
 
 try:
     from fpdf import FPDF
@@ -27,52 +31,6 @@ def save_all_edits(edits):
     with open(EDIT_PATH, "w", encoding="utf-8") as f:
         json.dump(edits, f, indent=2, ensure_ascii=False)
 
-def find_loyve_column(df):
-    if df is None:
-        return None
-    for col in df.columns:
-        if str(col).strip().lower() in ["løyve", "loyve"]:
-            return col
-    return None
-
-def find_kontant_column(df):
-    if df is None:
-        return None
-    for col in df.columns:
-        if str(col).strip().lower() == "kontant":
-            return col
-    for col in df.columns:
-        if "kontant" in str(col).strip().lower():
-            return col
-    return None
-
-def find_bomtur_column(df):
-    if df is None:
-        return None
-    for col in df.columns:
-        if "bomtur" in str(col).lower():
-            return col
-    return None
-
-def find_subtotal_column(df):
-    if df is None:
-        return None
-    for col in df.columns:
-        if "sub_total" in str(col).lower() or "subtotal" in str(col).lower():
-            return col
-    return None
-
-def find_tips_column(df):
-    if df is None:
-        return None
-    for col in df.columns:
-        if "kreditt_tips" in str(col).lower():
-            return col
-    for col in df.columns:
-        if "tips" in str(col).lower():
-            return col
-    return None
-
 def safe_float(val):
     try:
         if pd.isna(val) or val is None or val == '' or str(val).lower() == 'nan':
@@ -121,6 +79,7 @@ class LonnSubTab(QWidget):
         super().__init__()
         self.settings_tab = settings_tab
         self.dataframes = []
+        self.driver_frames = {}
         self.file_paths = []
         self.filtered_data = None
 
@@ -276,6 +235,7 @@ class LonnSubTab(QWidget):
                 all_columns.update(df.columns.tolist())
             except Exception as e:
                 QMessageBox.warning(self, "Feil", f"Kunne ikke lese fil: {os.path.basename(path)}\n{e}")
+        self.group_by_driver()
         # --- Update available columns for templates in settings! ---
         if hasattr(self.settings_tab, "set_available_columns"):
             self.settings_tab.set_available_columns(list(all_columns))
@@ -298,11 +258,7 @@ class LonnSubTab(QWidget):
         self.filter_data_by_driver()
 
     def find_driver_column(self, df):
-        for col in df.columns:
-            c = col.lower()
-            if any(word in c for word in ["sjaafor", "sjåfør", "sjafor", "sjåfor", "driver", "sjåførid", "sjaforid"]):
-                return col
-        return None
+        return find_driver_column(df)
 
     def get_selected_driver_id(self):
         idx = self.driver_combo.currentIndex()
@@ -310,6 +266,17 @@ class LonnSubTab(QWidget):
             return None
         return self.driver_combo.currentData()
 
+    def group_by_driver(self):
+        # Split every loaded file by driver once; picking a driver is then a lookup
+        self.driver_frames = {}
+        for df in self.dataframes:
+            driver_col = self.find_driver_column(df)
+            if not driver_col:
+                continue
+            keys = df[driver_col].astype(str).str.zfill(4)
+            for key, group in df.groupby(keys, sort=False):
+                self.driver_frames.setdefault(key, []).append(group)
+
     def filter_data_by_driver(self):
         if not self.dataframes:
             self.filtered_data = None
@@ -320,16 +287,12 @@ class LonnSubTab(QWidget):
             return
         driver_id = self.get_selected_driver_id()
         dfs = []
-        for df in self.dataframes:
-            driver_col = self.find_driver_column(df)
-            if driver_col and driver_id is not None:
-                mask = df[driver_col].astype(str).str.zfill(4) == str(driver_id).zfill(4)
-                filtered = df[mask]
-                if not filtered.empty:
-                    filtered = apply_kontant_edits(filtered, load_all_edits())
-                    dfs.append(filtered)
-            else:
-                continue
+        if driver_id is not None:
+            all_edits = load_all_edits()
+            dfs = [
+                apply_kontant_edits(group, all_edits)
+                for group in self.driver_frames.get(str(driver_id).zfill(4), [])
+            ]
         if dfs:
             self.filtered_data = pd.concat(dfs, ignore_index=True)
         else:
@@ -646,10 +609,10 @@ class LonnSubTab(QWidget):
         bomtur_col = find_bomtur_column(df)
         tips_col = find_tips_column(df)
 
-        kontant_sum = df[kontant_col].apply(safe_float).sum() if kontant_col else 0
-        subtotal_sum = df[subtotal_col].apply(safe_float).sum() if subtotal_col else 0
-        bomtur_sum = df[bomtur_col].apply(safe_float).sum() if bomtur_col else 0
-        tips_sum = df[tips_col].apply(safe_float).sum() if tips_col else 0
+        kontant_sum = safe_float_series(df[kontant_col]).sum() if kontant_col else 0
+        subtotal_sum = safe_float_series(df[subtotal_col]).sum() if subtotal_col else 0
+        bomtur_sum = safe_float_series(df[bomtur_col]).sum() if bomtur_col else 0
+        tips_sum = safe_float_series(df[tips_col]).sum() if tips_col else 0
 
         driver_id = self.get_selected_driver_id()
         driver_percent = 45.0
@@ -8,6 +8,10 @@ import pandas as pd
 import os
 import json
 from datetime import datetime
+from .columns import (
+    find_loyve_column, find_kontant_column, find_bomtur_column, find_kreditt_column,
+    is_sjaafor_column, is_date_column, safe_float_series
+)
 
 try:
     from fpdf import FPDF
@@ -35,48 +39,6 @@ def safe_float(val):
     except Exception:
         return 0.0
 
-def find_loyve_column(df):
-    if df is None:
-        return None
-    for col in df.columns:
-        if str(col).strip().lower() in ["løyve", "loyve"]:
-            return col
-    return None
-
-def find_kontant_column(df):
-    if df is None:
-        return None
-    for col in df.columns:
-        if str(col).strip().lower() == "kontant":
-            return col
-    for col in df.columns:
-        if "kontant" in str(col).strip().lower():
-            return col
-    return None
-
-def find_bomtur_column(df):
-    if df is None:
-        return None
-    for col in df.columns:
-        if "bomtur" in str(col).lower():
-            return col
-    return None
-
-def find_kreditt_column(df):
-    if df is None:
-        return None
-    for col in df.columns:
-        if "kreditt" in str(col).lower():
-            return col
-    return None
-
-def is_sjaafor_column(colname):
-    c = colname.lower()
-    return ("skiftnr" in c or "sjaafor" in c or "sjåfør" in c or "sjafor" in c)
-
-def is_date_column(colname):
-    return str(colname).lower().startswith("start_dato") or str(colname).lower().startswith("slutt_dato")
-
 class SkiftSubTab(QWidget):
     def __init__(self, settings_tab):
         super().__init__()
@@ -660,9 +622,9 @@ class SkiftSubTab(QWidget):
         kreditt_col = find_kreditt_column(df)
         bomtur_col = find_bomtur_column(df)
 
-        total_kontant = df[kontant_col].apply(safe_float).sum() if kontant_col else 0
-        total_kreditt = df[kreditt_col].apply(safe_float).sum() if kreditt_col else 0
-        total_bomtur = df[bomtur_col].apply(safe_float).sum() if bomtur_col else 0
+        total_kontant = safe_float_series(df[kontant_col]).sum() if kontant_col else 0
+        total_kreditt = safe_float_series(df[kreditt_col]).sum() if kreditt_col else 0
+        total_bomtur = safe_float_series(df[bomtur_col]).sum() if bomtur_col else 0
 
         def nf(val):
             if isinstance(val, float) and val.is_integer():
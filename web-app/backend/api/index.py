@@ -62,11 +62,13 @@ try:
     from sqlalchemy.orm import Session
     print("  ✅ SQLAlchemy Session imported", file=sys.stderr)
 
-    from datetime import timedelta
-    print("  ✅ datetime.timedelta imported", file=sys.stderr)
+    from typing import Optional
+    import time
+    from starlette.concurrency import run_in_threadpool
+    print("  ✅ typing.Optional imported", file=sys.stderr)
 
-    from database import get_db, engine
-    print("  ✅ database.get_db and engine imported", file=sys.stderr)
+    from database import get_db, get_engine
+    print("  ✅ database.get_db and get_engine imported", file=sys.stderr)
 
     import models
     print("  ✅ models imported", file=sys.stderr)
@@ -124,19 +126,33 @@ except Exception as e:
 
 # Database initialization - non-blocking
 print("-" * 80, file=sys.stderr)
-print("🔧 Step 5: Initializing database tables...", file=sys.stderr)
+print("🔧 Step 5: Checking database schema version...", file=sys.stderr)
 if database_available:
     try:
-        # Check if engine is actually available (might be None if creation failed)
-        if engine is None:
-            print("⚠️  Database engine is None, cannot create tables", file=sys.stderr)
+        # One query against alembic_version; migrations run at deploy time
+        import migrate
+        from lazy import LAZY_IMPORTS
+        from database import on_first_session
+
+        def check_schema(bind):
+            schema_status = migrate.check_schema(bind)
+            print(f"✅ Database schema {schema_status}", file=sys.stderr)
+            initialization_status["database_tables"] = schema_status
+
+        if LAZY_IMPORTS:
+            # Don't create the engine or connect during the cold start;
+            # check on the first DB request
+            on_first_session(check_schema)
+            print("✅ Database schema check deferred to first request", file=sys.stderr)
+            initialization_status["database_tables"] = "deferred"
+        elif get_engine() is None:
+            # Engine creation failed
+            print("⚠️  Database engine is None, cannot check schema", file=sys.stderr)
             initialization_status["database_tables"] = "skipped (engine creation failed)"
         else:
-            models.Base.metadata.create_all(bind=engine)
-            print("✅ Database tables created/verified", file=sys.stderr)
-            initialization_status["database_tables"] = "success"
+            check_schema(get_engine())
     except Exception as e:
-        error_msg = f"Database initialization failed: {e}"
+        error_msg = f"Database schema check failed: {e}"
         print(f"🔥 {error_msg}", file=sys.stderr)
         print("🔥 Full traceback:", file=sys.stderr)
         traceback.print_exc()
@@ -188,12 +204,13 @@ def health_check():
     if database_available:
         try:
             # Test database connection
-            from database import SessionLocal, engine
-            if engine is None or SessionLocal is None:
+            from sqlalchemy import text
+            from database import SessionLocal, get_engine
+            if get_engine() is None:
                 status["database"] = "engine_not_available"
             else:
                 db = SessionLocal()
-                db.execute("SELECT 1")
+                db.execute(text("SELECT 1"))
                 db.close()
                 status["database"] = "connected"
         except Exception as e:
@@ -235,36 +252,37 @@ if database_available:
     print("🔧 Registering authentication endpoints...", file=sys.stderr)
 
     @app.post("/api/auth/register", response_model=schemas.User)
-    def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         """Register a new user"""
-        db_user = auth.get_user_by_username(db, username=user.username)
-        if db_user:
+        # Check if username already exists
+        if await run_in_threadpool(auth.get_user_by_username, db, username=user.username):
             raise HTTPException(status_code=400, detail="Username already registered")
 
-        db_user = auth.get_user_by_email(db, email=user.email)
-        if db_user:
+        # Check if email already exists
+        if await run_in_threadpool(auth.get_user_by_email, db, email=user.email):
             raise HTTPException(status_code=400, detail="Email already registered")
 
-        return auth.create_user(db=db, user=user)
+        # Create new user, hashing on the bcrypt pool
+        hashed_password = await auth.get_password_hash_async(user.password)
+        return await run_in_threadpool(auth.create_user, db, user, hashed_password)
 
 
     @app.post("/api/auth/login", response_model=schemas.Token)
-    def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db)):
-        """Login and get access token"""
-        user = auth.authenticate_user(db, login_data.username, login_data.password)
-        if not user:
-            raise HTTPException(
-                status_code=401,
-                detail="Incorrect username or password",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = auth.create_access_token(
-            data={"sub": user.username}, expires_delta=access_token_expires
-        )
+    async def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db)):
+        """Login and get an access token and a refresh token"""
+        started = time.perf_counter()
+        try:
+            user = await auth.authenticate_user_async(db, login_data.username, login_data.password)
+            if not user:
+                raise HTTPException(
+                    status_code=401,
+                    detail="Incorrect username or password",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
 
-        return {"access_token": access_token, "token_type": "bearer"}
+            return auth.create_token_pair(user)
+        finally:
+            auth.login_latency.record(time.perf_counter() - started)
 
 
     @app.get("/api/auth/me", response_model=schemas.User)
@@ -273,10 +291,31 @@ if database_available:
         return current_user
 
 
+    @app.post("/api/auth/refresh", response_model=schemas.Token)
+    def refresh_token(refresh_data: schemas.RefreshRequest, db: Session = Depends(get_db)):
+        """New access token for a refresh token, without a password check"""
+        access_token = auth.refresh_access_token(db, refresh_data.refresh_token)
+        return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_data.refresh_token}
+
+
     @app.post("/api/auth/logout")
-    async def logout():
-        """Logout (client should delete token)"""
-        return {"message": "Successfully logged out"}
+    def logout(
+        logout_data: Optional[schemas.LogoutRequest] = None,
+        token: Optional[str] = Depends(auth.optional_oauth2_scheme),
+        db: Session = Depends(get_db)
+    ):
+        """Logout: revoke the bearer token and the refresh token, if given"""
+        revoked = auth.revoke_tokens(
+            db, access_token=token, refresh_token=logout_data.refresh_token if logout_data else None
+        )
+        return {"message": "Successfully logged out", "revoked": revoked}
+
+    from fastapi.responses import JSONResponse
+
+    @app.exception_handler(auth.workers.PoolBusyError)
+    async def pool_busy_handler(request, exc):
+        # Too many logins waiting for the bcrypt pool
+        return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
 
     print("✅ Authentication endpoints registered", file=sys.stderr)
 else:
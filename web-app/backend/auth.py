@@ -2,28 +2,53 @@
 Authentication utilities for password hashing and JWT tokens
 """
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 import os
+import uuid
 
+import auth_cache
 import models
 import schemas
+import token_revocation
+import workers
 from database import get_db
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor; hashes with any other cost are re-hashed on the next
+# successful login, so it can be raised or lowered at any time
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# Hashing is CPU bound; it gets its own small pool so a burst of logins
+# queues there instead of taking threads from other requests
+hash_pool = workers.BlockingPool(
+    workers=int(os.getenv("AUTH_HASH_WORKERS", "2")),
+    queue_limit=int(os.getenv("AUTH_HASH_QUEUE_LIMIT", "64")),
+    thread_name_prefix="bcrypt"
+)
+login_latency = workers.LatencyStats()
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
 
 # JWT settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -36,6 +61,16 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also returns a new hash if the stored one uses another cost"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the hashing pool"""
+    return await hash_pool.run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -49,6 +84,44 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def _identity_token(username: str, user_id: int, is_active: bool, token_type: str, expires_delta: timedelta) -> str:
+    return create_access_token(
+        data={
+            "sub": username,
+            "uid": user_id,
+            "active": bool(is_active),
+            "type": token_type,
+            "jti": uuid.uuid4().hex,
+            "iat": datetime.utcnow(),
+        },
+        expires_delta=expires_delta
+    )
+
+
+def create_user_token(user: models.User, expires_delta: Optional[timedelta] = None) -> str:
+    """Access token for a user, carrying its id and active flag as claims"""
+    return _identity_token(
+        user.username, user.id, user.is_active, "access",
+        expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+
+def create_refresh_token(user: models.User) -> str:
+    """Long-lived token that can only be exchanged for access tokens"""
+    return _identity_token(
+        user.username, user.id, user.is_active, "refresh", timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+
+def create_token_pair(user: models.User) -> dict:
+    """Login response: access and refresh token"""
+    return {
+        "access_token": create_user_token(user),
+        "refresh_token": create_refresh_token(user),
+        "token_type": "bearer",
+    }
+
+
 def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
     """Get user by username"""
     return db.query(models.User).filter(models.User.username == username).first()
@@ -69,9 +142,28 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[mod
     return user
 
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
-    """Create a new user"""
-    hashed_password = get_password_hash(user.password)
+async def authenticate_user_async(db: Session, username: str, password: str) -> Optional[models.User]:
+    """authenticate_user with bcrypt on the hashing pool
+
+    A hash with an outdated cost factor is replaced after a successful
+    verification.
+    """
+    user = await run_in_threadpool(get_user_by_username, db, username)
+    if not user:
+        return None
+    verified, new_hash = await hash_pool.run(verify_and_update_password, password, user.hashed_password)
+    if not verified:
+        return None
+    if new_hash:
+        user.hashed_password = new_hash
+        await run_in_threadpool(db.commit)
+        await run_in_threadpool(db.refresh, user)
+    return user
+
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None) -> models.User:
+    """Create a new user (pass hashed_password if it was hashed already)"""
+    hashed_password = hashed_password or get_password_hash(user.password)
     db_user = models.User(
         email=user.email,
         username=user.username,
@@ -84,33 +176,112 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
     return db_user
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> models.User:
-    """Get current authenticated user from JWT token"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """Verified JWT payload with a subject, or a 401
+
+    A refresh token is not accepted where an access token is expected, and
+    the other way round. Tokens issued before token types existed count as
+    access tokens.
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(username=username)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    if payload.get("sub") is None or payload.get("type", "access") != token_type:
+        raise _credentials_exception()
+    return payload
+
+
+def _check_not_revoked(db: Session, payload: dict):
+    jti = payload.get("jti")
+    if jti and token_revocation.is_revoked(db, jti):
+        raise _credentials_exception()
+
+
+def refresh_access_token(db: Session, refresh_token: str) -> str:
+    """New access token for a valid, unrevoked refresh token
+
+    The user is looked up (through the auth cache) on every refresh rather
+    than trusting the claims in the refresh token, which lives for
+    REFRESH_TOKEN_EXPIRE_DAYS: a deleted user gets a 401 and a disabled
+    one a 400, as on any authenticated request.
+    """
+    payload = decode_token(refresh_token, token_type="refresh")
+    _check_not_revoked(db, payload)
+    user = _load_user(db, payload)
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return create_user_token(user)
+
+
+def revoke_tokens(db: Session, access_token: Optional[str] = None, refresh_token: Optional[str] = None) -> int:
+    """Revoke the given tokens until they expire; returns how many were revoked
+
+    Tokens with a bad signature or without an id are skipped.
+    """
+    revoked = 0
+    for token in (access_token, refresh_token):
+        if not token:
+            continue
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
+        except JWTError:
+            continue
+        if not payload.get("jti") or not payload.get("exp"):
+            continue
+        if token_revocation.revoke(
+                db, payload["jti"], datetime.utcfromtimestamp(payload["exp"]), user_id=payload.get("uid")):
+            revoked += 1
+    return revoked
 
-    user = get_user_by_username(db, username=token_data.username)
-    if user is None:
-        raise credentials_exception
 
+def _snapshot(user: models.User) -> models.User:
+    """Detached copy of a user's columns, safe to share between requests"""
+    return models.User(**{column.key: getattr(user, column.key) for column in models.User.__table__.columns})
+
+
+def invalidate_user(username: str):
+    """Call after changing a user so cached copies and older tokens are re-checked"""
+    auth_cache.invalidate(username)
+
+
+def _load_user(db: Session, payload: dict) -> models.User:
+    username = payload["sub"]
+    if not auth_cache.issued_before_change(username, payload.get("iat")):
+        cached = auth_cache.get(username)
+        if cached is not None:
+            return cached
+
+    user = get_user_by_username(db, username=username)
+    if user is None:
+        raise _credentials_exception()
+    auth_cache.put(username, _snapshot(user))
     return user
 
 
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> models.User:
+    """Get current authenticated user from JWT token
+
+    Users are cached by token subject for AUTH_CACHE_TTL seconds (see
+    auth_cache), so most requests don't query the database. A cached user
+    is a detached copy; look the user up again before changing it.
+    """
+    payload = decode_token(token)
+    _check_not_revoked(db, payload)
+    return _load_user(db, payload)
+
+
 async def get_current_active_user(
     current_user: models.User = Depends(get_current_user)
 ) -> models.User:
@@ -127,5 +298,6 @@ def make_superuser(db: Session, username: str) -> bool:
     if user:
         user.is_superuser = True
         db.commit()
+        invalidate_user(username)
         return True
     return False
@@ -0,0 +1,88 @@
+"""
+In-process cache of authenticated users
+get_current_user verifies the JWT signature on every request, then looks
+the user up by username. That lookup is cached here for AUTH_CACHE_TTL
+seconds, keyed by the token subject, so repeat requests skip the query.
+
+invalidate(username) drops a user's entry and records when it happened;
+tokens issued before that are checked against the database again. The
+cache and the invalidation times are per process, so on several instances
+a change can take up to AUTH_CACHE_TTL seconds to be seen everywhere.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import os
+import threading
+import time
+
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, tuple]" = OrderedDict()  # username -> (expires_at, user)
+_invalidated: Dict[str, float] = {}  # username -> unix time of last change
+_stats = {"hits": 0, "misses": 0, "expired": 0, "invalidations": 0}
+
+
+def get(username: str) -> Optional[Any]:
+    """Cached user for a token subject, or None"""
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(username)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        if entry[0] < now:
+            del _entries[username]
+            _stats["expired"] += 1
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(username)
+        _stats["hits"] += 1
+        return entry[1]
+
+
+def put(username: str, user: Any):
+    if AUTH_CACHE_TTL <= 0:
+        return
+    with _lock:
+        _entries[username] = (time.monotonic() + AUTH_CACHE_TTL, user)
+        _entries.move_to_end(username)
+        while len(_entries) > AUTH_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def invalidate(username: str):
+    """Forget a user after it changed; older tokens are re-checked"""
+    with _lock:
+        _entries.pop(username, None)
+        _invalidated[username] = time.time()
+        _stats["invalidations"] += 1
+
+
+def issued_before_change(username: str, issued_at: Optional[float]) -> bool:
+    """Whether a token predates the last invalidation of its user"""
+    changed = _invalidated.get(username)
+    if changed is None:
+        return False
+    # iat has whole-second precision; a token from the same second is re-checked
+    return issued_at is None or issued_at <= changed
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def cache_info() -> Dict[str, Any]:
+    with _lock:
+        stats = dict(_stats)
+        size = len(_entries)
+    lookups = stats["hits"] + stats["misses"]
+    stats.update(
+        size=size,
+        max_size=AUTH_CACHE_SIZE,
+        ttl_seconds=AUTH_CACHE_TTL,
+        hit_rate=round(stats["hits"] / lookups, 4) if lookups else 0.0,
+    )
+    return stats
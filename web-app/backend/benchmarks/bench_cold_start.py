@@ -0,0 +1,98 @@
+"""
+Benchmark: cold start of main.py and api/index.py, with and without LAZY_IMPORTS
+
+Every run is a fresh interpreter. It reports the time to import the app,
+to answer the first request that needs no database, and to answer the
+first request that queries the database. It also shows whether pandas
+has been loaded at each point.
+
+Run from the backend directory:
+    python benchmarks/bench_cold_start.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (entry point, request without DB, request with DB)
+ENTRIES = {
+    "main.py": ("GET", "/", "GET", "/api/drivers"),
+    "api/index.py": ("GET", "/api/auth/me", "POST", "/api/auth/login"),
+}
+
+CHILD = r"""
+import importlib.util, io, json, sys, time, contextlib
+from fastapi.testclient import TestClient  # not part of the app's cold start
+
+entry, method1, path1, method2, path2 = sys.argv[1:6]
+timings = {}
+stderr = io.StringIO()
+
+started = time.perf_counter()
+with contextlib.redirect_stderr(stderr):
+    spec = importlib.util.spec_from_file_location("app_entry", entry)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+timings["import"] = time.perf_counter() - started
+timings["pandas_after_import"] = "pandas" in sys.modules
+
+client = TestClient(module.app)
+body = {"username": "nobody", "password": "wrong"}
+with contextlib.redirect_stderr(stderr):
+    t = time.perf_counter()
+    client.request(method1, path1)
+    timings["first_request"] = time.perf_counter() - t
+    t = time.perf_counter()
+    client.request(method2, path2, json=body if method2 == "POST" else None)
+    timings["first_db_request"] = time.perf_counter() - t
+timings["pandas_after_requests"] = "pandas" in sys.modules
+print(json.dumps(timings))
+"""
+
+
+def prepare_database(path: str):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+    subprocess.run([sys.executable, "migrate.py"], cwd=BACKEND_DIR, env=env,
+                   check=True, capture_output=True)
+
+
+def run_once(entry: str, lazy: bool, db_path: str) -> dict:
+    method1, path1, method2, path2 = ENTRIES[entry]
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", LAZY_IMPORTS="true" if lazy else "false",
+               SCHEMA_AUTO_UPGRADE="false")
+    env.pop("VERCEL", None)
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, entry, method1, path1, method2, path2],
+        cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    tmp_dir = tempfile.mkdtemp(prefix="bench_cold_start_")
+    db_path = os.path.join(tmp_dir, "bench.db")
+    prepare_database(db_path)
+
+    print(f"{'entry':<14} {'mode':<6} {'import':>9} {'1st req':>9} {'1st DB':>9} {'total':>9}  pandas loaded")
+    for entry in ENTRIES:
+        for lazy in (False, True):
+            results = [run_once(entry, lazy, db_path) for _ in range(runs)]
+            med = {key: statistics.median(r[key] for r in results)
+                   for key in ("import", "first_request", "first_db_request")}
+            total = sum(med.values())
+            last = results[-1]
+            pandas = (f"import={'yes' if last['pandas_after_import'] else 'no'}, "
+                      f"after requests={'yes' if last['pandas_after_requests'] else 'no'}")
+            print(f"{entry:<14} {'lazy' if lazy else 'eager':<6} "
+                  f"{med['import'] * 1000:>7.0f}ms {med['first_request'] * 1000:>7.0f}ms "
+                  f"{med['first_db_request'] * 1000:>7.0f}ms {total * 1000:>7.0f}ms  {pandas}")
+    print(f"(median of {runs} fresh interpreters each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: per-cell safe_float vs. vectorized safe_float_series
+
+Run from the backend directory:
+    python benchmarks/bench_number_coercion.py [rows]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import safe_float, safe_float_series  # noqa: E402
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    """Build a frame shaped like a taxameter export with Norwegian number strings"""
+    rng = np.random.default_rng(42)
+    amounts = rng.uniform(-5000, 50000, size=rows).round(2)
+    text = pd.Series(amounts).map(lambda v: f"{v:,.2f}".replace(",", " ").replace(".", ","))
+    # Sprinkle in blanks and missing values
+    text[rng.random(rows) < 0.05] = ""
+    text[rng.random(rows) < 0.05] = "nan"
+    text[rng.random(rows) < 0.05] = None
+    return pd.DataFrame({
+        "Kontant": text,
+        "Sub_Total": amounts,
+    })
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = make_frame(rows)
+    print(f"Rows: {rows:,}")
+
+    for col in df.columns:
+        slow = df[col].apply(safe_float)
+        fast = safe_float_series(df[col])
+        assert np.allclose(slow.to_numpy(), fast.to_numpy()), f"Mismatch in {col}"
+
+        t_apply = timed(lambda: df[col].apply(safe_float).sum())
+        t_vector = timed(lambda: safe_float_series(df[col]).sum())
+        print(
+            f"  {col:<10} ({df[col].dtype}): apply(safe_float) {t_apply * 1000:8.1f} ms"
+            f" | safe_float_series {t_vector * 1000:8.1f} ms"
+            f" | speedup {t_apply / t_vector:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """
 Database table creation script
-Run this script to initialize the database tables in Supabase
+Run this script to initialize the database tables in Supabase.
+Tables are created by applying the versioned migrations (see migrate.py).
 """
 import os
 from dotenv import load_dotenv
@@ -11,8 +12,8 @@ from sqlalchemy.exc import OperationalError, ProgrammingError
 load_dotenv()
 
 # Import models after loading env vars
-from database import engine, Base
-import models  # This imports all model classes
+from database import engine
+import migrate
 
 def create_tables():
     """Create all database tables"""
@@ -24,8 +25,8 @@ def create_tables():
         with engine.connect() as conn:
             print("✓ Database connection successful")
 
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Create all tables by applying every pending migration
+        migrate.upgrade(engine)
         print("✓ All tables created successfully!")
 
         # List created tables
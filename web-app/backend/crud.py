@@ -1,8 +1,113 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional
+from sqlalchemy.orm import Session, aliased, undefer
+from sqlalchemy import and_, asc, desc, exists, func, insert, or_
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
+import csv
+import io
+import json
 import models
 import schemas
+import summaries
+from lazy import lazy_import
+
+# Loads pandas; only needed for reports with Parquet row storage
+report_storage = lazy_import("report_storage")
+
+
+# Keyset pagination
+def encode_cursor(created_at: datetime, row_id: int, direction: str) -> str:
+    """Opaque cursor for a (created_at, id) position and paging direction"""
+    payload = json.dumps({"t": created_at.isoformat(), "i": row_id, "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    """Parse a cursor from encode_cursor, raising ValueError if it is malformed"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        direction = payload["d"]
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(payload["t"]), int(payload["i"]), direction
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_query(
+    query,
+    model,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    descending: bool = True
+) -> Tuple[Any, str]:
+    """Apply the cursor filter, ordering and limit to a Query or select()
+
+    Returns (query, direction); the query fetches one row more than limit
+    so keyset_result can tell whether there is another page.
+    """
+    created_at, row_id = model.created_at, model.id
+    direction = "next"
+    if cursor:
+        cursor_at, cursor_id, direction = decode_cursor(cursor)
+        # "after" in listing order: older rows when descending, newer when ascending
+        after = (direction == "next") == descending
+        if after:
+            query = query.filter(or_(created_at < cursor_at, and_(created_at == cursor_at, row_id < cursor_id)))
+        else:
+            query = query.filter(or_(created_at > cursor_at, and_(created_at == cursor_at, row_id > cursor_id)))
+
+    # Walking backwards reads in reverse order, then flips the page
+    reverse = direction == "prev"
+    order = desc if descending != reverse else asc
+    query = query.order_by(order(created_at), order(row_id))
+    if skip and not cursor:
+        query = query.offset(skip)
+    return query.limit(limit + 1), direction
+
+
+def keyset_result(
+    items: List[Any],
+    limit: int,
+    direction: str,
+    paged: bool
+) -> Tuple[List[Any], Optional[str], Optional[str]]:
+    """(items, next_cursor, prev_cursor) from the rows keyset_query fetched
+
+    paged is whether the request had a cursor or skip, i.e. whether there
+    is anything before the first row in listing order.
+    """
+    has_more = len(items) > limit
+    items = items[:limit]
+    if direction == "prev":
+        items.reverse()
+
+    if not items:
+        return items, None, None
+    has_next = has_more if direction == "next" else True
+    has_prev = has_more if direction == "prev" else paged
+    next_cursor = encode_cursor(items[-1].created_at, items[-1].id, "next") if has_next else None
+    prev_cursor = encode_cursor(items[0].created_at, items[0].id, "prev") if has_prev else None
+    return items, next_cursor, prev_cursor
+
+
+def keyset_page(
+    query,
+    model,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    descending: bool = True
+) -> Tuple[List[Any], Optional[str], Optional[str]]:
+    """Page a query on (created_at, id) and return (items, next_cursor, prev_cursor)
+
+    Each page seeks from the cursor position through the (created_at, id)
+    index, so deep pages cost the same as the first one. skip is only
+    applied without a cursor, for callers still using offset paging.
+    """
+    query, direction = keyset_query(query, model, limit, cursor, skip, descending)
+    return keyset_result(query.all(), limit, direction, bool(cursor or skip))
 
 
 # Company CRUD
@@ -47,7 +152,11 @@ def get_driver(db: Session, driver_id: int) -> Optional[models.Driver]:
 
 
 def get_drivers(db: Session, skip: int = 0, limit: int = 100) -> List[models.Driver]:
-    return db.query(models.Driver).offset(skip).limit(limit).all()
+    return get_drivers_page(db, skip=skip, limit=limit)[0]
+
+
+def get_drivers_page(db: Session, limit: int = 100, cursor: Optional[str] = None, skip: int = 0):
+    return keyset_page(db.query(models.Driver), models.Driver, limit, cursor, skip, descending=False)
 
 
 def create_driver(db: Session, driver: schemas.DriverCreate) -> models.Driver:
@@ -187,19 +296,37 @@ def delete_template(db: Session, template_id: int) -> bool:
 
 # Shift Report CRUD
 def get_shift_report(db: Session, report_id: int) -> Optional[models.ShiftReport]:
-    return db.query(models.ShiftReport).filter(models.ShiftReport.id == report_id).first()
+    return db.query(models.ShiftReport).options(undefer(models.ShiftReport.data)).filter(models.ShiftReport.id == report_id).first()
 
 
 def get_shift_reports(db: Session, driver_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[models.ShiftReport]:
-    query = db.query(models.ShiftReport).order_by(desc(models.ShiftReport.created_at))
+    return get_shift_reports_page(db, driver_id=driver_id, skip=skip, limit=limit)[0]
+
+
+def get_shift_reports_page(
+    db: Session,
+    driver_id: Optional[int] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = 0
+):
+    """Newest first, as (items, next_cursor, prev_cursor)"""
+    query = db.query(models.ShiftReport)
     if driver_id:
         query = query.filter(models.ShiftReport.driver_id == driver_id)
-    return query.offset(skip).limit(limit).all()
+    return keyset_page(query, models.ShiftReport, limit, cursor, skip)
 
 
-def create_shift_report(db: Session, report: schemas.ShiftReportCreate) -> models.ShiftReport:
+def create_shift_report(
+    db: Session,
+    report: schemas.ShiftReportCreate,
+    rows: Optional[List[Dict[str, Any]]] = None
+) -> models.ShiftReport:
     db_report = models.ShiftReport(**report.dict())
     db.add(db_report)
+    if rows:
+        db.flush()
+        insert_shift_rows(db, db_report.id, rows)
     db.commit()
     db.refresh(db_report)
     return db_report
@@ -216,22 +343,362 @@ def create_shift_edit(db: Session, report_id: int, edit: schemas.ShiftEditCreate
 def delete_shift_report(db: Session, report_id: int) -> bool:
     db_report = get_shift_report(db, report_id)
     if db_report:
+        # Bulk delete rows instead of loading them (SQLite does not cascade by default)
+        db.query(models.ShiftRow).filter(models.ShiftRow.shift_report_id == report_id).delete(synchronize_session=False)
+        data = db_report.data
         db.delete(db_report)
         db.commit()
+        report_storage.delete_rows(data)
         return True
     return False
 
 
+# Shift Row CRUD
+SHIFT_ROW_COLUMNS = (
+    "shift_report_id", "row_index", "loyve", "skiftnr", "driver", "start_dato", "slutt_dato",
+    "kontant", "kreditt", "bomtur", "subtotal", "tips", "raw",
+)
+
+
+def insert_shift_rows(db: Session, report_id: int, rows: List[Dict[str, Any]]) -> int:
+    """Bulk insert normalized rows for a report (no commit)"""
+    return bulk_insert_shift_rows(db, [{**row, "shift_report_id": report_id} for row in rows])
+
+
+def bulk_insert_shift_rows(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """Bulk insert shift_rows records that already carry shift_report_id (no commit)
+
+    Uses COPY on PostgreSQL (psycopg2) and a single executemany elsewhere.
+    """
+    if not rows:
+        return 0
+    if db.get_bind().dialect.name == "postgresql" and _copy_shift_rows(db, rows):
+        return len(rows)
+    db.execute(insert(models.ShiftRow), rows)
+    return len(rows)
+
+
+def _copy_value(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+def _copy_shift_rows(db: Session, rows: List[Dict[str, Any]]) -> bool:
+    """Stream rows through COPY ... FROM STDIN, returns False if the driver can't"""
+    cursor = db.connection().connection.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        cursor.close()
+        return False
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(row.get(col)) for col in SHIFT_ROW_COLUMNS])
+    buffer.seek(0)
+
+    try:
+        cursor.copy_expert(
+            f"COPY shift_rows ({', '.join(SHIFT_ROW_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+    return True
+
+
+def get_shift_rows(db: Session, report_id: int, skip: int = 0, limit: Optional[int] = None) -> List[models.ShiftRow]:
+    query = db.query(models.ShiftRow).filter(models.ShiftRow.shift_report_id == report_id).order_by(models.ShiftRow.row_index)
+    if skip:
+        query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def _select_columns(
+    records: List[Dict[str, Any]],
+    columns: Optional[List[str]],
+    offset: int = 0,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    records = records[offset:None if limit is None else offset + limit]
+    if columns is None:
+        return records
+    return [{col: record[col] for col in columns if col in record} for record in records]
+
+
+def get_shift_report_records(
+    db: Session,
+    report: models.ShiftReport,
+    columns: Optional[List[str]] = None,
+    offset: int = 0,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Original row dicts for a report, from Parquet, a legacy JSON blob or shift_rows"""
+    data = report.data or {}
+    if report_storage.is_columnar(data):
+        return report_storage.read_records(data, columns, offset, limit)
+    if "rows" in data:
+        return _select_columns(data["rows"], columns, offset, limit)
+
+    query = db.query(models.ShiftRow.raw).filter(
+        models.ShiftRow.shift_report_id == report.id
+    ).order_by(models.ShiftRow.row_index)
+    if offset:
+        query = query.offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    return _select_columns([raw or {} for (raw,) in query], columns)
+
+
+def count_shift_report_rows(db: Session, report: models.ShiftReport) -> int:
+    data = report.data or {}
+    if "rows" in data:
+        return len(data["rows"])
+    if data.get("row_count") is not None:
+        return data["row_count"]
+    return db.query(func.count(models.ShiftRow.id)).filter(models.ShiftRow.shift_report_id == report.id).scalar()
+
+
+def _filter_shift_rows(
+    query,
+    report_id: Optional[int] = None,
+    driver: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    row = models.ShiftRow
+    if report_id is not None:
+        query = query.filter(row.shift_report_id == report_id)
+    else:
+        # Across reports, count each shift once
+        query = query.filter(_latest_copy())
+    if driver is not None:
+        query = query.filter(row.driver == driver)
+    if start is not None:
+        query = query.filter(row.start_dato >= start)
+    if end is not None:
+        query = query.filter(row.start_dato < end)
+    return query
+
+
+def _latest_copy():
+    """Rows with no newer copy of the same shift (løyve, skiftnr, start)
+
+    Ingesting a file again stores its rows again under the new report, so
+    totals across reports count each shift once, from its latest import.
+    Rows missing any of the three keys are always counted.
+    """
+    row = models.ShiftRow
+    newer = aliased(models.ShiftRow)
+    return ~exists().where(
+        newer.loyve == row.loyve,
+        newer.skiftnr == row.skiftnr,
+        newer.start_dato == row.start_dato,
+        newer.id > row.id
+    )
+
+
+def _shift_row_sums() -> list:
+    """count(*) and the coalesced sum of every summary column"""
+    row = models.ShiftRow
+    return [func.count(row.id)] + [
+        func.coalesce(func.sum(getattr(row, key)), 0.0) for key in summaries.SUMMARY_COLUMNS
+    ]
+
+
+def _shift_row_totals(count, *sums) -> Dict[str, float]:
+    return {"row_count": count, **{key: float(value) for key, value in zip(summaries.SUMMARY_COLUMNS, sums)}}
+
+
+def get_shift_row_totals(
+    db: Session,
+    report_id: Optional[int] = None,
+    driver: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict[str, float]:
+    """Sum the amount columns of shift_rows in SQL, optionally filtered"""
+    query = _filter_shift_rows(db.query(*_shift_row_sums()), report_id, driver, start, end)
+    return _shift_row_totals(*query.one())
+
+
+def get_shift_row_totals_by_driver(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict[str, Dict[str, float]]:
+    """get_shift_row_totals for every driver at once, in one GROUP BY query
+
+    Keyed by the Sjåfør ID stored in shift_rows; rows without one are left out.
+    """
+    row = models.ShiftRow
+    query = db.query(row.driver, *_shift_row_sums()).filter(row.driver.isnot(None))
+    query = _filter_shift_rows(query, start=start, end=end).group_by(row.driver).order_by(row.driver)
+    return {driver: _shift_row_totals(*sums) for driver, *sums in query.all()}
+
+
+def get_shift_row_file_names(
+    db: Session,
+    driver: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[str]:
+    """File names of the shift reports that have rows in a driver/date range"""
+    report_ids = _filter_shift_rows(db.query(models.ShiftRow.shift_report_id), driver=driver, start=start, end=end)
+    query = db.query(models.ShiftReport.file_name).filter(
+        models.ShiftReport.id.in_(report_ids)
+    ).order_by(models.ShiftReport.id)
+    return list(dict.fromkeys(file_name for (file_name,) in query.all()))
+
+
+def get_shift_row_file_names_by_driver(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict[str, List[str]]:
+    """get_shift_row_file_names for every driver at once"""
+    row = models.ShiftRow
+    query = db.query(row.driver, models.ShiftReport.id, models.ShiftReport.file_name).join(
+        models.ShiftReport, models.ShiftReport.id == row.shift_report_id
+    ).filter(row.driver.isnot(None))
+    query = _filter_shift_rows(query, start=start, end=end).distinct().order_by(row.driver, models.ShiftReport.id)
+
+    file_names: Dict[str, Dict[str, None]] = {}
+    for driver, _, file_name in query.all():
+        file_names.setdefault(driver, {})[file_name] = None
+    return {driver: list(names) for driver, names in file_names.items()}
+
+
+def calculate_salary_from_rows(
+    db: Session,
+    driver: models.Driver,
+    start: datetime,
+    end: datetime
+) -> Dict[str, Any]:
+    """services.calculate_salary for a driver's ingested shift_rows in [start, end)
+
+    One aggregate query instead of re-parsing the files. Rows are matched
+    on the exact Sjåfør ID stored at ingest time.
+    """
+    totals = get_shift_row_totals(db, driver=driver.driver_id, start=start, end=end)
+    return summaries.salary_from_row_totals(totals, driver.commission_percentage)
+
+
+def salary_report_from_rows(
+    driver_id: int,
+    driver_code: str,
+    start: datetime,
+    end: datetime,
+    salary: Dict[str, Any],
+    file_names: List[str],
+    report_period: Optional[str] = None
+) -> models.SalaryReport:
+    """Unsaved SalaryReport for a salary computed from shift_rows
+
+    The rows stay in shift_rows; data records the driver and range they
+    were summed over.
+    """
+    return models.SalaryReport(
+        driver_id=driver_id,
+        report_period=report_period or summaries.period_label(start),
+        file_names=file_names,
+        gross_salary=salary["gross_salary"],
+        commission_percentage=salary["commission_percentage"],
+        net_salary=salary["net_salary"],
+        cash_amount=salary["cash_amount"],
+        tips=salary["tips"],
+        data={
+            "source": "shift_rows",
+            "driver": driver_code,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "shift_row_count": salary["row_count"],
+            "breakdown": salary["breakdown"],
+        }
+    )
+
+
+def create_salary_report_from_rows(
+    db: Session,
+    driver: models.Driver,
+    start: datetime,
+    end: datetime,
+    report_period: Optional[str] = None
+) -> models.SalaryReport:
+    """Salary report computed from shift_rows"""
+    db_report = salary_report_from_rows(
+        driver.id, driver.driver_id, start, end,
+        calculate_salary_from_rows(db, driver, start, end),
+        get_shift_row_file_names(db, driver=driver.driver_id, start=start, end=end),
+        report_period
+    )
+    db.add(db_report)
+    db.commit()
+    db.refresh(db_report)
+    return db_report
+
+
+def backfill_shift_rows(db: Session, build_rows, batch_size: int = 50) -> Dict[str, int]:
+    """Move legacy rows out of ShiftReport.data blobs into shift_rows
+
+    build_rows turns a list of row dicts into shift_rows records
+    (services.shift_rows_from_frame on a DataFrame of them). Reports are
+    committed in batches so an interrupted run can simply be restarted.
+    """
+    migrated = 0
+    row_count = 0
+    report_ids = [report_id for (report_id,) in db.query(models.ShiftReport.id).order_by(models.ShiftReport.id)]
+
+    for i in range(0, len(report_ids), batch_size):
+        batch = report_ids[i:i + batch_size]
+        for report in db.query(models.ShiftReport).filter(models.ShiftReport.id.in_(batch)):
+            data = report.data or {}
+            if "rows" not in data:
+                continue
+
+            rows = build_rows(data["rows"])
+            row_count += insert_shift_rows(db, report.id, rows)
+            report.data = {
+                "columns": data.get("columns") or (list(data["rows"][0].keys()) if data["rows"] else []),
+                "row_count": len(rows),
+            }
+            migrated += 1
+        db.commit()
+        db.expunge_all()
+
+    return {"reports": migrated, "rows": row_count}
+
+
 # Salary Report CRUD
 def get_salary_report(db: Session, report_id: int) -> Optional[models.SalaryReport]:
-    return db.query(models.SalaryReport).filter(models.SalaryReport.id == report_id).first()
+    return db.query(models.SalaryReport).options(undefer(models.SalaryReport.data)).filter(models.SalaryReport.id == report_id).first()
 
 
 def get_salary_reports(db: Session, driver_id: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[models.SalaryReport]:
-    query = db.query(models.SalaryReport).order_by(desc(models.SalaryReport.created_at))
+    return get_salary_reports_page(db, driver_id=driver_id, skip=skip, limit=limit)[0]
+
+
+def get_salary_reports_page(
+    db: Session,
+    driver_id: Optional[int] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    report_period: Optional[str] = None
+):
+    """Newest first, as (items, next_cursor, prev_cursor)"""
+    query = db.query(models.SalaryReport)
     if driver_id:
         query = query.filter(models.SalaryReport.driver_id == driver_id)
-    return query.offset(skip).limit(limit).all()
+    if report_period:
+        query = query.filter(models.SalaryReport.report_period == report_period)
+    return keyset_page(query, models.SalaryReport, limit, cursor, skip)
 
 
 def create_salary_report(db: Session, report: schemas.SalaryReportCreate) -> models.SalaryReport:
@@ -242,10 +709,31 @@ def create_salary_report(db: Session, report: schemas.SalaryReportCreate) -> mod
     return db_report
 
 
+def get_salary_report_records(
+    report: models.SalaryReport,
+    columns: Optional[List[str]] = None,
+    offset: int = 0,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Row dicts of a salary report, from Parquet or the JSON blob"""
+    if report_storage.is_columnar(report.data):
+        return report_storage.read_records(report.data, columns, offset, limit)
+    return _select_columns((report.data or {}).get("rows", []), columns, offset, limit)
+
+
+def count_salary_report_rows(report: models.SalaryReport) -> int:
+    data = report.data or {}
+    if "rows" in data:
+        return len(data["rows"])
+    return data.get("row_count") or 0
+
+
 def delete_salary_report(db: Session, report_id: int) -> bool:
     db_report = get_salary_report(db, report_id)
     if db_report:
+        data = db_report.data
         db.delete(db_report)
         db.commit()
+        report_storage.delete_rows(data)
         return True
     return False
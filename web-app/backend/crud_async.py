@@ -0,0 +1,254 @@
+"""
+Async versions of the crud functions used by I/O-bound endpoints
+Same queries and behavior as crud.py, run on an AsyncSession
+(database.get_async_db) so requests wait on the database without holding
+a threadpool thread. Relationships that a response serializes are loaded
+up front, since lazy loading is not available on an AsyncSession.
+"""
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, undefer
+
+import crud
+import models
+import schemas
+
+
+async def keyset_page(
+    db: AsyncSession,
+    stmt,
+    model,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    descending: bool = True
+):
+    """crud.keyset_page for a select() statement"""
+    stmt, direction = crud.keyset_query(stmt, model, limit, cursor, skip, descending)
+    items = list((await db.scalars(stmt)).all())
+    return crud.keyset_result(items, limit, direction, bool(cursor or skip))
+
+
+async def _first(db: AsyncSession, stmt):
+    return (await db.scalars(stmt.limit(1))).first()
+
+
+async def _add(db: AsyncSession, obj):
+    db.add(obj)
+    await db.commit()
+    await db.refresh(obj)
+    return obj
+
+
+async def _update(db: AsyncSession, obj, values: dict):
+    for key, value in values.items():
+        setattr(obj, key, value)
+    await db.commit()
+    await db.refresh(obj)
+    return obj
+
+
+async def _delete(db: AsyncSession, obj) -> bool:
+    if obj is None:
+        return False
+    await db.delete(obj)
+    await db.commit()
+    return True
+
+
+# Company CRUD
+async def get_company(db: AsyncSession, company_id: int) -> Optional[models.Company]:
+    return await _first(db, select(models.Company).filter(models.Company.id == company_id))
+
+
+async def get_companies(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[models.Company]:
+    return list((await db.scalars(select(models.Company).offset(skip).limit(limit))).all())
+
+
+async def create_company(db: AsyncSession, company: schemas.CompanyCreate) -> models.Company:
+    return await _add(db, models.Company(**company.dict()))
+
+
+async def update_company(db: AsyncSession, company_id: int, company: schemas.CompanyUpdate) -> Optional[models.Company]:
+    db_company = await get_company(db, company_id)
+    if db_company:
+        await _update(db, db_company, company.dict(exclude_unset=True))
+    return db_company
+
+
+async def delete_company(db: AsyncSession, company_id: int) -> bool:
+    return await _delete(db, await get_company(db, company_id))
+
+
+# Driver CRUD
+async def get_driver(db: AsyncSession, driver_id: int) -> Optional[models.Driver]:
+    return await _first(db, select(models.Driver).filter(models.Driver.id == driver_id))
+
+
+async def get_drivers_page(db: AsyncSession, limit: int = 100, cursor: Optional[str] = None, skip: int = 0):
+    return await keyset_page(db, select(models.Driver), models.Driver, limit, cursor, skip, descending=False)
+
+
+async def create_driver(db: AsyncSession, driver: schemas.DriverCreate) -> models.Driver:
+    # If this driver is set as default, unset other defaults
+    if driver.is_default:
+        await db.execute(update(models.Driver).values(is_default=False))
+    return await _add(db, models.Driver(**driver.dict()))
+
+
+async def update_driver(db: AsyncSession, driver_id: int, driver: schemas.DriverUpdate) -> Optional[models.Driver]:
+    db_driver = await get_driver(db, driver_id)
+    if db_driver:
+        update_data = driver.dict(exclude_unset=True)
+
+        # If setting as default, unset other defaults
+        if update_data.get('is_default'):
+            await db.execute(update(models.Driver).where(models.Driver.id != driver_id).values(is_default=False))
+
+        await _update(db, db_driver, update_data)
+    return db_driver
+
+
+async def delete_driver(db: AsyncSession, driver_id: int) -> bool:
+    return await _delete(db, await get_driver(db, driver_id))
+
+
+# Bank Account CRUD
+async def get_bank_account(db: AsyncSession, account_id: int) -> Optional[models.BankAccount]:
+    return await _first(db, select(models.BankAccount).filter(models.BankAccount.id == account_id))
+
+
+async def get_bank_accounts(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[models.BankAccount]:
+    return list((await db.scalars(select(models.BankAccount).offset(skip).limit(limit))).all())
+
+
+async def create_bank_account(db: AsyncSession, account: schemas.BankAccountCreate) -> models.BankAccount:
+    # If this account is set as default, unset other defaults
+    if account.is_default:
+        await db.execute(update(models.BankAccount).values(is_default=False))
+    return await _add(db, models.BankAccount(**account.dict()))
+
+
+async def update_bank_account(db: AsyncSession, account_id: int, account: schemas.BankAccountUpdate) -> Optional[models.BankAccount]:
+    db_account = await get_bank_account(db, account_id)
+    if db_account:
+        update_data = account.dict(exclude_unset=True)
+
+        # If setting as default, unset other defaults
+        if update_data.get('is_default'):
+            await db.execute(
+                update(models.BankAccount).where(models.BankAccount.id != account_id).values(is_default=False)
+            )
+
+        await _update(db, db_account, update_data)
+    return db_account
+
+
+async def delete_bank_account(db: AsyncSession, account_id: int) -> bool:
+    return await _delete(db, await get_bank_account(db, account_id))
+
+
+# Template CRUD
+async def get_template(db: AsyncSession, template_id: int) -> Optional[models.Template]:
+    return await _first(db, select(models.Template).filter(models.Template.id == template_id))
+
+
+async def get_templates(db: AsyncSession, template_type: Optional[str] = None, skip: int = 0, limit: int = 100) -> List[models.Template]:
+    stmt = select(models.Template)
+    if template_type:
+        stmt = stmt.filter(models.Template.template_type == template_type)
+    return list((await db.scalars(stmt.offset(skip).limit(limit))).all())
+
+
+async def create_template(db: AsyncSession, template: schemas.TemplateCreate) -> models.Template:
+    # If this template is set as default, unset other defaults of same type
+    if template.is_default:
+        await db.execute(
+            update(models.Template)
+            .where(models.Template.template_type == template.template_type)
+            .values(is_default=False)
+        )
+    return await _add(db, models.Template(**template.dict()))
+
+
+async def update_template(db: AsyncSession, template_id: int, template: schemas.TemplateUpdate) -> Optional[models.Template]:
+    db_template = await get_template(db, template_id)
+    if db_template:
+        update_data = template.dict(exclude_unset=True)
+
+        # If setting as default, unset other defaults of same type
+        if update_data.get('is_default'):
+            await db.execute(
+                update(models.Template)
+                .where(models.Template.template_type == db_template.template_type, models.Template.id != template_id)
+                .values(is_default=False)
+            )
+
+        await _update(db, db_template, update_data)
+    return db_template
+
+
+async def delete_template(db: AsyncSession, template_id: int) -> bool:
+    return await _delete(db, await get_template(db, template_id))
+
+
+# Shift Report CRUD
+async def get_shift_report(db: AsyncSession, report_id: int) -> Optional[models.ShiftReport]:
+    """Report with its data and edits loaded, as the ShiftReport schema needs"""
+    return await _first(
+        db,
+        select(models.ShiftReport)
+        .options(undefer(models.ShiftReport.data), selectinload(models.ShiftReport.edits))
+        .filter(models.ShiftReport.id == report_id)
+    )
+
+
+async def get_shift_reports_page(
+    db: AsyncSession,
+    driver_id: Optional[int] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = 0
+):
+    """Newest first, as (items, next_cursor, prev_cursor)"""
+    stmt = select(models.ShiftReport)
+    if driver_id:
+        stmt = stmt.filter(models.ShiftReport.driver_id == driver_id)
+    return await keyset_page(db, stmt, models.ShiftReport, limit, cursor, skip)
+
+
+async def shift_report_exists(db: AsyncSession, report_id: int) -> bool:
+    return await _first(db, select(models.ShiftReport.id).filter(models.ShiftReport.id == report_id)) is not None
+
+
+async def create_shift_edit(db: AsyncSession, report_id: int, edit: schemas.ShiftEditCreate) -> models.ShiftEdit:
+    return await _add(db, models.ShiftEdit(shift_report_id=report_id, **edit.dict()))
+
+
+# Salary Report CRUD
+async def get_salary_report(db: AsyncSession, report_id: int) -> Optional[models.SalaryReport]:
+    return await _first(
+        db,
+        select(models.SalaryReport)
+        .options(undefer(models.SalaryReport.data))
+        .filter(models.SalaryReport.id == report_id)
+    )
+
+
+async def get_salary_reports_page(
+    db: AsyncSession,
+    driver_id: Optional[int] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    report_period: Optional[str] = None
+):
+    """Newest first, as (items, next_cursor, prev_cursor)"""
+    stmt = select(models.SalaryReport)
+    if driver_id:
+        stmt = stmt.filter(models.SalaryReport.driver_id == driver_id)
+    if report_period:
+        stmt = stmt.filter(models.SalaryReport.report_period == report_period)
+    return await keyset_page(db, stmt, models.SalaryReport, limit, cursor, skip)
@@ -1,8 +1,13 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+import asyncio
 import os
 import sys
+import threading
+import uuid
 
 # Don't load .env in production (Vercel injects env vars directly)
 if os.getenv("VERCEL") != "1":
@@ -20,56 +25,248 @@ if DATABASE_URL.startswith("postgres://") and not DATABASE_URL.startswith("postg
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
     print(f"✓ Normalized DATABASE_URL to use postgresql://", file=sys.stderr)
 
-# Configure engine based on database type
-engine = None
-try:
-    if "sqlite" in DATABASE_URL.lower():
-        engine = create_engine(
-            DATABASE_URL,
-            connect_args={"check_same_thread": False}
-        )
-        print(f"✓ SQLite engine created", file=sys.stderr)
-    elif "postgresql" in DATABASE_URL.lower():
-        # PostgreSQL configuration for serverless (Supabase)
-        # Keep it simple - no connect_args that might fail
-        engine = create_engine(
-            DATABASE_URL,
-            pool_pre_ping=True,
-            pool_recycle=300,
-            pool_size=5,
-            max_overflow=10
-        )
-        print(f"✓ PostgreSQL engine created", file=sys.stderr)
-    else:
-        engine = create_engine(DATABASE_URL)
-        print(f"✓ Generic database engine created", file=sys.stderr)
-
-except Exception as e:
-    print(f"🔥 Failed to create database engine: {e}", file=sys.stderr)
-    import traceback
-    traceback.print_exc()
-    print(f"⚠️  App will start without database support", file=sys.stderr)
-    # Don't raise - allow app to start without DB
-    engine = None
-
-# Only create SessionLocal if engine exists
-if engine is not None:
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    print(f"✓ SessionLocal created", file=sys.stderr)
-else:
-    SessionLocal = None
-    print(f"⚠️  SessionLocal not created (no engine)", file=sys.stderr)
+# Connection strategy for PostgreSQL:
+#   queue     - keep a pool of open connections (long-running uvicorn)
+#   null      - open a connection per session and close it after (serverless)
+#   pgbouncer - like null, for a transaction-mode pooler such as pgbouncer or
+#               the Supabase pooler, which does the pooling instead
+#   auto      - null on Vercel, queue elsewhere
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "auto").lower()
+if DB_POOL_MODE == "auto":
+    DB_POOL_MODE = "null" if os.getenv("VERCEL") == "1" else "queue"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+# Connections to open at startup in queue mode (0 = connect on first use)
+DB_WARMUP = int(os.getenv("DB_WARMUP", "0"))
+
+_engine = None
+_engine_created = False
+_engine_lock = threading.Lock()
+
+
+def _create_engine():
+    """Build the engine for DATABASE_URL; None if that fails"""
+    try:
+        if "sqlite" in DATABASE_URL.lower():
+            engine = create_engine(
+                DATABASE_URL,
+                connect_args={"check_same_thread": False}
+            )
+            print(f"✓ SQLite engine created", file=sys.stderr)
+        elif "postgresql" in DATABASE_URL.lower():
+            # PostgreSQL configuration (Supabase)
+            # Keep it simple - no connect_args that might fail
+            if DB_POOL_MODE in ("null", "pgbouncer"):
+                # Nothing survives an instance recycle anyway, and a pooler
+                # in front of the database already reuses server connections
+                engine = create_engine(DATABASE_URL, poolclass=NullPool)
+            else:
+                engine = create_engine(
+                    DATABASE_URL,
+                    pool_pre_ping=True,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW
+                )
+            print(f"✓ PostgreSQL engine created (pool: {DB_POOL_MODE})", file=sys.stderr)
+        else:
+            engine = create_engine(DATABASE_URL)
+            print(f"✓ Generic database engine created", file=sys.stderr)
+        return engine
+
+    except Exception as e:
+        print(f"🔥 Failed to create database engine: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        print(f"⚠️  App will continue without database support", file=sys.stderr)
+        # Don't raise - allow app to run without DB
+        return None
+
+
+def get_engine():
+    """The shared engine, created on first use; None if creation failed"""
+    global _engine, _engine_created
+    if not _engine_created:
+        with _engine_lock:
+            if not _engine_created:
+                _engine = _create_engine()
+                _engine_created = True
+    return _engine
+
+
+def __getattr__(name):
+    # `from database import engine` keeps working, creating the engine then
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker that binds to the engine when the first session is made"""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            engine = get_engine()
+            if engine is None:
+                raise RuntimeError("Database engine is not available. Check logs for initialization errors.")
+            self.configure(bind=engine)
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+
+
+# Async engine (asyncpg / aiosqlite) for endpoints that await their queries
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+_async_engine = None
+_async_engine_created = False
+_async_sessionmaker = None
+
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    """DATABASE_URL with the async driver for its backend"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    if backend == "postgresql" and "sslmode" in url.query:
+        # asyncpg takes ssl=..., not libpq's sslmode=...
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url.render_as_string(hide_password=False)
+
+
+def _create_async_engine():
+    """Build the async engine, with the same pool strategy as the sync one"""
+    try:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        url = os.getenv("ASYNC_DATABASE_URL") or async_database_url()
+        if make_url(url).get_backend_name() == "postgresql":
+            if DB_POOL_MODE == "pgbouncer":
+                # Transaction poolers hand each transaction a different server
+                # connection, so asyncpg must not reuse prepared statements
+                engine = create_async_engine(url, poolclass=NullPool, connect_args={
+                    "statement_cache_size": 0,
+                    "prepared_statement_cache_size": 0,
+                    "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+                })
+            elif DB_POOL_MODE == "null":
+                engine = create_async_engine(url, poolclass=NullPool)
+            else:
+                engine = create_async_engine(
+                    url,
+                    pool_pre_ping=True,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW
+                )
+        else:
+            engine = create_async_engine(url)
+        print(f"✓ Async {engine.dialect.name} engine created ({engine.dialect.driver})", file=sys.stderr)
+        return engine
+
+    except Exception as e:
+        print(f"🔥 Failed to create async database engine: {e}", file=sys.stderr)
+        print(f"⚠️  Async endpoints will return errors (is {'/'.join(ASYNC_DRIVERS.values())} installed?)",
+              file=sys.stderr)
+        return None
+
+
+def get_async_engine():
+    """The shared async engine, created on first use; None if creation failed"""
+    global _async_engine, _async_engine_created, _async_sessionmaker
+    if not _async_engine_created:
+        with _engine_lock:
+            if not _async_engine_created:
+                _async_engine = _create_async_engine()
+                if _async_engine is not None:
+                    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+                    # Objects stay readable after commit without another round trip
+                    _async_sessionmaker = async_sessionmaker(
+                        bind=_async_engine, autoflush=False, expire_on_commit=False
+                    )
+                _async_engine_created = True
+    return _async_engine
 
 Base = declarative_base()
 
-print(f"✓ Database module initialized", file=sys.stderr)
+
+def warmup(connections: int = DB_WARMUP) -> int:
+    """Open up to `connections` pooled connections ahead of the first request
+
+    Only useful with a connection pool (queue mode); returns how many
+    connections were checked.
+    """
+    engine = get_engine()
+    if engine is None or connections <= 0 or isinstance(engine.pool, NullPool):
+        return 0
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        print(f"⚠ Database warmup stopped after {len(opened)} connection(s): {e}", file=sys.stderr)
+    finally:
+        for conn in opened:
+            conn.close()  # back to the pool, still open
+    print(f"✓ Warmed up {len(opened)} database connection(s)", file=sys.stderr)
+    return len(opened)
+
+
+def _pool_counts(engine, created: bool):
+    if not created:
+        return {"engine": "not created"}
+    if engine is None:
+        return {"engine": "unavailable"}
+    pool = engine.pool
+    status = {"engine": "created", "pool": type(pool).__name__}
+    for attr in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, attr):
+            status[attr] = getattr(pool, attr)()
+    return status
+
+
+def pool_status():
+    """Pool class and checkout counts, for the metrics endpoint"""
+    status = {"mode": DB_POOL_MODE, **_pool_counts(_engine, _engine_created)}
+    status["async"] = _pool_counts(_async_engine.sync_engine if _async_engine else None, _async_engine_created)
+    return status
+
+
+_first_session_hooks = []
+_first_session_lock = threading.Lock()
+
+
+def on_first_session(func):
+    """Run func(engine) once, before the first session is handed out
+
+    Lets startup work that needs a connection (the schema check) wait
+    for the first request that uses the database.
+    """
+    _first_session_hooks.append(func)
+
+
+def _run_first_session_hooks():
+    with _first_session_lock:
+        while _first_session_hooks:
+            _first_session_hooks.pop(0)(get_engine())
 
 
 def get_db():
     """Dependency for getting database session"""
-    if engine is None:
+    if get_engine() is None:
         # Fail fast when endpoints actually need DB
         raise RuntimeError("Database engine is not available. Check logs for initialization errors.")
+    if _first_session_hooks:
+        _run_first_session_hooks()
     db = SessionLocal()
     try:
         yield db
@@ -77,8 +274,19 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency for getting an AsyncSession"""
+    if get_async_engine() is None:
+        raise RuntimeError("Async database engine is not available. Check logs for initialization errors.")
+    if _first_session_hooks:
+        await asyncio.to_thread(_run_first_session_hooks)
+    async with _async_sessionmaker() as db:
+        yield db
+
+
 def init_db():
     """Initialize database tables"""
+    engine = get_engine()
     if engine is None:
         print(f"⚠️  Cannot initialize tables (no engine)", file=sys.stderr)
         return
@@ -0,0 +1,241 @@
+"""
+Query plan audit for crud queries
+Seeds a scratch database with a realistic volume of drivers, reports,
+shift rows and edits, runs every crud/auth query the API uses while
+capturing the SQL it emits, then EXPLAINs each statement. Exits with
+status 1 if any plan does a sequential scan of a large table.
+
+Usage:
+    python explain_audit.py                       # temporary SQLite file
+    python explain_audit.py --database-url URL    # empty scratch database, e.g. PostgreSQL
+
+Never point it at a database with real data: it creates tables, seeds
+rows and runs the delete queries.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, List, Tuple
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+
+# Tables that grow with usage; a full scan of these is a failure
+LARGE_TABLES = ("shift_reports", "salary_reports", "shift_rows", "shift_edits", "pdf_jobs")
+
+
+def seed(engine, models, reports: int, rows_per_report: int):
+    """Insert drivers, users, reports, rows, edits, salary reports and PDF jobs in bulk"""
+    from sqlalchemy import insert
+
+    base = datetime(2024, 1, 1)
+    drivers = 50
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"email": f"user{i}@example.com", "username": f"user{i}", "hashed_password": "x",
+             "is_active": True, "is_superuser": False, "created_at": base, "updated_at": base}
+            for i in range(1, 201)
+        ])
+        conn.execute(insert(models.Driver), [
+            {"name": f"Driver {i}", "driver_id": f"{1000 + i}", "commission_percentage": 45.0,
+             "is_default": False, "created_at": base + timedelta(days=i), "updated_at": base}
+            for i in range(1, drivers + 1)
+        ])
+        conn.execute(insert(models.ShiftReport), [
+            {"driver_id": i % drivers + 1, "file_name": f"shift_{i}.dat", "report_date": base + timedelta(hours=i),
+             "data": {"columns": ["Kontant"], "row_count": rows_per_report}, "summary": {},
+             "created_at": base + timedelta(minutes=i), "updated_at": base}
+            for i in range(1, reports + 1)
+        ])
+        conn.execute(insert(models.ShiftRow), [
+            {"shift_report_id": r, "row_index": j, "loyve": f"R-{r % 20}", "skiftnr": str(r * 10 + j),
+             "driver": f"{1000 + r % drivers + 1}", "start_dato": base + timedelta(minutes=r, seconds=j),
+             "slutt_dato": base + timedelta(minutes=r + 1), "kontant": 100.0, "kreditt": 200.0,
+             "bomtur": 0.0, "subtotal": 300.0, "tips": 0.0, "raw": None}
+            for r in range(1, reports + 1) for j in range(rows_per_report)
+        ])
+        conn.execute(insert(models.ShiftEdit), [
+            {"shift_report_id": r, "row_index": 0, "column_name": "Kontant", "new_value": "1",
+             "timestamp": base}
+            for r in range(1, reports + 1, 10)
+        ])
+        conn.execute(insert(models.SalaryReport), [
+            {"driver_id": i % drivers + 1, "report_period": (base + timedelta(days=31 * (i % 24))).strftime("%B %Y"),
+             "file_names": [], "data": {}, "created_at": base + timedelta(minutes=i), "updated_at": base}
+            for i in range(1, reports // 2 + 1)
+        ])
+        conn.execute(insert(models.PdfJob), [
+            {"report_type": "shift", "report_id": i, "status": "done" if i % 100 else "queued",
+             "attempts": 1, "max_attempts": 3, "run_after": base + timedelta(minutes=i),
+             "created_at": base + timedelta(minutes=i), "updated_at": base}
+            for i in range(1, reports + 1)
+        ])
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql("ANALYZE")
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+
+def audited_queries(crud, auth, pdf_jobs, reports: int) -> List[Tuple[str, Callable[[Any], Any]]]:
+    """(name, fn(db)) for every query path the API uses"""
+    mid = reports // 2
+    start, end = datetime(2024, 1, 5), datetime(2024, 1, 6)
+
+    def deep_cursor(page_func, **kwargs):
+        # Fetch a page far into the history, the way a client following cursors would
+        def run(db):
+            _, next_cursor, _ = page_func(db, limit=50, **kwargs)
+            for _ in range(3):
+                _, next_cursor, _ = page_func(db, limit=50, cursor=next_cursor, **kwargs)
+            return next_cursor
+        return run
+
+    return [
+        ("auth.get_user_by_username", lambda db: auth.get_user_by_username(db, "user100")),
+        ("auth.get_user_by_email", lambda db: auth.get_user_by_email(db, "user100@example.com")),
+        ("crud.get_driver", lambda db: crud.get_driver(db, 10)),
+        ("crud.get_drivers_page", lambda db: crud.get_drivers_page(db, limit=20)),
+        ("crud.get_shift_report", lambda db: crud.get_shift_report(db, mid)),
+        ("ShiftReport.edits", lambda db: crud.get_shift_report(db, 11).edits),
+        ("crud.get_shift_reports_page", lambda db: crud.get_shift_reports_page(db, limit=50)),
+        ("crud.get_shift_reports_page(driver_id)", lambda db: crud.get_shift_reports_page(db, driver_id=7, limit=50)),
+        ("crud.get_shift_reports_page(cursor)", deep_cursor(crud.get_shift_reports_page)),
+        ("crud.get_shift_reports_page(driver_id, cursor)", deep_cursor(crud.get_shift_reports_page, driver_id=7)),
+        ("crud.get_shift_rows", lambda db: crud.get_shift_rows(db, mid, limit=100)),
+        ("crud.get_shift_report_records", lambda db: crud.get_shift_report_records(db, crud.get_shift_report(db, mid), limit=100)),
+        ("crud.get_shift_row_totals(report_id)", lambda db: crud.get_shift_row_totals(db, report_id=mid)),
+        ("crud.get_shift_row_totals(driver, period)", lambda db: crud.get_shift_row_totals(db, driver="1007", start=start, end=end)),
+        ("crud.get_shift_row_totals(period)", lambda db: crud.get_shift_row_totals(db, start=start, end=end)),
+        ("crud.get_shift_row_totals_by_driver(period)", lambda db: crud.get_shift_row_totals_by_driver(db, start, end)),
+        ("crud.get_shift_row_file_names(driver, period)",
+         lambda db: crud.get_shift_row_file_names(db, driver="1007", start=start, end=end)),
+        ("crud.get_shift_row_file_names_by_driver(period)",
+         lambda db: crud.get_shift_row_file_names_by_driver(db, start, end)),
+        ("crud.get_salary_report", lambda db: crud.get_salary_report(db, mid // 2)),
+        ("crud.get_salary_reports_page", lambda db: crud.get_salary_reports_page(db, limit=50)),
+        ("crud.get_salary_reports_page(driver_id)", lambda db: crud.get_salary_reports_page(db, driver_id=7, limit=50)),
+        ("crud.get_salary_reports_page(report_period)", lambda db: crud.get_salary_reports_page(db, report_period="March 2024", limit=50)),
+        ("crud.get_salary_reports_page(driver_id, report_period)",
+         lambda db: crud.get_salary_reports_page(db, driver_id=7, report_period="March 2024", limit=50)),
+        ("crud.get_salary_reports_page(cursor)", deep_cursor(crud.get_salary_reports_page)),
+        ("pdf_jobs.enqueue", lambda db: pdf_jobs.enqueue(db, "shift", mid)),
+        ("pdf_jobs.get_job", lambda db: pdf_jobs.get_job(db, mid)),
+        ("pdf_jobs.claim", pdf_jobs.claim),
+        ("crud.delete_shift_report", lambda db: crud.delete_shift_report(db, reports)),
+        ("crud.delete_salary_report", lambda db: crud.delete_salary_report(db, 1)),
+    ]
+
+
+def capture_statements(engine, db, fn) -> List[Tuple[str, Any]]:
+    from sqlalchemy import event
+
+    statements = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and re.match(r"\s*(SELECT|UPDATE|DELETE)\b", statement, re.I):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before)
+    try:
+        fn(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+    return statements
+
+
+def sequential_scans(engine, statement: str, parameters) -> Tuple[List[str], List[str]]:
+    """(full scans of large tables, plan lines) for one statement"""
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if engine.dialect.name == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+            plan = [row[-1] for row in cursor.fetchall()]
+            scans = []
+            for line in plan:
+                match = re.match(r"SCAN (?:TABLE )?(\w+)", line)
+                if match and match.group(1) in LARGE_TABLES and "INDEX" not in line:
+                    scans.append(line)
+            return scans, plan
+
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters or ())
+        result = cursor.fetchone()[0]
+        root = (json.loads(result) if isinstance(result, str) else result)[0]["Plan"]
+        plan, scans = [], []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            line = f"{node['Node Type']} on {node['Relation Name']}" if "Relation Name" in node else node["Node Type"]
+            plan.append(line)
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in LARGE_TABLES:
+                scans.append(line)
+            stack.extend(node.get("Plans", []))
+        return scans, plan
+    finally:
+        raw.rollback()
+        raw.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="EXPLAIN every crud query and fail on sequential scans")
+    parser.add_argument("--database-url", default=None, help="empty scratch database (default: temporary SQLite)")
+    parser.add_argument("--reports", type=int, default=20000, help="shift reports to seed")
+    parser.add_argument("--rows-per-report", type=int, default=5)
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="explain_audit_")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'audit.db')}"
+
+    from database import engine, SessionLocal, Base
+    import models
+    import crud
+    import auth
+    import pdf_jobs
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if db.query(models.ShiftReport.id).first() is not None:
+            print("✗ Database already has shift reports; use an empty scratch database")
+            return 2
+
+    print(f"Seeding {args.reports} shift reports x {args.rows_per_report} rows ({engine.dialect.name})...")
+    seed(engine, models, args.reports, args.rows_per_report)
+
+    failures = 0
+    for name, fn in audited_queries(crud, auth, pdf_jobs, args.reports):
+        with SessionLocal() as db:
+            statements = capture_statements(engine, db, fn)
+
+        problems = []
+        for statement, parameters in statements:
+            scans, plan = sequential_scans(engine, statement, parameters)
+            problems.extend((statement, scan) for scan in scans)
+            if args.verbose:
+                print(f"  {' '.join(statement.split())[:120]}")
+                for line in plan:
+                    print(f"      {line}")
+
+        if problems:
+            failures += 1
+            print(f"✗ {name}")
+            for statement, scan in problems:
+                print(f"    {scan}: {' '.join(statement.split())[:160]}")
+        else:
+            print(f"✓ {name} ({len(statements)} statement(s))")
+
+    if failures:
+        print(f"\n✗ {failures} query path(s) do sequential scans on large tables")
+        return 1
+    print("\n✓ No sequential scans on large tables")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Bulk ingestion of shift files
+Parses many shift exports (SKIFTL .dat or Excel/CSV) and writes one
+ShiftReport per file plus its shift_rows. Rows from several files are
+buffered and written in batches, via COPY on PostgreSQL and executemany
+elsewhere, with one commit per batch instead of one per file.
+
+Parsing is CPU bound and can run in a process pool (INGEST_WORKERS);
+writing stays in the calling process.
+
+Usage: python ingest.py [--driver-id ID] [--parallel] FILE [FILE ...]
+"""
+from datetime import datetime
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+import os
+import sys
+import time
+
+from sqlalchemy.orm import Session
+
+import crud
+import models
+import parse_cache
+import report_storage
+import services
+
+INGEST_BATCH_ROWS = int(os.getenv("INGEST_BATCH_ROWS", "5000"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0")) or None  # None = one per CPU
+
+_parse_executor: Optional[Executor] = None
+
+
+def get_parse_executor() -> Executor:
+    """Shared process pool for parsing, created on first use
+
+    Falls back to a thread pool where processes can't be started
+    (some serverless runtimes have no working multiprocessing).
+    """
+    global _parse_executor
+    if _parse_executor is None:
+        try:
+            executor = ProcessPoolExecutor(max_workers=INGEST_WORKERS)
+            executor.submit(os.getpid).result()
+            _parse_executor = executor
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            print(f"⚠ Process pool unavailable ({e}), parsing in threads", file=sys.stderr)
+            _parse_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS)
+    return _parse_executor
+
+
+def parse_shift_file(file_name: str, source: Union[str, bytes, BinaryIO]) -> Dict[str, Any]:
+    """Parse one file into everything needed to store it as a shift report
+
+    source is a path, bytes or a seekable stream; in a worker process only
+    paths and bytes can be passed. Parse errors are returned with status
+    "error" rather than raised.
+    """
+    started = time.perf_counter()
+    result = {"file_name": file_name, "status": "ok", "error": None}
+    try:
+        df, columns, row_count = parse_cache.parse_excel_file(source)
+        stored = report_storage.write_frame(df, "shift")
+        result.update(
+            columns=columns,
+            row_count=row_count,
+            stored=stored,
+            summary=services.calculate_shift_summary(df),
+            rows=services.shift_rows_from_frame(df, include_raw=stored is None),
+        )
+    except Exception as e:
+        result.update(status="error", error=str(e), row_count=0)
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def merge_summaries(summaries: Iterable[Optional[Dict[str, float]]]) -> Dict[str, float]:
+    """Add up shift summaries of several files (every summary value is a sum)"""
+    merged: Dict[str, float] = {}
+    for summary in summaries:
+        for key, value in (summary or {}).items():
+            merged[key] = merged.get(key, 0.0) + value
+    return merged
+
+
+def write_parsed_files(
+    db: Session,
+    parsed: Iterable[Dict[str, Any]],
+    driver_id: Optional[int] = None,
+    batch_rows: int = INGEST_BATCH_ROWS
+) -> Dict[str, Any]:
+    """Store parse_shift_file results as shift reports with batched row writes"""
+    started = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []
+    pending_results: List[Dict[str, Any]] = []
+    total_rows = 0
+
+    def flush():
+        crud.bulk_insert_shift_rows(db, pending)
+        db.commit()
+        for result in pending_results:
+            result["status"] = "ok"
+        pending.clear()
+        pending_results.clear()
+
+    for item in parsed:
+        result = {
+            "file_name": item["file_name"],
+            "report_id": None,
+            "row_count": 0,
+            "status": item["status"],
+            "error": item["error"],
+            "seconds": item["seconds"],
+        }
+        results.append(result)
+        if item["status"] != "ok":
+            continue
+
+        report = models.ShiftReport(
+            driver_id=driver_id,
+            file_name=item["file_name"],
+            report_date=datetime.now(),
+            data={"columns": item["columns"], "row_count": item["row_count"], **(item.get("stored") or {})},
+            summary=item["summary"]
+        )
+        db.add(report)
+        db.flush()
+
+        rows = item["rows"]
+        pending.extend({**row, "shift_report_id": report.id} for row in rows)
+        pending_results.append(result)
+        result.update(report_id=report.id, row_count=len(rows), status="pending")
+        total_rows += len(rows)
+
+        if len(pending) >= batch_rows:
+            flush()
+
+    if pending_results:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "files": results,
+        "file_count": len(results),
+        "row_count": total_rows,
+        "elapsed_seconds": round(elapsed, 4),
+        "rows_per_second": round(total_rows / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def ingest_shift_files(
+    db: Session,
+    sources: Iterable[Tuple[str, Union[str, bytes, BinaryIO]]],
+    driver_id: Optional[int] = None,
+    batch_rows: int = INGEST_BATCH_ROWS,
+    executor: Optional[Executor] = None
+) -> Dict[str, Any]:
+    """Ingest (file_name, source) pairs as shift reports
+
+    Sources are paths, bytes or streams (paths or bytes with a process pool).
+    Files are parsed one at a time, or in parallel on executor if given,
+    and written as they come in. A file that fails to parse is reported
+    with status "error" and does not stop the rest of the batch. Returns
+    per-file row counts and timings and the total ingest time.
+    """
+    started = time.perf_counter()
+    if executor is None:
+        parsed = (parse_shift_file(name, path) for name, path in sources)
+    else:
+        sources = list(sources)
+        names = [name for name, _ in sources]
+        streams = [source for _, source in sources]
+        parsed = executor.map(parse_shift_file, names, streams)
+
+    result = write_parsed_files(db, parsed, driver_id=driver_id, batch_rows=batch_rows)
+    elapsed = time.perf_counter() - started
+    result["elapsed_seconds"] = round(elapsed, 4)
+    result["rows_per_second"] = round(result["row_count"] / elapsed, 1) if elapsed > 0 else 0.0
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database import SessionLocal
+    import migrate
+
+    parser = argparse.ArgumentParser(description="Bulk ingest shift files")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--driver-id", type=int, default=None)
+    parser.add_argument("--batch-rows", type=int, default=INGEST_BATCH_ROWS)
+    parser.add_argument("--parallel", action="store_true", help="parse files in a process pool")
+    args = parser.parse_args()
+
+    migrate.check_schema()
+    db = SessionLocal()
+    try:
+        result = ingest_shift_files(
+            db,
+            [(os.path.basename(path), path) for path in args.files],
+            driver_id=args.driver_id,
+            batch_rows=args.batch_rows,
+            executor=get_parse_executor() if args.parallel else None
+        )
+    finally:
+        db.close()
+
+    for item in result["files"]:
+        if item["status"] == "ok":
+            print(f"✓ {item['file_name']}: {item['row_count']} rows ({item['seconds']:.3f}s)")
+        else:
+            print(f"✗ {item['file_name']}: {item['error']}")
+    print(f"Ingested {result['row_count']} rows from {result['file_count']} file(s) "
+          f"in {result['elapsed_seconds']:.3f}s ({result['rows_per_second']} rows/s)")
+    sys.exit(0 if all(item["status"] == "ok" for item in result["files"]) else 1)
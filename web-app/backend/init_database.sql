@@ -64,6 +64,7 @@ CREATE TABLE IF NOT EXISTS drivers (
 );
 
 CREATE INDEX IF NOT EXISTS idx_drivers_driver_id ON drivers(driver_id);
+CREATE INDEX IF NOT EXISTS ix_drivers_created_at_id ON drivers(created_at, id);
 
 -- Templates table
 CREATE TABLE IF NOT EXISTS templates (
@@ -91,6 +92,31 @@ CREATE TABLE IF NOT EXISTS shift_reports (
 
 CREATE INDEX IF NOT EXISTS idx_shift_reports_driver ON shift_reports(driver_id);
 CREATE INDEX IF NOT EXISTS idx_shift_reports_date ON shift_reports(report_date);
+CREATE INDEX IF NOT EXISTS ix_shift_reports_created_at_id ON shift_reports(created_at, id);
+CREATE INDEX IF NOT EXISTS ix_shift_reports_driver_created_at_id ON shift_reports(driver_id, created_at, id);
+
+-- Shift Rows table (one row per shift line of a report)
+CREATE TABLE IF NOT EXISTS shift_rows (
+    id SERIAL PRIMARY KEY,
+    shift_report_id INTEGER NOT NULL REFERENCES shift_reports(id) ON DELETE CASCADE,
+    row_index INTEGER NOT NULL,
+    loyve VARCHAR,
+    skiftnr VARCHAR,
+    driver VARCHAR,
+    start_dato TIMESTAMP,
+    slutt_dato TIMESTAMP,
+    kontant DOUBLE PRECISION DEFAULT 0,
+    kreditt DOUBLE PRECISION DEFAULT 0,
+    bomtur DOUBLE PRECISION DEFAULT 0,
+    subtotal DOUBLE PRECISION DEFAULT 0,
+    tips DOUBLE PRECISION DEFAULT 0,
+    raw JSONB
+);
+
+CREATE INDEX IF NOT EXISTS ix_shift_rows_shift_report_id ON shift_rows(shift_report_id);
+CREATE INDEX IF NOT EXISTS ix_shift_rows_loyve_skiftnr ON shift_rows(loyve, skiftnr);
+CREATE INDEX IF NOT EXISTS ix_shift_rows_start_dato ON shift_rows(start_dato);
+CREATE INDEX IF NOT EXISTS ix_shift_rows_driver_start_dato ON shift_rows(driver, start_dato);
 
 -- Shift Edits table
 CREATE TABLE IF NOT EXISTS shift_edits (
@@ -125,6 +151,41 @@ CREATE TABLE IF NOT EXISTS salary_reports (
 
 CREATE INDEX IF NOT EXISTS idx_salary_reports_driver ON salary_reports(driver_id);
 CREATE INDEX IF NOT EXISTS idx_salary_reports_period ON salary_reports(report_period);
+CREATE INDEX IF NOT EXISTS ix_salary_reports_created_at_id ON salary_reports(created_at, id);
+CREATE INDEX IF NOT EXISTS ix_salary_reports_driver_created_at_id ON salary_reports(driver_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_salary_reports_period_created_at_id ON salary_reports(report_period, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_salary_reports_driver_period ON salary_reports(driver_id, report_period);
+
+-- Revoked refresh/access token ids, kept until the token expires
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti VARCHAR(32) PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS ix_revoked_tokens_revoked_at ON revoked_tokens(revoked_at);
+
+-- Background PDF jobs (see pdf_jobs.py)
+CREATE TABLE IF NOT EXISTS pdf_jobs (
+    id SERIAL PRIMARY KEY,
+    report_type VARCHAR(16) NOT NULL,
+    report_id INTEGER NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP,
+    error TEXT,
+    pdf_path VARCHAR,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_pdf_jobs_status_run_after ON pdf_jobs(status, run_after);
+CREATE INDEX IF NOT EXISTS ix_pdf_jobs_report ON pdf_jobs(report_type, report_id);
 
 -- Create a function to automatically update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -164,6 +225,19 @@ DROP TRIGGER IF EXISTS update_salary_reports_updated_at ON salary_reports;
 CREATE TRIGGER update_salary_reports_updated_at BEFORE UPDATE ON salary_reports
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+DROP TRIGGER IF EXISTS update_pdf_jobs_updated_at ON pdf_jobs;
+CREATE TRIGGER update_pdf_jobs_updated_at BEFORE UPDATE ON pdf_jobs
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Schema version, so migrate.py and the startup check see this schema as current
+-- (keep in sync with SCHEMA_HEAD in migrate.py)
+CREATE TABLE IF NOT EXISTS alembic_version (
+    version_num VARCHAR(32) NOT NULL PRIMARY KEY
+);
+
+INSERT INTO alembic_version (version_num)
+SELECT '0005' WHERE NOT EXISTS (SELECT 1 FROM alembic_version);
+
 -- Insert default company (optional)
 INSERT INTO companies (name, org_number, address)
 VALUES ('Voss Taxi', '123456789', 'Voss, Norway')
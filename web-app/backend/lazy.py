@@ -0,0 +1,55 @@
+"""
+Deferred imports for faster cold starts
+pandas, numpy and fpdf (pulled in by services, report_storage, parse_cache
+and ingest) are the largest part of the app's import time. With
+LAZY_IMPORTS on, those modules are imported on first attribute access, so
+a serverless instance that only answers auth or list requests never loads
+them. Defaults to on under Vercel and off elsewhere.
+"""
+from typing import Any, Optional
+import importlib
+import os
+import sys
+import threading
+import types
+
+LAZY_IMPORTS = os.getenv(
+    "LAZY_IMPORTS", "true" if os.getenv("VERCEL") == "1" else "false"
+).lower() in ("1", "true", "yes")
+
+_lock = threading.RLock()
+
+
+class LazyModule:
+    """Stands in for a module and imports it the first time it is used"""
+
+    def __init__(self, name: str):
+        self.__name = name
+        self.__module: Optional[types.ModuleType] = None
+
+    def _load(self) -> types.ModuleType:
+        if self.__module is None:
+            # Endpoints run on several threads; import once
+            with _lock:
+                if self.__module is None:
+                    self.__module = importlib.import_module(self.__name)
+        return self.__module
+
+    @property
+    def loaded(self) -> bool:
+        return self.__module is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__module is not None else "not loaded"
+        return f"<lazy module {self.__name!r} ({state})>"
+
+
+def lazy_import(name: str):
+    """The module itself if LAZY_IMPORTS is off or it is already imported,
+    otherwise a LazyModule that imports it on first use"""
+    if not LAZY_IMPORTS or name in sys.modules:
+        return importlib.import_module(name)
+    return LazyModule(name)
@@ -2,25 +2,43 @@ import sys
 import os
 
 # Set up basic imports first
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
-from datetime import datetime, timedelta
-import shutil
+from datetime import datetime
+from contextlib import asynccontextmanager
+import asyncio
 import json
+import time
 
 print("✓ FastAPI imported", file=sys.stderr)
 
 # Import application modules with error handling
 try:
+    from lazy import LAZY_IMPORTS, lazy_import
     import crud
+    import crud_async
     import models
     import schemas
-    import services
     import auth
-    from database import get_db, init_db, engine
+    import auth_cache
+    import token_revocation
+    import summaries
+    import payroll
+    import pdf_jobs
+    import migrate
+    import workers
+    import database
+    from database import get_db, get_async_db, init_db, SessionLocal, on_first_session
+    # pandas/fpdf-backed modules, imported on first use with LAZY_IMPORTS
+    services = lazy_import("services")
+    ingest = lazy_import("ingest")
+    parse_cache = lazy_import("parse_cache")
+    report_storage = lazy_import("report_storage")
     print("✓ Application modules imported", file=sys.stderr)
 except Exception as e:
     print(f"✗ Error importing modules: {e}", file=sys.stderr)
@@ -28,18 +46,35 @@ except Exception as e:
     traceback.print_exc()
     raise
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Long-running servers can open pooled connections before the first request
+    if database.DB_WARMUP:
+        await asyncio.get_running_loop().run_in_executor(None, database.warmup)
+    yield
+
+
 # Create FastAPI application
-app = FastAPI(title="Voss Taxi Web App", version="1.0.0")
+app = FastAPI(title="Voss Taxi Web App", version="1.0.0", lifespan=lifespan)
 print("✓ FastAPI app created", file=sys.stderr)
 
-# Initialize database tables (non-blocking)
-try:
-    models.Base.metadata.create_all(bind=engine)
-    print("✓ Database tables checked/created", file=sys.stderr)
-except Exception as e:
-    # Tables may already exist or database may be unavailable
-    # This is non-fatal - log but continue
-    print(f"⚠ Database init warning: {e}", file=sys.stderr)
+# Check the schema version (non-blocking); migrations run at deploy time
+# with `python migrate.py`, see migrate.py
+def check_schema(bind=None):
+    try:
+        schema_status = migrate.check_schema(bind)
+        print(f"✓ Database schema {schema_status}", file=sys.stderr)
+    except Exception as e:
+        # Database may be unavailable
+        # This is non-fatal - log but continue
+        print(f"⚠ Database schema check warning: {e}", file=sys.stderr)
+
+
+if LAZY_IMPORTS:
+    # Don't connect during a cold start; check when a request first needs the DB
+    on_first_session(check_schema)
+else:
+    check_schema()
 
 # CORS middleware
 ALLOWED_ORIGINS = os.getenv(
@@ -53,6 +88,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor"],
 )
 
 # Create directories for uploads and PDFs (use /tmp in serverless)
@@ -62,47 +98,121 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(PDF_DIR, exist_ok=True)
 
 
+@app.exception_handler(workers.PoolBusyError)
+async def pool_busy_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+
+def paginate(response: Response, page_func, *args, **kwargs):
+    """Call a crud *_page function, put its cursors in headers, return the items
+
+    List bodies stay plain arrays; clients pass X-Next-Cursor or
+    X-Prev-Cursor back as ?cursor= to get the neighbouring page.
+    """
+    try:
+        page = page_func(*args, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _cursor_headers(response, *page)
+
+
+async def paginate_async(response: Response, page_func, *args, **kwargs):
+    """paginate for a crud_async *_page function"""
+    try:
+        page = await page_func(*args, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _cursor_headers(response, *page)
+
+
+def _cursor_headers(response: Response, items, next_cursor, prev_cursor):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if prev_cursor:
+        response.headers["X-Prev-Cursor"] = prev_cursor
+    return items
+
+
 # Health check
 @app.get("/")
 def read_root():
     return {"status": "ok", "message": "Voss Taxi Web App API"}
 
 
+@app.get("/api/metrics/workers")
+def get_worker_metrics():
+    """Queue depth and timings of the blocking worker pool"""
+    return workers.blocking_pool.metrics()
+
+
+@app.get("/api/metrics/db-pool")
+def get_db_pool_metrics():
+    """Connection strategy and pool checkout counts"""
+    return database.pool_status()
+
+
+@app.get("/api/metrics/auth-cache")
+def get_auth_cache_metrics():
+    """Hit rate of the authenticated-user cache and the size of the
+    revoked-token set"""
+    return {**auth_cache.cache_info(), "revocation": token_revocation.info()}
+
+
+@app.get("/api/metrics/auth-hashing")
+def get_auth_hashing_metrics():
+    """bcrypt cost, hashing pool queue and login latency percentiles"""
+    return {
+        "bcrypt_rounds": auth.BCRYPT_ROUNDS,
+        "pool": auth.hash_pool.metrics(),
+        "login_latency": auth.login_latency.summary(),
+    }
+
+
+@app.get("/api/metrics/pdf-jobs")
+def get_pdf_job_metrics(db: Session = Depends(get_db)):
+    """PDF jobs by status and the state of this process's job workers"""
+    return pdf_jobs.metrics(db)
+
+
+@app.get("/api/metrics/parse-cache")
+def get_parse_cache_metrics():
+    """Hit/miss counts and disk usage of the parsed upload cache"""
+    return parse_cache.cache_info()
+
+
 # ========== Authentication Endpoints ==========
 @app.post("/api/auth/register", response_model=schemas.User)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     # Check if username already exists
-    db_user = auth.get_user_by_username(db, username=user.username)
-    if db_user:
+    if await run_in_threadpool(auth.get_user_by_username, db, username=user.username):
         raise HTTPException(status_code=400, detail="Username already registered")
 
     # Check if email already exists
-    db_user = auth.get_user_by_email(db, email=user.email)
-    if db_user:
+    if await run_in_threadpool(auth.get_user_by_email, db, email=user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    # Create new user
-    return auth.create_user(db=db, user=user)
+    # Create new user, hashing on the bcrypt pool
+    hashed_password = await auth.get_password_hash_async(user.password)
+    return await run_in_threadpool(auth.create_user, db, user, hashed_password)
 
 
 @app.post("/api/auth/login", response_model=schemas.Token)
-def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db)):
-    """Login and get access token"""
-    user = auth.authenticate_user(db, login_data.username, login_data.password)
-    if not user:
-        raise HTTPException(
-            status_code=401,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+async def login(login_data: schemas.LoginRequest, db: Session = Depends(get_db)):
+    """Login and get an access token and a refresh token"""
+    started = time.perf_counter()
+    try:
+        user = await auth.authenticate_user_async(db, login_data.username, login_data.password)
+        if not user:
+            raise HTTPException(
+                status_code=401,
+                detail="Incorrect username or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
 
-    return {"access_token": access_token, "token_type": "bearer"}
+        return auth.create_token_pair(user)
+    finally:
+        auth.login_latency.record(time.perf_counter() - started)
 
 
 @app.get("/api/auth/me", response_model=schemas.User)
@@ -111,144 +221,164 @@ async def get_current_user_info(current_user: models.User = Depends(auth.get_cur
     return current_user
 
 
+@app.post("/api/auth/refresh", response_model=schemas.Token)
+def refresh_token(refresh_data: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    """New access token for a refresh token, without a password check"""
+    access_token = auth.refresh_access_token(db, refresh_data.refresh_token)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_data.refresh_token}
+
+
 @app.post("/api/auth/logout")
-async def logout():
-    """Logout (client should delete token)"""
-    return {"message": "Successfully logged out"}
+def logout(
+    logout_data: Optional[schemas.LogoutRequest] = None,
+    token: Optional[str] = Depends(auth.optional_oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """Logout: revoke the bearer token and the refresh token, if given"""
+    revoked = auth.revoke_tokens(
+        db, access_token=token, refresh_token=logout_data.refresh_token if logout_data else None
+    )
+    return {"message": "Successfully logged out", "revoked": revoked}
 
 
 # ========== Company Endpoints ==========
 @app.get("/api/companies", response_model=List[schemas.Company])
-def get_companies(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_companies(db, skip=skip, limit=limit)
+async def get_companies(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.get_companies(db, skip=skip, limit=limit)
 
 
 @app.get("/api/companies/{company_id}", response_model=schemas.Company)
-def get_company(company_id: int, db: Session = Depends(get_db)):
-    company = crud.get_company(db, company_id)
+async def get_company(company_id: int, db: AsyncSession = Depends(get_async_db)):
+    company = await crud_async.get_company(db, company_id)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     return company
 
 
 @app.post("/api/companies", response_model=schemas.Company)
-def create_company(company: schemas.CompanyCreate, db: Session = Depends(get_db)):
-    return crud.create_company(db, company)
+async def create_company(company: schemas.CompanyCreate, db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.create_company(db, company)
 
 
 @app.put("/api/companies/{company_id}", response_model=schemas.Company)
-def update_company(company_id: int, company: schemas.CompanyUpdate, db: Session = Depends(get_db)):
-    updated = crud.update_company(db, company_id, company)
+async def update_company(company_id: int, company: schemas.CompanyUpdate, db: AsyncSession = Depends(get_async_db)):
+    updated = await crud_async.update_company(db, company_id, company)
     if not updated:
         raise HTTPException(status_code=404, detail="Company not found")
     return updated
 
 
 @app.delete("/api/companies/{company_id}")
-def delete_company(company_id: int, db: Session = Depends(get_db)):
-    if not crud.delete_company(db, company_id):
+async def delete_company(company_id: int, db: AsyncSession = Depends(get_async_db)):
+    if not await crud_async.delete_company(db, company_id):
         raise HTTPException(status_code=404, detail="Company not found")
     return {"message": "Company deleted successfully"}
 
 
 # ========== Driver Endpoints ==========
 @app.get("/api/drivers", response_model=List[schemas.Driver])
-def get_drivers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_drivers(db, skip=skip, limit=limit)
+async def get_drivers(
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await paginate_async(response, crud_async.get_drivers_page, db, limit=limit, cursor=cursor, skip=skip)
 
 
 @app.get("/api/drivers/{driver_id}", response_model=schemas.Driver)
-def get_driver(driver_id: int, db: Session = Depends(get_db)):
-    driver = crud.get_driver(db, driver_id)
+async def get_driver(driver_id: int, db: AsyncSession = Depends(get_async_db)):
+    driver = await crud_async.get_driver(db, driver_id)
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
     return driver
 
 
 @app.post("/api/drivers", response_model=schemas.Driver)
-def create_driver(driver: schemas.DriverCreate, db: Session = Depends(get_db)):
-    return crud.create_driver(db, driver)
+async def create_driver(driver: schemas.DriverCreate, db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.create_driver(db, driver)
 
 
 @app.put("/api/drivers/{driver_id}", response_model=schemas.Driver)
-def update_driver(driver_id: int, driver: schemas.DriverUpdate, db: Session = Depends(get_db)):
-    updated = crud.update_driver(db, driver_id, driver)
+async def update_driver(driver_id: int, driver: schemas.DriverUpdate, db: AsyncSession = Depends(get_async_db)):
+    updated = await crud_async.update_driver(db, driver_id, driver)
     if not updated:
         raise HTTPException(status_code=404, detail="Driver not found")
     return updated
 
 
 @app.delete("/api/drivers/{driver_id}")
-def delete_driver(driver_id: int, db: Session = Depends(get_db)):
-    if not crud.delete_driver(db, driver_id):
+async def delete_driver(driver_id: int, db: AsyncSession = Depends(get_async_db)):
+    if not await crud_async.delete_driver(db, driver_id):
         raise HTTPException(status_code=404, detail="Driver not found")
     return {"message": "Driver deleted successfully"}
 
 
 # ========== Bank Account Endpoints ==========
 @app.get("/api/bank-accounts", response_model=List[schemas.BankAccount])
-def get_bank_accounts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_bank_accounts(db, skip=skip, limit=limit)
+async def get_bank_accounts(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.get_bank_accounts(db, skip=skip, limit=limit)
 
 
 @app.get("/api/bank-accounts/{account_id}", response_model=schemas.BankAccount)
-def get_bank_account(account_id: int, db: Session = Depends(get_db)):
-    account = crud.get_bank_account(db, account_id)
+async def get_bank_account(account_id: int, db: AsyncSession = Depends(get_async_db)):
+    account = await crud_async.get_bank_account(db, account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Bank account not found")
     return account
 
 
 @app.post("/api/bank-accounts", response_model=schemas.BankAccount)
-def create_bank_account(account: schemas.BankAccountCreate, db: Session = Depends(get_db)):
-    return crud.create_bank_account(db, account)
+async def create_bank_account(account: schemas.BankAccountCreate, db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.create_bank_account(db, account)
 
 
 @app.put("/api/bank-accounts/{account_id}", response_model=schemas.BankAccount)
-def update_bank_account(account_id: int, account: schemas.BankAccountUpdate, db: Session = Depends(get_db)):
-    updated = crud.update_bank_account(db, account_id, account)
+async def update_bank_account(account_id: int, account: schemas.BankAccountUpdate, db: AsyncSession = Depends(get_async_db)):
+    updated = await crud_async.update_bank_account(db, account_id, account)
     if not updated:
         raise HTTPException(status_code=404, detail="Bank account not found")
     return updated
 
 
 @app.delete("/api/bank-accounts/{account_id}")
-def delete_bank_account(account_id: int, db: Session = Depends(get_db)):
-    if not crud.delete_bank_account(db, account_id):
+async def delete_bank_account(account_id: int, db: AsyncSession = Depends(get_async_db)):
+    if not await crud_async.delete_bank_account(db, account_id):
         raise HTTPException(status_code=404, detail="Bank account not found")
     return {"message": "Bank account deleted successfully"}
 
 
 # ========== Template Endpoints ==========
 @app.get("/api/templates", response_model=List[schemas.Template])
-def get_templates(template_type: Optional[str] = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_templates(db, template_type=template_type, skip=skip, limit=limit)
+async def get_templates(template_type: Optional[str] = None, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.get_templates(db, template_type=template_type, skip=skip, limit=limit)
 
 
 @app.get("/api/templates/{template_id}", response_model=schemas.Template)
-def get_template(template_id: int, db: Session = Depends(get_db)):
-    template = crud.get_template(db, template_id)
+async def get_template(template_id: int, db: AsyncSession = Depends(get_async_db)):
+    template = await crud_async.get_template(db, template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
     return template
 
 
 @app.post("/api/templates", response_model=schemas.Template)
-def create_template(template: schemas.TemplateCreate, db: Session = Depends(get_db)):
-    return crud.create_template(db, template)
+async def create_template(template: schemas.TemplateCreate, db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.create_template(db, template)
 
 
 @app.put("/api/templates/{template_id}", response_model=schemas.Template)
-def update_template(template_id: int, template: schemas.TemplateUpdate, db: Session = Depends(get_db)):
-    updated = crud.update_template(db, template_id, template)
+async def update_template(template_id: int, template: schemas.TemplateUpdate, db: AsyncSession = Depends(get_async_db)):
+    updated = await crud_async.update_template(db, template_id, template)
     if not updated:
         raise HTTPException(status_code=404, detail="Template not found")
     return updated
 
 
 @app.delete("/api/templates/{template_id}")
-def delete_template(template_id: int, db: Session = Depends(get_db)):
-    if not crud.delete_template(db, template_id):
+async def delete_template(template_id: int, db: AsyncSession = Depends(get_async_db)):
+    if not await crud_async.delete_template(db, template_id):
         raise HTTPException(status_code=404, detail="Template not found")
     return {"message": "Template deleted successfully"}
 
@@ -257,20 +387,17 @@ def delete_template(template_id: int, db: Session = Depends(get_db)):
 @app.post("/api/upload/parse", response_model=schemas.FileUploadResponse)
 async def parse_uploaded_file(file: UploadFile = File(...)):
     """Parse uploaded Excel/DAT file and return preview"""
-    try:
-        # Save uploaded file temporarily
-        temp_path = f"{UPLOAD_DIR}/temp_{datetime.now().timestamp()}_{file.filename}"
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    return await workers.run_blocking(_parse_uploaded_file, file)
 
-        # Parse file
-        df, columns, row_count = services.parse_excel_file(temp_path)
 
-        # Generate preview (first 10 rows)
-        preview = df.head(10).to_dict('records')
+def _parse_uploaded_file(file: UploadFile):
+    try:
+        # Read only the header and first 10 rows, from memory
+        with services.spool_stream(file.file) as stream:
+            df, columns, row_count = parse_cache.preview_excel_file(stream, nrows=10)
 
-        # Clean up temp file
-        os.remove(temp_path)
+        # Generate preview (first 10 rows)
+        preview = services.dataframe_to_records(df)
 
         return {
             "filename": file.filename,
@@ -278,19 +405,30 @@ async def parse_uploaded_file(file: UploadFile = File(...)):
             "row_count": row_count,
             "preview": preview
         }
+    except services.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error parsing file: {str(e)}")
 
 
 # ========== Shift Report Endpoints ==========
-@app.get("/api/reports/shift", response_model=List[schemas.ShiftReport])
-def get_shift_reports(driver_id: Optional[int] = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_shift_reports(db, driver_id=driver_id, skip=skip, limit=limit)
+@app.get("/api/reports/shift", response_model=List[schemas.ShiftReportListItem])
+async def get_shift_reports(
+    response: Response,
+    driver_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await paginate_async(
+        response, crud_async.get_shift_reports_page, db, driver_id=driver_id, limit=limit, cursor=cursor, skip=skip
+    )
 
 
 @app.get("/api/reports/shift/{report_id}", response_model=schemas.ShiftReport)
-def get_shift_report(report_id: int, db: Session = Depends(get_db)):
-    report = crud.get_shift_report(db, report_id)
+async def get_shift_report(report_id: int, db: AsyncSession = Depends(get_async_db)):
+    report = await crud_async.get_shift_report(db, report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Shift report not found")
     return report
@@ -303,45 +441,172 @@ async def create_shift_report(
     db: Session = Depends(get_db)
 ):
     """Create a new shift report from uploaded file"""
-    try:
-        # Save uploaded file
-        file_path = f"{UPLOAD_DIR}/{datetime.now().timestamp()}_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    return await workers.run_blocking(_create_shift_report, file, driver_id, db)
 
-        # Parse file
-        df, columns, row_count = services.parse_excel_file(file_path)
+
+def _create_shift_report(file: UploadFile, driver_id: Optional[int], db: Session):
+    try:
+        # Parse file straight from the upload stream
+        with services.spool_stream(file.file) as stream:
+            df, columns, row_count = parse_cache.parse_excel_file(stream)
 
         # Calculate summary
         summary = services.calculate_shift_summary(df)
 
-        # Convert dataframe to dict for storage
-        data = df.to_dict('records')
+        # Rows are stored normalized in shift_rows, the report keeps the layout.
+        # In columnar mode the full rows go to Parquet instead of shift_rows.raw
+        data = {"columns": columns, "row_count": row_count}
+        stored = report_storage.write_frame(df, "shift")
+        if stored:
+            data.update(stored)
+        rows = services.shift_rows_from_frame(df, include_raw=stored is None)
 
         # Create report
         report_create = schemas.ShiftReportCreate(
             driver_id=driver_id,
             file_name=file.filename,
             report_date=datetime.now(),
-            data={"rows": data, "columns": columns},
+            data=data,
             summary=summary
         )
 
-        report = crud.create_shift_report(db, report_create)
+        report = crud.create_shift_report(db, report_create, rows=rows)
         return report
 
+    except services.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error creating shift report: {str(e)}")
 
 
-@app.post("/api/reports/shift/{report_id}/edits", response_model=schemas.ShiftEdit)
-def create_shift_edit(report_id: int, edit: schemas.ShiftEditCreate, db: Session = Depends(get_db)):
-    """Add an edit to a shift report"""
+@app.post("/api/reports/shift/bulk", response_model=schemas.BulkIngestResponse)
+async def bulk_create_shift_reports(
+    files: List[UploadFile] = File(...),
+    driver_id: Optional[int] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """Create one shift report per uploaded file, writing rows in batches"""
+    return await workers.run_blocking(_bulk_create_shift_reports, files, driver_id, db)
+
+
+def _bulk_create_shift_reports(files: List[UploadFile], driver_id: Optional[int], db: Session):
+    sources = []
+    try:
+        for file in files:
+            sources.append((file.filename, services.spool_stream(file.file)))
+        return ingest.ingest_shift_files(db, sources, driver_id=driver_id)
+    except services.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Error ingesting shift reports: {str(e)}")
+    finally:
+        for _, stream in sources:
+            stream.close()
+
+
+@app.post("/api/reports/shift/batch")
+async def batch_ingest_shift_reports(
+    files: List[UploadFile] = File(...),
+    driver_id: Optional[int] = Form(None)
+):
+    """Parse uploaded files in parallel and stream each file's status as NDJSON
+
+    One line {"event": "parsed", ...} is sent per file as soon as it is
+    parsed, followed by a final {"event": "done", ...} line with the stored
+    report IDs and the merged summary of all files.
+    """
+    # Worker processes get the file contents as bytes, nothing touches disk
+    sources = []
+    try:
+        for file in files:
+            with await workers.run_blocking(services.spool_stream, file.file) as stream:
+                sources.append((file.filename, stream.read()))
+    except services.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        executor = ingest.get_parse_executor()
+        tasks = [
+            loop.run_in_executor(executor, ingest.parse_shift_file, name, content)
+            for name, content in sources
+        ]
+
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            yield json.dumps({
+                "event": "parsed",
+                "file_name": item["file_name"],
+                "status": item["status"],
+                "error": item["error"],
+                "row_count": item["row_count"],
+                "seconds": item["seconds"],
+            }) + "\n"
+
+        # Store in upload order once everything is parsed
+        parsed = [task.result() for task in tasks]
+
+        def store():
+            db = SessionLocal()
+            try:
+                return ingest.write_parsed_files(db, parsed, driver_id=driver_id)
+            finally:
+                db.close()
+
+        try:
+            result = await workers.run_blocking(store)
+        except Exception as e:
+            yield json.dumps({"event": "error", "error": f"Error storing shift reports: {str(e)}"}) + "\n"
+            return
+
+        result["summary"] = ingest.merge_summaries(
+            item.get("summary") for item in parsed if item["status"] == "ok"
+        )
+        yield json.dumps({"event": "done", **result}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def _rows_page(data, rows, selected, offset, limit, total):
+    available = data.get("columns") or (list(rows[0]) if rows else [])
+    return {
+        "columns": [col for col in selected if col in available] if selected else available,
+        "rows": rows,
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+    }
+
+
+def _split_columns(columns: Optional[str]) -> Optional[List[str]]:
+    return [col.strip() for col in columns.split(",") if col.strip()] if columns else None
+
+
+@app.get("/api/reports/shift/{report_id}/rows", response_model=schemas.ReportRowsPage)
+def get_shift_report_rows(
+    report_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    columns: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """One page of a shift report's rows; columns is a comma-separated list to read only those"""
     report = crud.get_shift_report(db, report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Shift report not found")
+    selected = _split_columns(columns)
+    rows = crud.get_shift_report_records(db, report, selected, offset, limit)
+    return _rows_page(report.data, rows, selected, offset, limit, crud.count_shift_report_rows(db, report))
+
 
-    return crud.create_shift_edit(db, report_id, edit)
+@app.post("/api/reports/shift/{report_id}/edits", response_model=schemas.ShiftEdit)
+async def create_shift_edit(report_id: int, edit: schemas.ShiftEditCreate, db: AsyncSession = Depends(get_async_db)):
+    """Add an edit to a shift report"""
+    if not await crud_async.shift_report_exists(db, report_id):
+        raise HTTPException(status_code=404, detail="Shift report not found")
+
+    return await crud_async.create_shift_edit(db, report_id, edit)
 
 
 @app.delete("/api/reports/shift/{report_id}")
@@ -352,14 +617,25 @@ def delete_shift_report(report_id: int, db: Session = Depends(get_db)):
 
 
 # ========== Salary Report Endpoints ==========
-@app.get("/api/reports/salary", response_model=List[schemas.SalaryReport])
-def get_salary_reports(driver_id: Optional[int] = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_salary_reports(db, driver_id=driver_id, skip=skip, limit=limit)
+@app.get("/api/reports/salary", response_model=List[schemas.SalaryReportListItem])
+async def get_salary_reports(
+    response: Response,
+    driver_id: Optional[int] = None,
+    report_period: Optional[str] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await paginate_async(
+        response, crud_async.get_salary_reports_page, db,
+        driver_id=driver_id, report_period=report_period, limit=limit, cursor=cursor, skip=skip
+    )
 
 
 @app.get("/api/reports/salary/{report_id}", response_model=schemas.SalaryReport)
-def get_salary_report(report_id: int, db: Session = Depends(get_db)):
-    report = crud.get_salary_report(db, report_id)
+async def get_salary_report(report_id: int, db: AsyncSession = Depends(get_async_db)):
+    report = await crud_async.get_salary_report(db, report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Salary report not found")
     return report
@@ -373,6 +649,10 @@ async def create_salary_report(
     db: Session = Depends(get_db)
 ):
     """Create a new salary report from uploaded files"""
+    return await workers.run_blocking(_create_salary_report, driver_id, files, report_period, db)
+
+
+def _create_salary_report(driver_id: int, files: List[UploadFile], report_period: Optional[str], db: Session):
     try:
         # Get driver info
         driver = crud.get_driver(db, driver_id)
@@ -384,13 +664,9 @@ async def create_salary_report(
         file_names = []
 
         for file in files:
-            # Save uploaded file
-            file_path = f"{UPLOAD_DIR}/{datetime.now().timestamp()}_{file.filename}"
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-
-            # Parse file
-            df, _, _ = services.parse_excel_file(file_path)
+            # Parse file straight from the upload stream
+            with services.spool_stream(file.file) as stream:
+                df, _, _ = parse_cache.parse_excel_file(stream)
 
             # Filter by driver if needed
             df = services.filter_dataframe_by_driver(df, driver.driver_id)
@@ -415,7 +691,11 @@ async def create_salary_report(
             net_salary=salary_calc["net_salary"],
             cash_amount=salary_calc["cash_amount"],
             tips=salary_calc["tips"],
-            data={"rows": combined_df.to_dict('records'), "breakdown": salary_calc["breakdown"]}
+            data={
+                **(report_storage.write_frame(combined_df, "salary")
+                   or {"rows": services.dataframe_to_records(combined_df)}),
+                "breakdown": salary_calc["breakdown"]
+            }
         )
 
         report = crud.create_salary_report(db, report_create)
@@ -425,6 +705,108 @@ async def create_salary_report(
         raise HTTPException(status_code=400, detail=f"Error creating salary report: {str(e)}")
 
 
+def _salary_range(period: Optional[str], start: Optional[datetime], end: Optional[datetime]):
+    try:
+        return summaries.resolve_period(period, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/salary/calculate", response_model=schemas.SalaryCalculation)
+def calculate_salary_from_rows(
+    driver_id: int,
+    period: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """Salary for a driver and period from ingested shift rows, without creating a report"""
+    driver = crud.get_driver(db, driver_id)
+    if not driver:
+        raise HTTPException(status_code=404, detail="Driver not found")
+    start, end = _salary_range(period, start, end)
+    return {"driver_id": driver_id, "start": start, "end": end,
+            **crud.calculate_salary_from_rows(db, driver, start, end)}
+
+
+@app.post("/api/reports/salary/from-rows", response_model=schemas.SalaryReport)
+def create_salary_report_from_rows(request: schemas.SalaryFromRowsRequest, db: Session = Depends(get_db)):
+    """Create a salary report from already-ingested shift rows (no upload, no pandas)"""
+    driver = crud.get_driver(db, request.driver_id)
+    if not driver:
+        raise HTTPException(status_code=404, detail="Driver not found")
+    start, end = _salary_range(request.period, request.start, request.end)
+    return crud.create_salary_report_from_rows(db, driver, start, end, request.report_period)
+
+
+@app.post("/api/payroll/run")
+async def run_payroll(request: schemas.PayrollRunRequest):
+    """Salary reports and PDFs for the whole fleet, with progress streamed as NDJSON
+
+    Sends {"event": "planned", ...} once the per-driver totals are summed,
+    {"event": "reports", ...} once all reports are written in one commit,
+    one {"event": "pdf", ...} line per PDF as it finishes rendering, and a
+    final {"event": "done", ...} line.
+    """
+    start, end = _salary_range(request.period, request.start, request.end)
+
+    def in_session(func, *args):
+        db = SessionLocal()
+        try:
+            return func(db, *args)
+        finally:
+            db.close()
+
+    async def events():
+        started = time.perf_counter()
+        try:
+            plan = await workers.run_blocking(
+                in_session, payroll.plan_payroll, start, end, request.report_period, request.replace
+            )
+            yield json.dumps(payroll.planned_event(plan)) + "\n"
+            written = await workers.run_blocking(in_session, payroll.write_reports, plan)
+            yield json.dumps(payroll.reports_event(written)) + "\n"
+
+            rendered = []
+            if request.generate_pdfs and written:
+                company = await workers.run_blocking(in_session, pdf_jobs.company_info)
+                loop = asyncio.get_running_loop()
+                executor = ingest.get_parse_executor()
+                tasks = [
+                    loop.run_in_executor(executor, payroll.render_payroll_pdf, job)
+                    for job in payroll.pdf_requests(written, company, PDF_DIR)
+                ]
+                for next_done in asyncio.as_completed(tasks):
+                    item = await next_done
+                    rendered.append(item)
+                    yield json.dumps({"event": "pdf", **item}) + "\n"
+                await workers.run_blocking(in_session, payroll.save_pdf_paths, rendered)
+        except Exception as e:
+            yield json.dumps({"event": "error", "error": f"Error running payroll: {str(e)}"}) + "\n"
+            return
+
+        yield json.dumps(payroll.done_event(plan, written, rendered, time.perf_counter() - started)) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.get("/api/reports/salary/{report_id}/rows", response_model=schemas.ReportRowsPage)
+def get_salary_report_rows(
+    report_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    columns: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """One page of a salary report's rows; columns is a comma-separated list to read only those"""
+    report = crud.get_salary_report(db, report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Salary report not found")
+    selected = _split_columns(columns)
+    rows = crud.get_salary_report_records(report, selected, offset, limit)
+    return _rows_page(report.data, rows, selected, offset, limit, crud.count_salary_report_rows(report))
+
+
 @app.delete("/api/reports/salary/{report_id}")
 def delete_salary_report(report_id: int, db: Session = Depends(get_db)):
     if not crud.delete_salary_report(db, report_id):
@@ -434,95 +816,72 @@ def delete_salary_report(report_id: int, db: Session = Depends(get_db)):
 
 # ========== PDF Generation Endpoints ==========
 @app.post("/api/reports/shift/{report_id}/pdf")
-def generate_shift_pdf(report_id: int, db: Session = Depends(get_db)):
+async def generate_shift_pdf(report_id: int, db: Session = Depends(get_db)):
     """Generate PDF for shift report"""
-    report = crud.get_shift_report(db, report_id)
-    if not report:
-        raise HTTPException(status_code=404, detail="Shift report not found")
+    return await workers.run_blocking(_generate_shift_pdf, report_id, db)
 
-    try:
-        # Get company info (use first company or default)
-        companies = crud.get_companies(db, limit=1)
-        company_info = {
-            "name": companies[0].name if companies else "Voss Taxi",
-            "org_number": companies[0].org_number if companies else "",
-            "address": companies[0].address if companies else ""
-        }
-
-        # Recreate DataFrame from stored data
-        import pandas as pd
-        df = pd.DataFrame(report.data.get("rows", []))
-
-        # Generate PDF
-        pdf_filename = f"shift_report_{report_id}_{datetime.now().timestamp()}.pdf"
-        pdf_path = f"{PDF_DIR}/{pdf_filename}"
-
-        services.generate_shift_pdf(
-            pdf_path,
-            df,
-            report.summary or {},
-            company_info,
-            [edit.__dict__ for edit in report.edits] if report.edits else []
-        )
-
-        # Update report with PDF path
-        report.pdf_path = pdf_path
-        db.commit()
-
-        return FileResponse(pdf_path, media_type="application/pdf", filename=pdf_filename)
 
+def _generate_shift_pdf(report_id: int, db: Session):
+    try:
+        pdf_path, pdf_filename = pdf_jobs.render_shift_pdf(db, report_id, PDF_DIR)
+    except pdf_jobs.ReportNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
+    return FileResponse(pdf_path, media_type="application/pdf", filename=pdf_filename)
 
 
 @app.post("/api/reports/salary/{report_id}/pdf")
-def generate_salary_pdf(report_id: int, db: Session = Depends(get_db)):
+async def generate_salary_pdf(report_id: int, db: Session = Depends(get_db)):
     """Generate PDF for salary report"""
-    report = crud.get_salary_report(db, report_id)
-    if not report:
-        raise HTTPException(status_code=404, detail="Salary report not found")
+    return await workers.run_blocking(_generate_salary_pdf, report_id, db)
 
-    try:
-        # Get driver info
-        driver = crud.get_driver(db, report.driver_id)
-        if not driver:
-            raise HTTPException(status_code=404, detail="Driver not found")
-
-        # Get company info
-        companies = crud.get_companies(db, limit=1)
-        company_info = {
-            "name": companies[0].name if companies else "Voss Taxi",
-            "org_number": companies[0].org_number if companies else "",
-            "address": companies[0].address if companies else ""
-        }
-
-        driver_info = {
-            "name": driver.name,
-            "driver_id": driver.driver_id
-        }
-
-        salary_data = {
-            "gross_salary": report.gross_salary,
-            "commission_percentage": report.commission_percentage,
-            "net_salary": report.net_salary,
-            "cash_amount": report.cash_amount,
-            "tips": report.tips
-        }
-
-        # Generate PDF
-        pdf_filename = f"salary_report_{report_id}_{datetime.now().timestamp()}.pdf"
-        pdf_path = f"{PDF_DIR}/{pdf_filename}"
-
-        services.generate_salary_pdf(pdf_path, salary_data, driver_info, company_info)
-
-        # Update report with PDF path
-        report.pdf_path = pdf_path
-        db.commit()
-
-        return FileResponse(pdf_path, media_type="application/pdf", filename=pdf_filename)
 
+def _generate_salary_pdf(report_id: int, db: Session):
+    try:
+        pdf_path, pdf_filename = pdf_jobs.render_salary_pdf(db, report_id, PDF_DIR)
+    except pdf_jobs.ReportNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
+    return FileResponse(pdf_path, media_type="application/pdf", filename=pdf_filename)
+
+
+# ========== Background PDF Jobs ==========
+@app.post("/api/reports/{report_type}/{report_id}/pdf-jobs", response_model=schemas.PdfJob, status_code=202)
+def enqueue_pdf_job(report_type: str, report_id: int, db: Session = Depends(get_db)):
+    """Queue PDF generation for a report and return the job to poll"""
+    if report_type not in pdf_jobs.REPORT_TYPES:
+        raise HTTPException(status_code=404, detail="Unknown report type")
+    if not pdf_jobs.report_exists(db, report_type, report_id):
+        raise HTTPException(status_code=404, detail=f"{report_type.capitalize()} report not found")
+    job = pdf_jobs.enqueue(db, report_type, report_id)
+    pdf_jobs.kick()
+    return job
+
+
+@app.get("/api/pdf-jobs/{job_id}", response_model=schemas.PdfJob)
+def get_pdf_job(job_id: int, db: Session = Depends(get_db)):
+    """Status of a PDF job; poll until it is done or failed"""
+    job = pdf_jobs.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="PDF job not found")
+    if job.status in pdf_jobs.ACTIVE_STATUSES:
+        pdf_jobs.kick()
+    return job
+
+
+@app.get("/api/pdf-jobs/{job_id}/download")
+def download_pdf_job(job_id: int, db: Session = Depends(get_db)):
+    """The rendered PDF of a finished job"""
+    job = pdf_jobs.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="PDF job not found")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"PDF job is {job.status}")
+    if not job.pdf_path or not os.path.exists(job.pdf_path):
+        raise HTTPException(status_code=410, detail="PDF file is no longer available")
+    return FileResponse(job.pdf_path, media_type="application/pdf", filename=os.path.basename(job.pdf_path))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+"""
+Versioned schema migrations
+The schema is managed by the Alembic migrations in migrations/versions and
+is upgraded once per deploy, not on every cold start:
+
+    python migrate.py            # upgrade to the latest revision
+    python migrate.py --check    # exit 1 if the database is behind
+    python migrate.py --sql      # print the upgrade SQL instead of running it
+
+At startup the app only calls check_schema(), a single query against
+alembic_version. Alembic itself is imported only when upgrading.
+
+Databases created before migrations existed (create_all or
+init_database.sql) have no alembic_version table; upgrade() stamps them
+at the revision their tables match and upgrades from there.
+"""
+from typing import Optional
+import os
+import sys
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import DATABASE_URL, get_engine
+
+# Latest revision in migrations/versions; bump together with each new migration
+SCHEMA_HEAD = "0005"
+
+# Upgrade at startup when the schema is behind (default: only for SQLite,
+# where there is no separate deploy step)
+SCHEMA_AUTO_UPGRADE = os.getenv(
+    "SCHEMA_AUTO_UPGRADE", "true" if DATABASE_URL.startswith("sqlite") else "false"
+).lower() in ("1", "true", "yes")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def current_revision(bind=None) -> Optional[str]:
+    """Revision the database is at, or None if it is unversioned or unreachable"""
+    bind = bind or get_engine()
+    try:
+        with bind.connect() as conn:
+            return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except SQLAlchemyError:
+        return None
+
+
+def schema_is_current(bind=None) -> bool:
+    return current_revision(bind) == SCHEMA_HEAD
+
+
+def _config():
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    return config
+
+
+def script_head() -> str:
+    """Head revision according to the migration scripts"""
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(_config()).get_current_head()
+
+
+def _baseline(conn) -> Optional[str]:
+    """Revision matching the tables of an unversioned database, None if empty"""
+    tables = set(inspect(conn).get_table_names())
+    if "alembic_version" in tables or "shift_reports" not in tables:
+        return None
+    return "0002" if "shift_rows" in tables else "0001"
+
+
+def upgrade(bind=None, revision: str = "head"):
+    """Apply pending migrations"""
+    from alembic import command
+
+    bind = bind or get_engine()
+    config = _config()
+    with bind.begin() as conn:
+        config.attributes["connection"] = conn
+        baseline = _baseline(conn)
+        if baseline:
+            print(f"✓ Unversioned database, stamping at revision {baseline}", file=sys.stderr)
+            command.stamp(config, baseline)
+        command.upgrade(config, revision)
+    print(f"✓ Database schema at revision {current_revision(bind)}", file=sys.stderr)
+
+
+def check_schema(bind=None) -> str:
+    """Startup check: compare the stored revision with SCHEMA_HEAD
+
+    Returns "current", "upgraded", or "outdated (<revision>)". An outdated
+    schema is upgraded when SCHEMA_AUTO_UPGRADE is on and otherwise only
+    logged, so the app still starts.
+    """
+    bind = bind or get_engine()
+    revision = current_revision(bind)
+    if revision == SCHEMA_HEAD:
+        return "current"
+
+    if SCHEMA_AUTO_UPGRADE:
+        upgrade(bind)
+        return "upgraded"
+
+    print(f"⚠ Database schema is at {revision or 'no revision'}, code expects {SCHEMA_HEAD}; "
+          f"run `python migrate.py` before serving traffic", file=sys.stderr)
+    return f"outdated ({revision or 'unversioned'})"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Apply or check database migrations")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--check", action="store_true", help="exit 1 if the schema is not current")
+    group.add_argument("--sql", action="store_true", help="print the upgrade SQL instead of running it")
+    parser.add_argument("--revision", default="head")
+    args = parser.parse_args()
+
+    head = script_head()
+    if head != SCHEMA_HEAD:
+        print(f"✗ SCHEMA_HEAD is {SCHEMA_HEAD} but the latest migration is {head}; update migrate.py")
+        sys.exit(2)
+
+    if args.check:
+        revision = current_revision()
+        if revision == SCHEMA_HEAD:
+            print(f"✓ Schema is current ({revision})")
+            sys.exit(0)
+        print(f"✗ Schema is at {revision or 'no revision'}, latest is {SCHEMA_HEAD}")
+        sys.exit(1)
+
+    if args.sql:
+        from alembic import command
+
+        command.upgrade(_config(), args.revision, sql=True)
+        sys.exit(0)
+
+    try:
+        upgrade(revision=args.revision)
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,47 @@
+"""
+Shift row migration script
+Moves rows stored in the ShiftReport.data JSON blob into the normalized
+shift_rows table. Safe to re-run: reports that are already migrated are skipped.
+"""
+import sys
+
+import pandas as pd
+
+from database import SessionLocal
+import crud
+import migrate as schema_migrate
+import services
+
+
+def build_rows(records):
+    return services.shift_rows_from_frame(pd.DataFrame(records))
+
+
+def migrate(batch_size: int = 50) -> bool:
+    """Create shift_rows if needed and backfill it from existing reports"""
+    try:
+        schema_migrate.upgrade()
+        print("✓ shift_rows table ready")
+
+        db = SessionLocal()
+        try:
+            result = crud.backfill_shift_rows(db, build_rows, batch_size=batch_size)
+        finally:
+            db.close()
+
+        print(f"✓ Migrated {result['reports']} report(s), {result['rows']} row(s)")
+        return True
+
+    except Exception as e:
+        print(f"✗ Migration failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Voss Taxi - migrate shift report rows to shift_rows")
+    print("=" * 60)
+    batch = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    sys.exit(0 if migrate(batch) else 1)
@@ -0,0 +1,130 @@
+"""Initial schema: users, companies, bank accounts, drivers, templates and reports
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-01-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    ]
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("is_superuser", sa.Boolean()),
+        *_timestamps(),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "companies",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("org_number", sa.String()),
+        sa.Column("address", sa.String()),
+        *_timestamps(),
+    )
+    op.create_index("ix_companies_id", "companies", ["id"])
+
+    op.create_table(
+        "bank_accounts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("account_number", sa.String(), nullable=False),
+        sa.Column("account_name", sa.String()),
+        sa.Column("is_default", sa.Boolean()),
+        *_timestamps(),
+    )
+    op.create_index("ix_bank_accounts_id", "bank_accounts", ["id"])
+
+    op.create_table(
+        "drivers",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("driver_id", sa.String(4), nullable=False),
+        sa.Column("commission_percentage", sa.Float()),
+        sa.Column("bank_account_id", sa.Integer(), sa.ForeignKey("bank_accounts.id"), nullable=True),
+        sa.Column("is_default", sa.Boolean()),
+        *_timestamps(),
+    )
+    op.create_index("ix_drivers_id", "drivers", ["id"])
+
+    op.create_table(
+        "templates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("template_type", sa.String(), nullable=False),
+        sa.Column("columns", sa.JSON(), nullable=False),
+        sa.Column("is_default", sa.Boolean()),
+        *_timestamps(),
+    )
+    op.create_index("ix_templates_id", "templates", ["id"])
+
+    op.create_table(
+        "shift_reports",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("driver_id", sa.Integer(), sa.ForeignKey("drivers.id"), nullable=True),
+        sa.Column("file_name", sa.String(), nullable=False),
+        sa.Column("report_date", sa.DateTime()),
+        sa.Column("data", sa.JSON(), nullable=False),
+        sa.Column("summary", sa.JSON()),
+        sa.Column("pdf_path", sa.String()),
+        *_timestamps(),
+    )
+    op.create_index("ix_shift_reports_id", "shift_reports", ["id"])
+
+    op.create_table(
+        "shift_edits",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("shift_report_id", sa.Integer(), sa.ForeignKey("shift_reports.id"), nullable=False),
+        sa.Column("row_index", sa.Integer(), nullable=False),
+        sa.Column("column_name", sa.String(), nullable=False),
+        sa.Column("old_value", sa.String()),
+        sa.Column("new_value", sa.String(), nullable=False),
+        sa.Column("note", sa.Text()),
+        sa.Column("timestamp", sa.DateTime()),
+    )
+    op.create_index("ix_shift_edits_id", "shift_edits", ["id"])
+
+    op.create_table(
+        "salary_reports",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("driver_id", sa.Integer(), sa.ForeignKey("drivers.id"), nullable=False),
+        sa.Column("report_period", sa.String()),
+        sa.Column("file_names", sa.JSON()),
+        sa.Column("gross_salary", sa.Float()),
+        sa.Column("commission_percentage", sa.Float()),
+        sa.Column("net_salary", sa.Float()),
+        sa.Column("cash_amount", sa.Float()),
+        sa.Column("tips", sa.Float()),
+        sa.Column("data", sa.JSON(), nullable=False),
+        sa.Column("pdf_path", sa.String()),
+        *_timestamps(),
+    )
+    op.create_index("ix_salary_reports_id", "salary_reports", ["id"])
+
+
+def downgrade():
+    for table in ("salary_reports", "shift_edits", "shift_reports", "templates",
+                  "drivers", "bank_accounts", "companies", "users"):
+        op.drop_table(table)
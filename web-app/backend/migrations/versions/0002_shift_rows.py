@@ -0,0 +1,44 @@
+"""Normalized shift_rows table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-01-02 00:00:00
+
+Existing reports keep their rows in the data blob until
+migrate_shift_rows.py backfills them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "shift_rows",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("shift_report_id", sa.Integer(),
+                  sa.ForeignKey("shift_reports.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("row_index", sa.Integer(), nullable=False),
+        sa.Column("loyve", sa.String()),
+        sa.Column("skiftnr", sa.String()),
+        sa.Column("driver", sa.String()),
+        sa.Column("start_dato", sa.DateTime()),
+        sa.Column("slutt_dato", sa.DateTime()),
+        sa.Column("kontant", sa.Float()),
+        sa.Column("kreditt", sa.Float()),
+        sa.Column("bomtur", sa.Float()),
+        sa.Column("subtotal", sa.Float()),
+        sa.Column("tips", sa.Float()),
+        sa.Column("raw", sa.JSON()),
+    )
+    op.create_index("ix_shift_rows_id", "shift_rows", ["id"])
+    op.create_index("ix_shift_rows_shift_report_id", "shift_rows", ["shift_report_id"])
+
+
+def downgrade():
+    op.drop_table("shift_rows")
@@ -0,0 +1,46 @@
+"""Indexes for keyset pagination, row lookups and period filters
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-01-03 00:00:00
+
+Databases set up with init_database.sql or an earlier create_all may
+already have some of these, so existing ones are skipped.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("drivers", "ix_drivers_created_at_id", ["created_at", "id"]),
+    ("shift_reports", "ix_shift_reports_created_at_id", ["created_at", "id"]),
+    ("shift_reports", "ix_shift_reports_driver_created_at_id", ["driver_id", "created_at", "id"]),
+    ("shift_rows", "ix_shift_rows_loyve_skiftnr", ["loyve", "skiftnr"]),
+    ("shift_rows", "ix_shift_rows_start_dato", ["start_dato"]),
+    ("shift_rows", "ix_shift_rows_driver_start_dato", ["driver", "start_dato"]),
+    ("shift_edits", "idx_shift_edits_report", ["shift_report_id"]),
+    ("salary_reports", "ix_salary_reports_created_at_id", ["created_at", "id"]),
+    ("salary_reports", "ix_salary_reports_driver_created_at_id", ["driver_id", "created_at", "id"]),
+    ("salary_reports", "ix_salary_reports_period_created_at_id", ["report_period", "created_at", "id"]),
+    ("salary_reports", "ix_salary_reports_driver_period", ["driver_id", "report_period"]),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {}
+    for table, name, columns in INDEXES:
+        if table not in existing:
+            existing[table] = {index["name"] for index in inspector.get_indexes(table)}
+        if name not in existing[table]:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table, name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,45 @@
+"""pdf_jobs table for background PDF generation
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-01-05 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "pdf_jobs" in sa.inspect(op.get_bind()).get_table_names():
+        return  # created by create_all before being versioned
+    op.create_table(
+        "pdf_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("report_type", sa.String(16), nullable=False),
+        sa.Column("report_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_after", sa.DateTime()),
+        sa.Column("error", sa.Text()),
+        sa.Column("pdf_path", sa.String()),
+        sa.Column("started_at", sa.DateTime()),
+        sa.Column("finished_at", sa.DateTime()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_pdf_jobs_id", "pdf_jobs", ["id"])
+    op.create_index("ix_pdf_jobs_status_run_after", "pdf_jobs", ["status", "run_after"])
+    op.create_index("ix_pdf_jobs_report", "pdf_jobs", ["report_type", "report_id"])
+
+
+def downgrade():
+    op.drop_index("ix_pdf_jobs_report", table_name="pdf_jobs")
+    op.drop_index("ix_pdf_jobs_status_run_after", table_name="pdf_jobs")
+    op.drop_index("ix_pdf_jobs_id", table_name="pdf_jobs")
+    op.drop_table("pdf_jobs")
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, JSON, Index
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
 from database import Base
 
@@ -18,6 +18,16 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class RevokedToken(Base):
+    """Ids of revoked tokens that have not expired yet (see token_revocation)"""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
 class Company(Base):
     __tablename__ = "companies"
 
@@ -45,6 +55,10 @@ class Driver(Base):
     shift_reports = relationship("ShiftReport", back_populates="driver")
     salary_reports = relationship("SalaryReport", back_populates="driver")
 
+    __table_args__ = (
+        Index("ix_drivers_created_at_id", "created_at", "id"),
+    )
+
 
 class BankAccount(Base):
     __tablename__ = "bank_accounts"
@@ -78,7 +92,7 @@ class ShiftReport(Base):
     driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=True)
     file_name = Column(String, nullable=False)
     report_date = Column(DateTime, default=datetime.utcnow)
-    data = Column(JSON, nullable=False)  # Parsed report data
+    data = deferred(Column(JSON, nullable=False))  # Parsed report data, loaded on access
     summary = Column(JSON)  # Summary statistics
     pdf_path = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -86,6 +100,42 @@ class ShiftReport(Base):
 
     driver = relationship("Driver", back_populates="shift_reports")
     edits = relationship("ShiftEdit", back_populates="shift_report", cascade="all, delete-orphan")
+    rows = relationship("ShiftRow", back_populates="shift_report", cascade="all, delete-orphan",
+                        passive_deletes=True, order_by="ShiftRow.row_index")
+
+    # Keyset pagination on (created_at, id), with and without a driver filter
+    __table_args__ = (
+        Index("ix_shift_reports_created_at_id", "created_at", "id"),
+        Index("ix_shift_reports_driver_created_at_id", "driver_id", "created_at", "id"),
+    )
+
+
+class ShiftRow(Base):
+    """One imported shift/trip row, with the columns used for summaries typed"""
+    __tablename__ = "shift_rows"
+
+    id = Column(Integer, primary_key=True, index=True)
+    shift_report_id = Column(Integer, ForeignKey("shift_reports.id", ondelete="CASCADE"), nullable=False, index=True)
+    row_index = Column(Integer, nullable=False)
+    loyve = Column(String)
+    skiftnr = Column(String)
+    driver = Column(String)  # Sjåfør ID as written in the file
+    start_dato = Column(DateTime)
+    slutt_dato = Column(DateTime)
+    kontant = Column(Float, default=0.0)
+    kreditt = Column(Float, default=0.0)
+    bomtur = Column(Float, default=0.0)
+    subtotal = Column(Float, default=0.0)
+    tips = Column(Float, default=0.0)
+    raw = Column(JSON)  # Full original row as imported
+
+    shift_report = relationship("ShiftReport", back_populates="rows")
+
+    __table_args__ = (
+        Index("ix_shift_rows_loyve_skiftnr", "loyve", "skiftnr"),
+        Index("ix_shift_rows_start_dato", "start_dato"),
+        Index("ix_shift_rows_driver_start_dato", "driver", "start_dato"),
+    )
 
 
 class ShiftEdit(Base):
@@ -102,6 +152,10 @@ class ShiftEdit(Base):
 
     shift_report = relationship("ShiftReport", back_populates="edits")
 
+    __table_args__ = (
+        Index("idx_shift_edits_report", "shift_report_id"),
+    )
+
 
 class SalaryReport(Base):
     __tablename__ = "salary_reports"
@@ -115,9 +169,40 @@ class SalaryReport(Base):
     net_salary = Column(Float)
     cash_amount = Column(Float)
     tips = Column(Float)
-    data = Column(JSON, nullable=False)  # Detailed salary breakdown
+    data = deferred(Column(JSON, nullable=False))  # Detailed salary breakdown, loaded on access
     pdf_path = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     driver = relationship("Driver", back_populates="salary_reports")
+
+    __table_args__ = (
+        Index("ix_salary_reports_created_at_id", "created_at", "id"),
+        Index("ix_salary_reports_driver_created_at_id", "driver_id", "created_at", "id"),
+        Index("ix_salary_reports_period_created_at_id", "report_period", "created_at", "id"),
+        Index("ix_salary_reports_driver_period", "driver_id", "report_period"),
+    )
+
+
+class PdfJob(Base):
+    """A queued PDF rendering for a shift or salary report (see pdf_jobs)"""
+    __tablename__ = "pdf_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    report_type = Column(String(16), nullable=False)  # 'shift' or 'salary'
+    report_id = Column(Integer, nullable=False)
+    status = Column(String(16), nullable=False, default="queued")  # queued, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime)  # earliest next attempt; while running, when the claim lapses
+    error = Column(Text)
+    pdf_path = Column(String)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_pdf_jobs_status_run_after", "status", "run_after"),
+        Index("ix_pdf_jobs_report", "report_type", "report_id"),
+    )
@@ -0,0 +1,204 @@
+"""
+Content-addressed cache of parsed upload files
+Uploads are keyed by the SHA-256 of their bytes and the parsed, typed
+DataFrame is kept on local disk, so re-uploading the same file (preview,
+then shift report, then salary report) skips parsing. Frames are stored as
+Parquet, which holds only data, and the cache is off when pyarrow is
+missing. The directory is private to the server user (mode 0700) and is
+capped at PARSE_CACHE_MAX_BYTES; least recently used entries go first.
+"""
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+import hashlib
+import io
+import os
+import sys
+import threading
+
+import pandas as pd
+
+import services
+
+PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "parse_cache")
+PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+
+
+def content_hash(source: Union[str, bytes, BinaryIO], chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 hex digest of a path, bytes or seekable stream (rewound after)"""
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.sha256(source).hexdigest()
+    if isinstance(source, str):
+        with open(source, "rb") as stream:
+            return content_hash(stream, chunk_size)
+
+    digest = hashlib.sha256()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(chunk_size), b""):
+        digest.update(chunk)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def private_dir(path: str) -> bool:
+    """Create path with mode 0700; False if it can't be or other users can write to it"""
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.stat(path)
+    except OSError as e:
+        print(f"⚠ Parse cache directory {path} is unusable: {e}", file=sys.stderr)
+        return False
+    if st.st_mode & 0o022 or (hasattr(os, "getuid") and st.st_uid != os.getuid()):
+        print(f"⚠ Parse cache directory {path} is writable by other users, not using it", file=sys.stderr)
+        return False
+    return True
+
+
+if PARSE_CACHE_ENABLED:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("⚠ The parse cache needs pyarrow, parsing every upload", file=sys.stderr)
+        PARSE_CACHE_ENABLED = False
+if PARSE_CACHE_ENABLED:
+    PARSE_CACHE_ENABLED = private_dir(PARSE_CACHE_DIR)
+
+
+def _path(digest: str) -> str:
+    return os.path.join(PARSE_CACHE_DIR, f"{digest}.parquet")
+
+
+def _count(key: str):
+    with _lock:
+        _stats[key] += 1
+
+
+def get(digest: str) -> Optional[pd.DataFrame]:
+    """Cached frame for a digest, or None; a hit marks the entry as recently used"""
+    path = _path(digest)
+    try:
+        df = pd.read_parquet(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠ Dropping unreadable parse cache entry {digest[:12]}: {e}", file=sys.stderr)
+        _count("errors")
+        _remove(path)
+        return None
+
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return df
+
+
+def put(digest: str, df: pd.DataFrame) -> bool:
+    """Store a parsed frame; frames Parquet can't hold are skipped"""
+    path = _path(digest)
+    if os.path.exists(path):
+        return True
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(PARSE_CACHE_DIR, mode=0o700, exist_ok=True)
+        df.to_parquet(tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    except Exception as e:
+        # e.g. object columns mixing numbers and text, which Parquet rejects
+        print(f"⚠ Could not cache parsed file {digest[:12]}: {e}", file=sys.stderr)
+        _count("errors")
+        _remove(tmp_path)
+        return False
+
+    _count("stores")
+    evict()
+    return True
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _entries() -> List[Tuple[float, int, str]]:
+    entries = []
+    try:
+        with os.scandir(PARSE_CACHE_DIR) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".parquet"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def evict(max_bytes: int = None) -> int:
+    """Delete least recently used entries until the cache fits in max_bytes"""
+    max_bytes = PARSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = sorted(_entries())
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+        removed += 1
+    if removed:
+        with _lock:
+            _stats["evictions"] += removed
+    return removed
+
+
+def parse_excel_file(source: Union[str, bytes, BinaryIO]) -> Tuple[pd.DataFrame, List[str], int]:
+    """services.parse_excel_file with the content-hash cache in front of it"""
+    if not PARSE_CACHE_ENABLED:
+        return services.parse_excel_file(source)
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    digest = content_hash(source)
+    df = get(digest)
+    if df is not None:
+        _count("hits")
+        return df, list(df.columns), len(df)
+
+    _count("misses")
+    df, columns, row_count = services.parse_excel_file(source)
+    put(digest, df)
+    return df, columns, row_count
+
+
+def preview_excel_file(source: Union[str, bytes, BinaryIO], nrows: int = 10) -> Tuple[pd.DataFrame, List[str], int]:
+    """services.preview_excel_file, answered from the cache when the file was parsed before"""
+    if not PARSE_CACHE_ENABLED:
+        return services.preview_excel_file(source, nrows=nrows)
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    df = get(content_hash(source))
+    if df is not None:
+        _count("hits")
+        return df.head(nrows), list(df.columns), len(df)
+    return services.preview_excel_file(source, nrows=nrows)
+
+
+def cache_info() -> Dict[str, Any]:
+    entries = _entries()
+    with _lock:
+        stats = dict(_stats)
+    stats.update(
+        enabled=PARSE_CACHE_ENABLED,
+        entries=len(entries),
+        bytes=sum(size for _, size, _ in entries),
+        max_bytes=PARSE_CACHE_MAX_BYTES,
+    )
+    return stats
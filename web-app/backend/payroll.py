@@ -0,0 +1,271 @@
+"""
+Payroll runs for the whole fleet
+Computes every driver's salary for a period from the ingested shift_rows in
+one pass: a single GROUP BY query sums the amount columns per driver, each
+driver's totals become its calculate_salary result, and all SalaryReports
+are written with one commit. The PDFs are then rendered in parallel on the
+ingest process pool and their paths saved with one more commit.
+
+Drivers are matched on the Sjåfør ID stored in shift_rows (Driver.driver_id).
+Rows of drivers with no Driver record are reported, not paid out. A driver
+that already has a report for the period is skipped unless replace is set.
+
+POST /api/payroll/run streams the progress events of a run as NDJSON.
+
+Usage: python payroll.py [--no-pdf] [--replace] YYYY-MM
+"""
+from datetime import datetime
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import os
+import time
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session, undefer
+
+import crud
+import models
+import summaries
+from pdf_jobs import company_info
+from lazy import lazy_import
+
+services = lazy_import("services")
+report_storage = lazy_import("report_storage")
+
+
+def plan_payroll(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    report_period: Optional[str] = None,
+    replace: bool = False
+) -> Dict[str, Any]:
+    """Every driver's salary for [start, end), nothing written yet
+
+    Returns plain dicts (no ORM objects), so the plan can be written by
+    write_reports in another session.
+    """
+    report_period = report_period or summaries.period_label(start)
+    totals = crud.get_shift_row_totals_by_driver(db, start, end)
+    file_names = crud.get_shift_row_file_names_by_driver(db, start, end)
+    drivers = db.query(models.Driver).filter(
+        models.Driver.driver_id.in_(list(totals))
+    ).order_by(models.Driver.id).all() if totals else []
+
+    existing = set()
+    if drivers and not replace:
+        existing = {
+            driver_id for (driver_id,) in db.query(models.SalaryReport.driver_id).filter(
+                models.SalaryReport.report_period == report_period,
+                models.SalaryReport.driver_id.in_([driver.id for driver in drivers])
+            )
+        }
+
+    entries = []
+    for driver in drivers:
+        if driver.id in existing:
+            continue
+        entries.append({
+            "driver_id": driver.id,
+            "driver_code": driver.driver_id,
+            "name": driver.name,
+            "salary": summaries.salary_from_row_totals(totals[driver.driver_id], driver.commission_percentage),
+            "file_names": file_names.get(driver.driver_id, []),
+        })
+
+    return {
+        "report_period": report_period,
+        "start": start,
+        "end": end,
+        "replace": replace,
+        "entries": entries,
+        "skipped_existing": sorted(existing),
+        "unknown_drivers": sorted(set(totals) - {driver.driver_id for driver in drivers}),
+    }
+
+
+def write_reports(db: Session, plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Store one SalaryReport per plan entry with a single commit
+
+    With plan["replace"], the drivers' earlier reports for the period are
+    deleted in the same transaction. Returns the entries with report_id set.
+    """
+    entries = plan["entries"]
+    replaced = []
+    if plan["replace"] and entries:
+        replaced = db.query(models.SalaryReport).options(undefer(models.SalaryReport.data)).filter(
+            models.SalaryReport.report_period == plan["report_period"],
+            models.SalaryReport.driver_id.in_([entry["driver_id"] for entry in entries])
+        ).all()
+        for report in replaced:
+            db.delete(report)
+
+    reports = [
+        crud.salary_report_from_rows(
+            entry["driver_id"], entry["driver_code"], plan["start"], plan["end"],
+            entry["salary"], entry["file_names"], plan["report_period"]
+        )
+        for entry in entries
+    ]
+    db.add_all(reports)
+    db.flush()
+    written = [{**entry, "report_id": report.id} for entry, report in zip(entries, reports)]
+    replaced_data = [report.data for report in replaced]
+    db.commit()
+
+    for data in replaced_data:
+        report_storage.delete_rows(data)
+    return written
+
+
+def pdf_requests(written: Iterable[Dict[str, Any]], company: Dict[str, str], pdf_dir: str) -> List[Dict[str, Any]]:
+    """Arguments for render_payroll_pdf, one per written report"""
+    stamp = datetime.now().timestamp()
+    return [
+        {
+            "report_id": entry["report_id"],
+            "pdf_path": os.path.join(pdf_dir, f"salary_report_{entry['report_id']}_{stamp}.pdf"),
+            "salary_data": entry["salary"],
+            "driver_info": {"name": entry["name"], "driver_id": entry["driver_code"]},
+            "company_info": company,
+        }
+        for entry in written
+    ]
+
+
+def render_payroll_pdf(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Render one payroll PDF; errors are returned, not raised (runs in a worker process)"""
+    started = time.perf_counter()
+    try:
+        services.generate_salary_pdf(job["pdf_path"], job["salary_data"], job["driver_info"], job["company_info"])
+        status, error = "ok", None
+    except Exception as e:
+        status, error = "error", str(e)
+    return {
+        "report_id": job["report_id"],
+        "pdf_path": job["pdf_path"] if status == "ok" else None,
+        "status": status,
+        "error": error,
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def save_pdf_paths(db: Session, rendered: Iterable[Dict[str, Any]]) -> int:
+    """Set pdf_path on every report whose PDF was rendered, in one statement"""
+    values = [{"id": item["report_id"], "pdf_path": item["pdf_path"]} for item in rendered if item["status"] == "ok"]
+    if values:
+        db.execute(update(models.SalaryReport), values)
+        db.commit()
+    return len(values)
+
+
+def planned_event(plan: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "event": "planned",
+        "report_period": plan["report_period"],
+        "drivers": len(plan["entries"]),
+        "skipped_existing": plan["skipped_existing"],
+        "unknown_drivers": plan["unknown_drivers"],
+    }
+
+
+def reports_event(written: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "event": "reports",
+        "reports": [
+            {
+                "report_id": entry["report_id"],
+                "driver_id": entry["driver_id"],
+                "row_count": entry["salary"]["row_count"],
+                "net_salary": entry["salary"]["net_salary"],
+            }
+            for entry in written
+        ],
+    }
+
+
+def done_event(
+    plan: Dict[str, Any],
+    written: List[Dict[str, Any]],
+    rendered: List[Dict[str, Any]],
+    elapsed: float
+) -> Dict[str, Any]:
+    return {
+        "event": "done",
+        "report_period": plan["report_period"],
+        "report_count": len(written),
+        "pdf_count": sum(1 for item in rendered if item["status"] == "ok"),
+        "pdf_errors": sum(1 for item in rendered if item["status"] != "ok"),
+        "net_salary_total": round(sum(entry["salary"]["net_salary"] for entry in written), 2),
+        "elapsed_seconds": round(elapsed, 4),
+    }
+
+
+def run_payroll(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    report_period: Optional[str] = None,
+    pdf_dir: Optional[str] = None,
+    replace: bool = False,
+    executor: Optional[Executor] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """Plan, write and render a payroll run, calling progress with each event
+
+    PDFs are skipped when pdf_dir is None, and rendered on executor (in
+    order, one at a time, if it is None).
+    """
+    started = time.perf_counter()
+    progress = progress or (lambda event: None)
+
+    plan = plan_payroll(db, start, end, report_period, replace)
+    progress(planned_event(plan))
+    written = write_reports(db, plan)
+    progress(reports_event(written))
+
+    rendered = []
+    if pdf_dir is not None and written:
+        jobs = pdf_requests(written, company_info(db), pdf_dir)
+        results = executor.map(render_payroll_pdf, jobs) if executor else map(render_payroll_pdf, jobs)
+        for item in results:
+            rendered.append(item)
+            progress({"event": "pdf", **item})
+        save_pdf_paths(db, rendered)
+
+    done = done_event(plan, written, rendered, time.perf_counter() - started)
+    progress(done)
+    return done
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from database import SessionLocal
+    import ingest
+    import migrate
+
+    parser = argparse.ArgumentParser(description="Compute salary reports for every driver for a month")
+    parser.add_argument("period", help="YYYY-MM")
+    parser.add_argument("--report-period", default=None, help='report label (default e.g. "January 2024")')
+    parser.add_argument("--no-pdf", action="store_true", help="write the reports without PDFs")
+    parser.add_argument("--replace", action="store_true", help="replace existing reports for the period")
+    args = parser.parse_args()
+
+    start, end = summaries.period_bounds(args.period)
+    pdf_dir = None
+    if not args.no_pdf:
+        pdf_dir = os.getenv("PDF_DIR", "pdfs")
+        os.makedirs(pdf_dir, exist_ok=True)
+
+    migrate.check_schema()
+    db = SessionLocal()
+    try:
+        run_payroll(
+            db, start, end, args.report_period, pdf_dir, args.replace,
+            executor=ingest.get_parse_executor() if pdf_dir else None,
+            progress=lambda event: print(json.dumps(event))
+        )
+    finally:
+        db.close()
@@ -0,0 +1,276 @@
+"""
+Background PDF generation
+POST /api/reports/{type}/{id}/pdf-jobs stores a PdfJob row and returns at
+once. A small thread pool in the API process renders queued jobs, and the
+client polls GET /api/pdf-jobs/{id} until the job is done, then downloads
+the file, so no request is held open while a PDF renders.
+
+The queue is the pdf_jobs table, so jobs survive restarts:
+- A worker claims a job with a compare-and-set UPDATE (queued -> running),
+  so several processes can share the table.
+- A failed job is retried after PDF_JOB_RETRY_SECONDS * 2**(attempt - 1)
+  seconds, up to PDF_JOB_MAX_ATTEMPTS attempts, then marked failed.
+- A claim lasts PDF_JOB_STALE_SECONDS (stored in run_after); a job still
+  running after that (its process died or was frozen) is claimed again.
+- At most PDF_JOB_WORKERS jobs render at once per process.
+
+Polling a job that is not finished starts the workers, so queued jobs also
+make progress on serverless instances that were frozen between requests.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+import os
+import sys
+import threading
+
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+import crud
+import models
+from database import SessionLocal
+from lazy import lazy_import
+
+services = lazy_import("services")
+
+PDF_DIR = os.getenv("PDF_DIR", "pdfs")
+PDF_JOB_WORKERS = int(os.getenv("PDF_JOB_WORKERS", "2"))
+PDF_JOB_MAX_ATTEMPTS = int(os.getenv("PDF_JOB_MAX_ATTEMPTS", "3"))
+PDF_JOB_RETRY_SECONDS = float(os.getenv("PDF_JOB_RETRY_SECONDS", "5"))
+PDF_JOB_STALE_SECONDS = float(os.getenv("PDF_JOB_STALE_SECONDS", "300"))
+
+REPORT_TYPES = ("shift", "salary")
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class ReportNotFoundError(LookupError):
+    """The report a PDF was requested for does not exist (not retried)"""
+
+
+# Rendering, shared with the synchronous /pdf endpoints
+def company_info(db: Session) -> Dict[str, str]:
+    """Company header for the PDFs (first company, or the default)"""
+    companies = crud.get_companies(db, limit=1)
+    return {
+        "name": companies[0].name if companies else "Voss Taxi",
+        "org_number": companies[0].org_number if companies else "",
+        "address": companies[0].address if companies else ""
+    }
+
+
+def render_shift_pdf(db: Session, report_id: int, pdf_dir: str = PDF_DIR) -> Tuple[str, str]:
+    """Render a shift report's PDF and store its path; returns (path, file name)"""
+    report = crud.get_shift_report(db, report_id)
+    if not report:
+        raise ReportNotFoundError("Shift report not found")
+
+    # Recreate DataFrame from stored rows
+    import pandas as pd
+    df = pd.DataFrame(crud.get_shift_report_records(db, report))
+
+    pdf_filename = f"shift_report_{report_id}_{datetime.now().timestamp()}.pdf"
+    pdf_path = f"{pdf_dir}/{pdf_filename}"
+    services.generate_shift_pdf(
+        pdf_path,
+        df,
+        report.summary or {},
+        company_info(db),
+        [edit.__dict__ for edit in report.edits] if report.edits else []
+    )
+
+    report.pdf_path = pdf_path
+    db.commit()
+    return pdf_path, pdf_filename
+
+
+def render_salary_pdf(db: Session, report_id: int, pdf_dir: str = PDF_DIR) -> Tuple[str, str]:
+    """Render a salary report's PDF and store its path; returns (path, file name)"""
+    report = crud.get_salary_report(db, report_id)
+    if not report:
+        raise ReportNotFoundError("Salary report not found")
+
+    driver = crud.get_driver(db, report.driver_id)
+    if not driver:
+        raise ReportNotFoundError("Driver not found")
+
+    salary_data = {
+        "gross_salary": report.gross_salary,
+        "commission_percentage": report.commission_percentage,
+        "net_salary": report.net_salary,
+        "cash_amount": report.cash_amount,
+        "tips": report.tips
+    }
+
+    pdf_filename = f"salary_report_{report_id}_{datetime.now().timestamp()}.pdf"
+    pdf_path = f"{pdf_dir}/{pdf_filename}"
+    services.generate_salary_pdf(
+        pdf_path, salary_data, {"name": driver.name, "driver_id": driver.driver_id}, company_info(db)
+    )
+
+    report.pdf_path = pdf_path
+    db.commit()
+    return pdf_path, pdf_filename
+
+
+RENDERERS = {"shift": render_shift_pdf, "salary": render_salary_pdf}
+
+
+def report_exists(db: Session, report_type: str, report_id: int) -> bool:
+    model = models.ShiftReport if report_type == "shift" else models.SalaryReport
+    return db.query(model.id).filter(model.id == report_id).first() is not None
+
+
+# Queue
+def enqueue(db: Session, report_type: str, report_id: int) -> models.PdfJob:
+    """Queue a PDF for a report; an unfinished job for the same report is reused"""
+    job = db.query(models.PdfJob).filter(
+        models.PdfJob.report_type == report_type,
+        models.PdfJob.report_id == report_id,
+        models.PdfJob.status.in_(ACTIVE_STATUSES)
+    ).order_by(models.PdfJob.id.desc()).first()
+    if job is None:
+        job = models.PdfJob(
+            report_type=report_type,
+            report_id=report_id,
+            status="queued",
+            attempts=0,
+            max_attempts=PDF_JOB_MAX_ATTEMPTS,
+            run_after=datetime.utcnow()
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: int) -> Optional[models.PdfJob]:
+    return db.query(models.PdfJob).filter(models.PdfJob.id == job_id).first()
+
+
+def _claimable(now: datetime):
+    """Queued jobs that are due and running jobs whose claim has lapsed
+
+    A single range on ix_pdf_jobs_status_run_after, so finished jobs are
+    never read.
+    """
+    job = models.PdfJob
+    return and_(job.status.in_(ACTIVE_STATUSES), job.run_after <= now)
+
+
+def claim(db: Session) -> Optional[int]:
+    """Mark the runnable job due longest as running and return its id, None if there is none"""
+    while True:
+        now = datetime.utcnow()
+        candidate = db.query(models.PdfJob.id).filter(_claimable(now)).order_by(
+            models.PdfJob.run_after, models.PdfJob.id
+        ).first()
+        if candidate is None:
+            return None
+        # Only one worker (in any process) gets to move the job out of its claimable state
+        claimed = db.query(models.PdfJob).filter(
+            models.PdfJob.id == candidate[0], _claimable(now)
+        ).update({
+            models.PdfJob.status: "running",
+            models.PdfJob.started_at: now,
+            models.PdfJob.run_after: now + timedelta(seconds=PDF_JOB_STALE_SECONDS),
+            models.PdfJob.attempts: models.PdfJob.attempts + 1,
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            return candidate[0]
+
+
+def run_job(db: Session, job_id: int, pdf_dir: str = PDF_DIR) -> models.PdfJob:
+    """Render a claimed job and record the outcome (done, retry later, or failed)"""
+    job = get_job(db, job_id)
+    try:
+        job.pdf_path, _ = RENDERERS[job.report_type](db, job.report_id, pdf_dir)
+        job.status = "done"
+        job.error = None
+        job.finished_at = datetime.utcnow()
+        _stats["done"] += 1
+    except Exception as e:
+        db.rollback()
+        job.error = str(e)
+        if isinstance(e, ReportNotFoundError) or job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+            _stats["failed"] += 1
+            print(f"⚠ PDF job {job.id} failed: {e}", file=sys.stderr)
+        else:
+            job.status = "queued"
+            job.run_after = datetime.utcnow() + timedelta(
+                seconds=PDF_JOB_RETRY_SECONDS * 2 ** (job.attempts - 1)
+            )
+            _stats["retried"] += 1
+    db.commit()
+    return job
+
+
+# Worker pool
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_active = 0
+_retry_timer: Optional[threading.Timer] = None
+_stats = {"done": 0, "failed": 0, "retried": 0}
+
+
+def kick():
+    """Start workers for runnable jobs, up to PDF_JOB_WORKERS in this process"""
+    global _executor, _active
+    with _lock:
+        starting = max(0, PDF_JOB_WORKERS - _active)
+        if not starting:
+            return
+        _active += starting
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PDF_JOB_WORKERS, thread_name_prefix="pdf-job")
+    for _ in range(starting):
+        _executor.submit(_work)
+
+
+def _work():
+    """Run jobs until none is runnable, then schedule the next pending retry"""
+    global _active
+    db = SessionLocal()
+    try:
+        while True:
+            job_id = claim(db)
+            if job_id is None:
+                break
+            run_job(db, job_id)
+        next_retry = db.query(func.min(models.PdfJob.run_after)).filter(
+            models.PdfJob.status == "queued", models.PdfJob.run_after > datetime.utcnow()
+        ).scalar()
+    except Exception as e:
+        print(f"⚠ PDF job worker stopped: {e}", file=sys.stderr)
+        next_retry = None
+    finally:
+        db.close()
+        with _lock:
+            _active -= 1
+
+    if next_retry is not None:
+        _schedule_retry((next_retry - datetime.utcnow()).total_seconds())
+
+
+def _schedule_retry(delay: float):
+    global _retry_timer
+    with _lock:
+        if _retry_timer is not None and _retry_timer.is_alive():
+            return
+        _retry_timer = threading.Timer(max(delay, 0.0), kick)
+        _retry_timer.daemon = True
+        _retry_timer.start()
+
+
+def metrics(db: Session) -> Dict[str, Any]:
+    counts = dict(db.query(models.PdfJob.status, func.count(models.PdfJob.id)).group_by(models.PdfJob.status).all())
+    with _lock:
+        return {
+            "workers": PDF_JOB_WORKERS,
+            "active_workers": _active,
+            "jobs": {status: counts.get(status, 0) for status in ACTIVE_STATUSES + ("done", "failed")},
+            **_stats,
+        }
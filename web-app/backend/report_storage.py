@@ -0,0 +1,94 @@
+"""
+Columnar storage for report row data
+With REPORT_STORAGE=parquet, the full rows of shift and salary reports are
+written as zstd-compressed Parquet files in REPORT_DATA_DIR instead of JSON
+lists of dicts. The report's `data` then only holds a reference:
+
+    {"storage": "parquet", "file": "shift_<uuid>.parquet", "columns": [...], "row_count": N}
+
+Readers can load just the columns they need. The default (json) keeps the
+row data in the database; Parquet needs pyarrow and a persistent disk.
+"""
+from typing import Any, Dict, List, Optional
+import os
+import sys
+import uuid
+
+import pandas as pd
+
+import services
+
+REPORT_STORAGE = os.getenv("REPORT_STORAGE", "json").lower()
+REPORT_DATA_DIR = os.getenv("REPORT_DATA_DIR", "report_data")
+
+if REPORT_STORAGE == "parquet":
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("⚠ REPORT_STORAGE=parquet needs pyarrow, storing report rows as JSON", file=sys.stderr)
+        REPORT_STORAGE = "json"
+
+
+def is_columnar(data: Optional[Dict[str, Any]]) -> bool:
+    return bool(data) and data.get("storage") == "parquet"
+
+
+def write_frame(df: pd.DataFrame, prefix: str) -> Optional[Dict[str, Any]]:
+    """Write rows as Parquet and return the reference for `data`
+
+    Returns None in json mode, or if the frame can't be stored as Parquet
+    (e.g. a column mixing numbers and text); callers then keep JSON rows.
+    """
+    if REPORT_STORAGE != "parquet" or df is None:
+        return None
+
+    file_name = f"{prefix}_{uuid.uuid4().hex}.parquet"
+    path = os.path.join(REPORT_DATA_DIR, file_name)
+    try:
+        os.makedirs(REPORT_DATA_DIR, exist_ok=True)
+        df.to_parquet(path, compression="zstd", index=False)
+    except Exception as e:
+        print(f"⚠ Could not store rows as Parquet, using JSON: {e}", file=sys.stderr)
+        delete_file(file_name)
+        return None
+
+    return {
+        "storage": "parquet",
+        "file": file_name,
+        "columns": [str(col) for col in df.columns],
+        "row_count": len(df),
+    }
+
+
+def read_frame(data: Dict[str, Any], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load stored rows, reading only the given columns when set"""
+    if columns is not None:
+        available = set(data.get("columns") or [])
+        columns = [col for col in columns if col in available]
+    return pd.read_parquet(os.path.join(REPORT_DATA_DIR, data["file"]), columns=columns)
+
+
+def read_records(
+    data: Dict[str, Any],
+    columns: Optional[List[str]] = None,
+    offset: int = 0,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Stored rows as JSON-ready dicts, like the rows of the JSON storage"""
+    df = read_frame(data, columns)
+    return services.dataframe_to_records(df.iloc[offset:None if limit is None else offset + limit])
+
+
+def delete_file(file_name: Optional[str]):
+    if not file_name:
+        return
+    try:
+        os.remove(os.path.join(REPORT_DATA_DIR, file_name))
+    except OSError:
+        pass
+
+
+def delete_rows(data: Optional[Dict[str, Any]]):
+    """Remove the Parquet file behind a report, if it has one"""
+    if is_columnar(data):
+        delete_file(data.get("file"))
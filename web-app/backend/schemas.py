@@ -36,6 +36,15 @@ class User(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
 
 class TokenData(BaseModel):
@@ -220,6 +229,21 @@ class ShiftReport(ShiftReportBase):
         from_attributes = True
 
 
+class ShiftReportListItem(BaseModel):
+    """Shift report without row data or edits, for list endpoints"""
+    id: int
+    driver_id: Optional[int] = None
+    file_name: str
+    report_date: Optional[datetime] = None
+    summary: Optional[Dict[str, Any]] = None
+    pdf_path: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # Salary Report Schemas
 class SalaryReportBase(BaseModel):
     driver_id: int
@@ -247,6 +271,66 @@ class SalaryReport(SalaryReportBase):
         from_attributes = True
 
 
+class SalaryReportListItem(BaseModel):
+    """Salary report without row data, for list endpoints"""
+    id: int
+    driver_id: int
+    report_period: Optional[str] = None
+    file_names: List[str]
+    gross_salary: Optional[float] = None
+    commission_percentage: Optional[float] = None
+    net_salary: Optional[float] = None
+    cash_amount: Optional[float] = None
+    tips: Optional[float] = None
+    pdf_path: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SalaryFromRowsRequest(BaseModel):
+    """Salary report from ingested shift rows, for a YYYY-MM period or a start/end range"""
+    driver_id: int
+    period: Optional[str] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    report_period: Optional[str] = None
+
+
+class PayrollRunRequest(BaseModel):
+    """Salary reports for every driver with shift rows in a YYYY-MM period or start/end range"""
+    period: Optional[str] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    report_period: Optional[str] = None
+    generate_pdfs: bool = True
+    replace: bool = False  # replace existing reports for the period instead of skipping those drivers
+
+
+class SalaryCalculation(BaseModel):
+    driver_id: int
+    start: datetime
+    end: datetime
+    row_count: int
+    gross_salary: float
+    commission_percentage: float
+    net_salary: float
+    cash_amount: float
+    tips: float
+    total_bomtur: float
+
+
+# Report Rows Page
+class ReportRowsPage(BaseModel):
+    columns: List[str]
+    rows: List[Dict[str, Any]]
+    offset: int
+    limit: int
+    total: int
+
+
 # File Upload Response
 class FileUploadResponse(BaseModel):
     filename: str
@@ -255,6 +339,42 @@ class FileUploadResponse(BaseModel):
     preview: List[Dict[str, Any]]
 
 
+# Bulk Ingest Response
+class IngestFileResult(BaseModel):
+    file_name: str
+    report_id: Optional[int] = None
+    row_count: int = 0
+    status: str  # 'ok' or 'error'
+    error: Optional[str] = None
+    seconds: Optional[float] = None
+
+
+class BulkIngestResponse(BaseModel):
+    files: List[IngestFileResult]
+    file_count: int
+    row_count: int
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+# Background PDF Job
+class PdfJob(BaseModel):
+    id: int
+    report_type: str
+    report_id: int
+    status: str  # 'queued', 'running', 'done' or 'failed'
+    attempts: int
+    max_attempts: int
+    run_after: Optional[datetime] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # PDF Generation Request
 class PDFGenerateRequest(BaseModel):
     report_id: int
@@ -1,9 +1,17 @@
+import numpy as np
 import pandas as pd
 import os
-from typing import Dict, Any, List, Optional, Tuple
+import io
+import json
+import tempfile
+from typing import Dict, Any, BinaryIO, List, Optional, Tuple, Union
 from datetime import datetime
+from functools import lru_cache
 from fpdf import FPDF
 
+import skiftl
+from summaries import SUMMARY_COLUMNS, salary_from_totals, shift_summary_from_totals
+
 
 def safe_float(val) -> float:
     """Convert value to float safely, handling various edge cases"""
@@ -15,139 +23,421 @@ def safe_float(val) -> float:
         return 0.0
 
 
+def safe_float_series(series: pd.Series) -> pd.Series:
+    """Vectorized safe_float: convert a whole column to float64 in one pass
+
+    Handles Norwegian formatting ("1 234,50"), blanks, "nan" and NaN the
+    same way safe_float does, without a Python call per cell.
+    """
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.astype("float64").fillna(0.0)
+
+    text = series.astype(str).str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(text, errors="coerce").fillna(0.0).astype("float64")
+
+
 # Column finding utilities
+SEMANTIC_COLUMNS = (
+    "loyve", "kontant", "kreditt", "bomtur", "subtotal", "tips",
+    "sjaafor", "driver", "skiftnr", "start_dato", "slutt_dato",
+)
+COLUMN_CACHE_SIZE = int(os.getenv("COLUMN_CACHE_SIZE", "128"))
+
+_DRIVER_WORDS = ("sjaafor", "sjåfør", "sjafor", "sjåfor", "driver")
+
+
+def is_sjaafor_column(colname: str) -> bool:
+    """Check if column is a driver/shift number column"""
+    c = str(colname).lower()
+    return ("skiftnr" in c or "sjaafor" in c or "sjåfør" in c or "sjafor" in c)
+
+
+def is_date_column(colname: str) -> bool:
+    """Check if column is a date column"""
+    return str(colname).lower().startswith("start_dato") or str(colname).lower().startswith("slutt_dato")
+
+
+def _scan_headers(headers: Tuple) -> Dict[str, Any]:
+    """Map semantic column names to header labels in a single pass
+
+    Precedence matches the original per-column finders: an exact
+    "kontant" header beats a partial match, and "kreditt_tips" beats any
+    other "tips" header. Otherwise the first matching header wins.
+    """
+    found: Dict[str, Any] = {}
+    kontant_partial = None
+    tips_partial = None
+
+    for col in headers:
+        name = str(col).strip().lower()
+
+        if "loyve" not in found and name in ("løyve", "loyve"):
+            found["loyve"] = col
+        if "kontant" not in found:
+            if name == "kontant":
+                found["kontant"] = col
+            elif kontant_partial is None and "kontant" in name:
+                kontant_partial = col
+        if "kreditt" not in found and "kreditt" in name:
+            found["kreditt"] = col
+        if "bomtur" not in found and "bomtur" in name:
+            found["bomtur"] = col
+        if "subtotal" not in found and ("sub_total" in name or "subtotal" in name):
+            found["subtotal"] = col
+        if "tips" not in found:
+            if "kreditt_tips" in name:
+                found["tips"] = col
+            elif tips_partial is None and "tips" in name:
+                tips_partial = col
+        if "sjaafor" not in found and is_sjaafor_column(name):
+            found["sjaafor"] = col
+        if "driver" not in found and any(word in name for word in _DRIVER_WORDS):
+            found["driver"] = col
+        if "skiftnr" not in found and "skiftnr" in name:
+            found["skiftnr"] = col
+        if "start_dato" not in found and name.startswith("start_dato"):
+            found["start_dato"] = col
+        if "slutt_dato" not in found and name.startswith("slutt_dato"):
+            found["slutt_dato"] = col
+
+    found.setdefault("kontant", kontant_partial)
+    found.setdefault("tips", tips_partial)
+    return {key: found.get(key) for key in SEMANTIC_COLUMNS}
+
+
+@lru_cache(maxsize=COLUMN_CACHE_SIZE)
+def _resolve_header_signature(headers: Tuple) -> Tuple[Tuple[str, Any], ...]:
+    return tuple(_scan_headers(headers).items())
+
+
+def resolve_columns(df: pd.DataFrame) -> Dict[str, Any]:
+    """Resolve all semantic columns of a dataframe at once
+
+    Results are memoized by the header tuple, so repeated uploads from the
+    same taxameter model skip the scan.
+    """
+    if df is None:
+        return dict.fromkeys(SEMANTIC_COLUMNS)
+    headers = tuple(df.columns)
+    try:
+        return dict(_resolve_header_signature(headers))
+    except TypeError:
+        # Unhashable column labels: resolve without caching
+        return _scan_headers(headers)
+
+
+def column_cache_info():
+    """Hit/miss statistics for the column resolver cache"""
+    return _resolve_header_signature.cache_info()
+
+
 def find_loyve_column(df: pd.DataFrame) -> Optional[str]:
     """Find the løyve (license) column in dataframe"""
-    if df is None:
-        return None
-    for col in df.columns:
-        if str(col).strip().lower() in ["løyve", "loyve"]:
-            return col
-    return None
+    return resolve_columns(df)["loyve"]
 
 
 def find_kontant_column(df: pd.DataFrame) -> Optional[str]:
     """Find the kontant (cash) column in dataframe"""
-    if df is None:
-        return None
-    for col in df.columns:
-        if str(col).strip().lower() == "kontant":
-            return col
-    for col in df.columns:
-        if "kontant" in str(col).strip().lower():
-            return col
-    return None
+    return resolve_columns(df)["kontant"]
 
 
 def find_bomtur_column(df: pd.DataFrame) -> Optional[str]:
     """Find the bomtur (toll) column in dataframe"""
-    if df is None:
-        return None
-    for col in df.columns:
-        if "bomtur" in str(col).lower():
-            return col
-    return None
+    return resolve_columns(df)["bomtur"]
 
 
 def find_kreditt_column(df: pd.DataFrame) -> Optional[str]:
     """Find the kreditt (credit) column in dataframe"""
-    if df is None:
-        return None
-    for col in df.columns:
-        if "kreditt" in str(col).lower():
-            return col
-    return None
+    return resolve_columns(df)["kreditt"]
 
 
 def find_subtotal_column(df: pd.DataFrame) -> Optional[str]:
     """Find the subtotal column in dataframe"""
-    if df is None:
-        return None
-    for col in df.columns:
-        if "sub_total" in str(col).lower() or "subtotal" in str(col).lower():
-            return col
-    return None
+    return resolve_columns(df)["subtotal"]
 
 
 def find_tips_column(df: pd.DataFrame) -> Optional[str]:
     """Find the tips column in dataframe"""
-    if df is None:
-        return None
-    for col in df.columns:
-        if "kreditt_tips" in str(col).lower():
-            return col
-    for col in df.columns:
-        if "tips" in str(col).lower():
-            return col
-    return None
+    return resolve_columns(df)["tips"]
 
 
-def is_sjaafor_column(colname: str) -> bool:
-    """Check if column is a driver/shift number column"""
-    c = colname.lower()
-    return ("skiftnr" in c or "sjaafor" in c or "sjåfør" in c or "sjafor" in c)
+def find_driver_column(df: pd.DataFrame) -> Optional[str]:
+    """Find the driver (sjåfør) column in dataframe, ignoring Skiftnr"""
+    return resolve_columns(df)["driver"]
 
 
-def is_date_column(colname: str) -> bool:
-    """Check if column is a date column"""
-    return str(colname).lower().startswith("start_dato") or str(colname).lower().startswith("slutt_dato")
+# File parsing
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(8 * 1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload is bigger than UPLOAD_MAX_BYTES"""
+
+
+def spool_stream(
+    stream: BinaryIO,
+    max_memory: int = UPLOAD_SPOOL_BYTES,
+    max_size: int = UPLOAD_MAX_BYTES,
+    chunk_size: int = 1024 * 1024
+) -> BinaryIO:
+    """Copy an upload stream into a seekable buffer, in memory up to max_memory
+
+    Larger files roll over to a temporary file; anything above max_size
+    raises UploadTooLargeError before it is fully read.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    size = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if max_size and size > max_size:
+            spooled.close()
+            raise UploadTooLargeError(f"File is larger than the {max_size / (1024 * 1024):g} MB limit")
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+XLSX_MAGIC = b"PK\x03\x04"
+XLS_MAGIC = b"\xd0\xcf\x11\xe0"
+
+
+def _open_source(source: Union[str, bytes, BinaryIO]) -> Tuple[Union[str, BinaryIO], bytes]:
+    """Normalize a parse source and read its first bytes for format sniffing"""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            head = f.read(64)
+    else:
+        head = source.read(64)
+        source.seek(0)
+    return source, head
+
+
+def _read_csv(source: Union[str, BinaryIO], **kwargs) -> pd.DataFrame:
+    """Read CSV/DAT trying tab then comma separators in the known encodings"""
+    encodings = ['utf-8', 'iso-8859-1', 'cp1252']
+    for encoding in encodings:
+        for sep in ('\t', ','):
+            try:
+                if not isinstance(source, str):
+                    source.seek(0)
+                return pd.read_csv(source, sep=sep, encoding=encoding, **kwargs)
+            except Exception:
+                continue
+    raise ValueError("Could not parse file with any known format")
 
 
-# File parsing
-def parse_excel_file(file_path: str) -> Tuple[pd.DataFrame, List[str], int]:
-    """Parse Excel or DAT file and return DataFrame, columns, and row count"""
+def _clean_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(col).strip() for col in df.columns]
+    return df
+
+
+def parse_excel_file(source: Union[str, bytes, BinaryIO]) -> Tuple[pd.DataFrame, List[str], int]:
+    """Parse Excel or DAT file and return DataFrame, columns, and row count
+
+    source is a file path, raw bytes or a seekable binary stream (an upload
+    buffered with spool_stream), so uploads can be parsed without a temp file.
+    """
+    source, head = _open_source(source)
+
+    if skiftl.is_skiftl(head):
+        # Taxameter SKIFTL export: fixed positional layout, no guessing needed
+        df = skiftl.parse_skiftl_file(source)
+        return df, list(df.columns), len(df)
+
     try:
         # Try reading as Excel first
-        df = pd.read_excel(file_path)
+        df = pd.read_excel(source)
     except Exception:
         # If Excel fails, try as CSV/DAT with various encodings
-        encodings = ['utf-8', 'iso-8859-1', 'cp1252']
-        df = None
-        for encoding in encodings:
-            try:
-                df = pd.read_csv(file_path, sep='\t', encoding=encoding)
-                break
-            except Exception:
-                try:
-                    df = pd.read_csv(file_path, sep=',', encoding=encoding)
-                    break
-                except Exception:
-                    continue
-
-        if df is None:
-            raise ValueError("Could not parse file with any known format")
+        df = _read_csv(source)
 
     # Clean up column names
-    df.columns = [str(col).strip() for col in df.columns]
+    _clean_columns(df)
 
     return df, list(df.columns), len(df)
 
 
-def calculate_shift_summary(df: pd.DataFrame) -> Dict[str, float]:
-    """Calculate summary statistics for shift report"""
-    kontant_col = find_kontant_column(df)
-    kreditt_col = find_kreditt_column(df)
-    bomtur_col = find_bomtur_column(df)
-
-    summary = {
-        "total_kontant": 0.0,
-        "total_kreditt": 0.0,
-        "total_bomtur": 0.0,
-        "grand_total": 0.0
+def _count_lines(source: Union[str, BinaryIO], chunk_size: int = 1024 * 1024) -> int:
+    """Count lines by scanning raw bytes, without parsing anything"""
+    stream = open(source, "rb") if isinstance(source, str) else source
+    try:
+        stream.seek(0)
+        lines = 0
+        last = b"\n"
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+        # A last line without a trailing newline still counts
+        return lines + (last != b"\n")
+    finally:
+        if isinstance(source, str):
+            stream.close()
+
+
+def _preview_xlsx(source: Union[str, BinaryIO], nrows: int) -> Tuple[pd.DataFrame, int]:
+    """Read the header and first rows of the active sheet with a read-only iterator"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, ())
+        data = [row for _, row in zip(range(nrows), rows)]
+
+        if sheet.max_row is not None:
+            # Sheet dimension from the file, no need to read the remaining rows
+            row_count = max(sheet.max_row - 1, len(data))
+        else:
+            row_count = len(data) + sum(1 for _ in rows)
+    finally:
+        workbook.close()
+
+    columns = [f"Unnamed: {i}" if col is None else col for i, col in enumerate(header)]
+    return pd.DataFrame(data, columns=columns), row_count
+
+
+def preview_excel_file(source: Union[str, bytes, BinaryIO], nrows: int = 10) -> Tuple[pd.DataFrame, List[str], int]:
+    """Parse only the header and first nrows rows of a file for previews
+
+    Returns (DataFrame of the first rows, columns, row count) like
+    parse_excel_file. The row count comes from a byte-level line/record
+    count (or the sheet dimension for XLSX) instead of building the full
+    DataFrame, so for CSV files with quoted line breaks it is approximate.
+    """
+    source, head = _open_source(source)
+
+    if skiftl.is_skiftl(head):
+        records = [record for _, record in zip(range(nrows), skiftl.iter_skiftl_records(source))]
+        df = skiftl.records_to_frame(records)
+        return df, list(df.columns), skiftl.count_records(source)
+
+    if head.startswith(XLSX_MAGIC):
+        try:
+            df, row_count = _preview_xlsx(source, nrows)
+            _clean_columns(df)
+            return df, list(df.columns), row_count
+        except Exception:
+            pass  # Not a workbook openpyxl can stream, use the full parser
+    elif not head.startswith(XLS_MAGIC):
+        try:
+            df = _read_csv(source, nrows=nrows)
+            _clean_columns(df)
+            return df, list(df.columns), max(_count_lines(source) - 1, len(df))
+        except ValueError:
+            pass
+
+    df, columns, row_count = parse_excel_file(source)
+    return df.head(nrows), columns, row_count
+
+
+def dataframe_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert DataFrame rows to JSON-safe dicts (ISO dates, NaN as None)"""
+    return json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False))
+
+
+# Aggregation engine
+def resolve_summary_columns(df: pd.DataFrame) -> Dict[str, Optional[str]]:
+    """Resolve every column used by the shift and salary summaries"""
+    columns = resolve_columns(df)
+    return {key: columns[key] for key in SUMMARY_COLUMNS}
+
+
+def aggregate_totals(df: pd.DataFrame, columns: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, float]:
+    """Sum every summary column in a single vectorized reduction
+
+    Each distinct source column is coerced once, the results are stacked
+    into one float64 matrix and summed column-wise.
+    """
+    if columns is None:
+        columns = resolve_summary_columns(df)
+
+    totals = {key: 0.0 for key in SUMMARY_COLUMNS}
+    sources = list(dict.fromkeys(col for col in columns.values() if col))
+    if df is None or not sources:
+        return totals
+
+    matrix = np.column_stack([safe_float_series(df[col]).to_numpy() for col in sources])
+    sums = dict(zip(sources, matrix.sum(axis=0).tolist()))
+
+    for key, col in columns.items():
+        if col:
+            totals[key] = sums[col]
+    return totals
+
+
+def summarize(df: pd.DataFrame, commission_percentage: float = 45.0) -> Dict[str, Dict[str, Any]]:
+    """Compute the shift summary and salary result from one pass over the data"""
+    columns = resolve_summary_columns(df)
+    totals = aggregate_totals(df, columns)
+    return {
+        "totals": totals,
+        "shift": shift_summary_from_totals(totals),
+        "salary": salary_from_totals(totals, columns, commission_percentage),
     }
 
-    if kontant_col:
-        summary["total_kontant"] = df[kontant_col].apply(safe_float).sum()
 
-    if kreditt_col:
-        summary["total_kreditt"] = df[kreditt_col].apply(safe_float).sum()
+# Normalized row extraction
+def _key_strings(series: pd.Series) -> List[Optional[str]]:
+    """Convert an identifier column (løyve, skiftnr, sjåfør) to strings
 
-    if bomtur_col:
-        summary["total_bomtur"] = df[bomtur_col].apply(safe_float).sum()
+    Whole-number floats such as 1741.0 (from Excel) become "1741".
+    """
+    if pd.api.types.is_float_dtype(series):
+        whole = series.dropna()
+        if (whole == whole.round()).all():
+            series = series.astype("Int64")
+    return [None if pd.isna(v) else str(v).strip() for v in series.tolist()]
 
-    summary["grand_total"] = summary["total_kontant"] + summary["total_kreditt"]
 
-    return summary
+def _datetimes(series: pd.Series) -> List[Optional[datetime]]:
+    parsed = pd.to_datetime(series, errors="coerce")
+    return [None if pd.isna(v) else v.to_pydatetime() for v in parsed.tolist()]
+
+
+def shift_rows_from_frame(df: pd.DataFrame, include_raw: bool = True) -> List[Dict[str, Any]]:
+    """Build shift_rows records (typed key and amount columns) from a DataFrame
+
+    include_raw=False leaves `raw` empty, for reports whose full rows are
+    kept in columnar storage instead.
+    """
+    if df is None or df.empty:
+        return []
+
+    n = len(df)
+    columns = resolve_columns(df)
+    fields: Dict[str, List[Any]] = {
+        "row_index": list(range(n)),
+        "raw": dataframe_to_records(df) if include_raw else [None] * n,
+    }
+
+    for key in ("loyve", "skiftnr", "driver"):
+        fields[key] = _key_strings(df[columns[key]]) if columns[key] is not None else [None] * n
+
+    for key in ("start_dato", "slutt_dato"):
+        fields[key] = _datetimes(df[columns[key]]) if columns[key] is not None else [None] * n
+
+    for key in SUMMARY_COLUMNS:
+        col = columns[key]
+        fields[key] = safe_float_series(df[col]).tolist() if col is not None else [0.0] * n
+
+    keys = list(fields)
+    return [dict(zip(keys, values)) for values in zip(*fields.values())]
+
+
+def calculate_shift_summary(df: pd.DataFrame) -> Dict[str, float]:
+    """Calculate summary statistics for shift report"""
+    return summarize(df)["shift"]
 
 
 def filter_dataframe_by_driver(df: pd.DataFrame, driver_id: str) -> pd.DataFrame:
@@ -155,54 +445,19 @@ def filter_dataframe_by_driver(df: pd.DataFrame, driver_id: str) -> pd.DataFrame
     if df is None or driver_id is None:
         return df
 
-    # Try to find driver/shift column
-    for col in df.columns:
-        if is_sjaafor_column(col):
-            # Filter rows where this column contains the driver_id
-            mask = df[col].astype(str).str.contains(driver_id, na=False)
-            return df[mask].copy()
+    # Match the whole driver id in the driver column (never Skiftnr, which
+    # comes first in SKIFTL frames and would match shift numbers)
+    col = resolve_columns(df)["driver"]
+    if col is not None:
+        mask = pd.Series(_key_strings(df[col]), index=df.index) == str(driver_id).strip()
+        return df[mask].copy()
 
     return df
 
 
 def calculate_salary(df: pd.DataFrame, commission_percentage: float = 45.0) -> Dict[str, Any]:
     """Calculate salary from shift data"""
-    subtotal_col = find_subtotal_column(df)
-    kontant_col = find_kontant_column(df)
-    bomtur_col = find_bomtur_column(df)
-    tips_col = find_tips_column(df)
-
-    result = {
-        "gross_salary": 0.0,
-        "commission_percentage": commission_percentage,
-        "net_salary": 0.0,
-        "cash_amount": 0.0,
-        "tips": 0.0,
-        "total_bomtur": 0.0,
-        "breakdown": {}
-    }
-
-    # Calculate gross salary from subtotals
-    if subtotal_col:
-        gross = df[subtotal_col].apply(safe_float).sum()
-        result["gross_salary"] = gross
-        result["net_salary"] = gross * (commission_percentage / 100.0)
-
-    # Calculate cash amount (kontant - bomtur)
-    if kontant_col:
-        kontant = df[kontant_col].apply(safe_float).sum()
-        result["cash_amount"] = kontant
-
-        if bomtur_col:
-            bomtur = df[bomtur_col].apply(safe_float).sum()
-            result["total_bomtur"] = bomtur
-            result["cash_amount"] = kontant - bomtur
-
-    # Calculate tips
-    if tips_col:
-        result["tips"] = df[tips_col].apply(safe_float).sum()
-
-    return result
+    return summarize(df, commission_percentage)["salary"]
 
 
 # PDF Generation
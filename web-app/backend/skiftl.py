@@ -0,0 +1,212 @@
+"""
+Streaming reader for SKIFTL shift exports from the taxameter (.dat files)
+
+A SKIFTL export has no header row. Each shift is one record of
+backtick-separated fields that starts with the ``^31`` marker and ends
+with the ``@11~31`` marker. Fields are positional, so they are mapped to
+the same column names the Excel export uses (Skiftnr, Løyve, Sjaafor, ...)
+and converted to typed values while the file is read.
+"""
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import io
+
+import pandas as pd
+
+FIELD_SEPARATOR = b"`"
+RECORD_START = b"^31"
+RECORD_END = b"@11~31"
+ENCODINGS = ("utf-8", "cp1252")
+
+
+def _text(val: str) -> Optional[str]:
+    val = val.strip()
+    return val or None
+
+
+def _int(val: str) -> Optional[int]:
+    val = val.strip().replace(" ", "")
+    if not val:
+        return None
+    try:
+        return int(val)
+    except ValueError:
+        return int(float(val.replace(",", ".")))
+
+
+def _decimal(val: str) -> Optional[float]:
+    """Parse Norwegian decimal numbers such as '17613,00' or '1 234,50'"""
+    val = val.strip().replace(" ", "").replace("\xa0", "")
+    if not val:
+        return None
+    return float(val.replace(",", "."))
+
+
+# (position, column name, converter) for single-field columns.
+# Positions count from the ``^31`` start marker, which is field 1.
+SKIFTL_FIELDS: List[Tuple[int, str, Callable[[str], Any]]] = [
+    (26, "Skiftnr", _int),
+    (2, "Løyve", _text),
+    (3, "Sjaafor", _text),
+    (8, "Turer", _int),
+    (9, "Total_Meter", _int),
+    (11, "Opptatt_Meter", _int),
+    (12, "Total_Kreditt", _decimal),
+    (13, "Total_Kroner", _decimal),
+    (14, "Sub_Total", _decimal),
+    (15, "Bomtur_Kroner", _decimal),
+    (16, "Kreditt_Utlegg", _decimal),
+    (17, "Kreditt_Tips", _decimal),
+    (28, "Kontant_Slutt", _decimal),
+    (29, "Kontant_Start", _decimal),
+    (30, "Kontant", _decimal),
+    (31, "Turer_Slutt", _int),
+    (32, "Turer_Start", _int),
+    (33, "Antall_Turer", _int),
+    (34, "Meter_Slutt", _int),
+    (35, "Meter_Start", _int),
+    (36, "Meter", _int),
+    (37, "Opptattm_Slutt", _int),
+    (38, "Opptattm_Start", _int),
+    (39, "Opptatt Meter", _int),
+    (40, "Kreditt_Slutt", _decimal),
+    (41, "Kreditt_Start", _decimal),
+    (42, "Kreditt", _decimal),
+    (49, "Lonn", _decimal),
+    (50, "Skatt", _decimal),
+    (56, "Totalt_Eier", _decimal),
+    (57, "Total Kreditt", _decimal),
+    (58, "Kontant_Eier", _decimal),
+    (75, "Total Mva", _decimal),
+    (76, "Rest Mva", _decimal),
+    (90, "Orgnummer", _text),
+]
+
+# (date position, time position, column name) for date/time columns.
+# Dates are written as 'dd.mm.yyyy' and times as 'hh.mm'.
+SKIFTL_DATETIME_FIELDS: List[Tuple[int, int, str]] = [
+    (4, 5, "Start_Dato Tid"),
+    (6, 7, "Slutt_Dato Tid"),
+]
+
+# Column order of the parsed frame, matching the Excel export
+SKIFTL_COLUMNS: List[str] = (
+    [name for _, name, _ in SKIFTL_FIELDS[:3]]
+    + [name for _, _, name in SKIFTL_DATETIME_FIELDS]
+    + [name for _, name, _ in SKIFTL_FIELDS[3:]]
+)
+
+# Minimum number of fields a record needs for every mapped position
+_MIN_FIELDS = max(pos for pos, _, _ in SKIFTL_FIELDS) + 1
+
+
+def _datetime(date_val: str, time_val: str) -> Optional[datetime]:
+    date_val = date_val.strip()
+    if not date_val:
+        return None
+    time_val = time_val.strip() or "00.00"
+    return datetime.strptime(f"{date_val} {time_val}", "%d.%m.%Y %H.%M")
+
+
+def _decode(raw: bytes) -> str:
+    for encoding in ENCODINGS:
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("iso-8859-1")
+
+
+def is_skiftl(head: bytes) -> bool:
+    """Check whether the first bytes of a file look like a SKIFTL export"""
+    return head.lstrip().startswith(FIELD_SEPARATOR + RECORD_START)
+
+
+def parse_record(fields: List[str]) -> Dict[str, Any]:
+    """Map the positional fields of one record to named, typed values"""
+    if len(fields) < _MIN_FIELDS:
+        raise ValueError(f"SKIFTL record has {len(fields)} fields, expected at least {_MIN_FIELDS}")
+
+    record = {}
+    for pos, name, convert in SKIFTL_FIELDS:
+        record[name] = convert(fields[pos])
+    for date_pos, time_pos, name in SKIFTL_DATETIME_FIELDS:
+        record[name] = _datetime(fields[date_pos], fields[time_pos])
+    return record
+
+
+def _iter_raw_records(stream: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    """Split a byte stream on record end markers without reading it all"""
+    buffer = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        *complete, buffer = buffer.split(RECORD_END)
+        for raw in complete:
+            yield raw
+    if buffer.strip():
+        yield buffer
+
+
+def iter_skiftl_records(source: Union[str, bytes, BinaryIO], chunk_size: int = 64 * 1024) -> Iterator[Dict[str, Any]]:
+    """Stream parsed records from a SKIFTL file path, bytes or binary file object"""
+    if isinstance(source, str):
+        with open(source, "rb") as stream:
+            yield from iter_skiftl_records(stream, chunk_size)
+        return
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    for raw in _iter_raw_records(source, chunk_size):
+        start = raw.find(RECORD_START)
+        if start < 0:
+            continue
+        fields = _decode(raw[start:]).split("`")
+        # Put the start marker at position 1, as in the file layout
+        yield parse_record([""] + fields)
+
+
+def count_records(source: Union[str, bytes, BinaryIO], chunk_size: int = 1024 * 1024) -> int:
+    """Count records by scanning for end markers, without parsing any fields"""
+    if isinstance(source, str):
+        with open(source, "rb") as stream:
+            return count_records(stream, chunk_size)
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    source.seek(0)
+    count = 0
+    tail = b""
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        data = tail + chunk
+        count += data.count(RECORD_END)
+        # Keep enough bytes to catch a marker split across chunks, but never a whole one
+        tail = data[-(len(RECORD_END) - 1):]
+    return count
+
+
+def records_to_frame(records: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+    """Build the named DataFrame from parsed records"""
+    df = pd.DataFrame.from_records(list(records), columns=SKIFTL_COLUMNS)
+    for _, _, name in SKIFTL_DATETIME_FIELDS:
+        df[name] = pd.to_datetime(df[name])
+    return df
+
+
+def parse_skiftl_file(source: Union[str, bytes, BinaryIO]) -> pd.DataFrame:
+    """Parse one SKIFTL export into a DataFrame with the named schema"""
+    return records_to_frame(iter_skiftl_records(source))
+
+
+def parse_skiftl_files(sources: Iterable[Union[str, bytes, BinaryIO]]) -> pd.DataFrame:
+    """Parse many SKIFTL exports (e.g. a year of shift files) into one DataFrame"""
+    def records():
+        for source in sources:
+            yield from iter_skiftl_records(source)
+
+    return records_to_frame(records())
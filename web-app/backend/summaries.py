@@ -0,0 +1,98 @@
+"""
+Shift and salary results from aggregated column totals
+No pandas here: services builds the totals from an uploaded DataFrame,
+crud.get_shift_row_totals builds them in SQL from ingested shift_rows, and
+both turn them into the same summary and salary results with these
+functions.
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+SUMMARY_COLUMNS = ("kontant", "kreditt", "bomtur", "subtotal", "tips")
+
+# shift_rows has every summary column (0 where the file had none)
+ROW_COLUMNS = {key: key for key in SUMMARY_COLUMNS}
+
+
+def shift_summary_from_totals(totals: Dict[str, float]) -> Dict[str, float]:
+    """Build the calculate_shift_summary result from aggregated totals"""
+    return {
+        "total_kontant": totals["kontant"],
+        "total_kreditt": totals["kreditt"],
+        "total_bomtur": totals["bomtur"],
+        "grand_total": totals["kontant"] + totals["kreditt"]
+    }
+
+
+def salary_from_totals(
+    totals: Dict[str, float],
+    columns: Dict[str, Optional[str]],
+    commission_percentage: float = 45.0
+) -> Dict[str, Any]:
+    """Build the calculate_salary result from aggregated totals"""
+    result = {
+        "gross_salary": 0.0,
+        "commission_percentage": commission_percentage,
+        "net_salary": 0.0,
+        "cash_amount": 0.0,
+        "tips": 0.0,
+        "total_bomtur": 0.0,
+        "breakdown": {}
+    }
+
+    # Gross salary from subtotals
+    if columns.get("subtotal"):
+        result["gross_salary"] = totals["subtotal"]
+        result["net_salary"] = totals["subtotal"] * (commission_percentage / 100.0)
+
+    # Cash amount (kontant - bomtur)
+    if columns.get("kontant"):
+        result["cash_amount"] = totals["kontant"]
+        if columns.get("bomtur"):
+            result["total_bomtur"] = totals["bomtur"]
+            result["cash_amount"] = totals["kontant"] - totals["bomtur"]
+
+    if columns.get("tips"):
+        result["tips"] = totals["tips"]
+
+    return result
+
+
+def salary_from_row_totals(totals: Dict[str, float], commission_percentage: float = 45.0) -> Dict[str, Any]:
+    """salary_from_totals for shift_rows totals, with their row_count"""
+    salary = salary_from_totals(totals, ROW_COLUMNS, commission_percentage)
+    salary["row_count"] = totals["row_count"]
+    return salary
+
+
+def period_bounds(period: str) -> Tuple[datetime, datetime]:
+    """[start, end) of a "YYYY-MM" month"""
+    try:
+        start = datetime.strptime(period, "%Y-%m")
+    except ValueError:
+        raise ValueError(f"Invalid period {period!r}, expected YYYY-MM")
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+
+def resolve_period(
+    period: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Tuple[datetime, datetime]:
+    """Date range from a "YYYY-MM" period or explicit start/end (end exclusive)"""
+    if period:
+        if start or end:
+            raise ValueError("Give either period or start/end, not both")
+        return period_bounds(period)
+    if start is None or end is None:
+        raise ValueError("A period (YYYY-MM) or both start and end are required")
+    if end <= start:
+        raise ValueError("end must be after start")
+    return start, end
+
+
+def period_label(start: datetime) -> str:
+    """Default report_period for a range, like the upload path ("January 2024")"""
+    return start.strftime("%B %Y")
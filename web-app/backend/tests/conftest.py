@@ -0,0 +1,66 @@
+"""
+Shared test fixtures
+The backend reads its configuration from the environment at import time, so
+the database URL and the upload/PDF/cache directories are pointed at a
+throwaway directory here, before any backend module is imported. Each test
+that uses the database gets empty tables.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLES_DIR = os.path.normpath(os.path.join(BACKEND_DIR, "..", "..", "Examples"))
+
+_tmp = tempfile.mkdtemp(prefix="taxi-backend-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["UPLOAD_DIR"] = os.path.join(_tmp, "uploads")
+os.environ["PDF_DIR"] = os.path.join(_tmp, "pdfs")
+os.environ["PARSE_CACHE_DIR"] = os.path.join(_tmp, "parse_cache")
+os.environ["REPORT_DATA_DIR"] = os.path.join(_tmp, "report_data")
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# The two SKIFTL exports shipped in Examples/
+R174_DAT = os.path.join(EXAMPLES_DIR, "R 174-2025NovemberSKIFTL-example.dat")  # driver 1037, 4 shifts
+VE3174_DAT = os.path.join(EXAMPLES_DIR, "VE 3174-2025NovemberSKIFTL-example.dat")  # 1741 x3, 1016, 1013, 1038
+
+
+@pytest.fixture
+def db():
+    """A session on a migrated, empty database"""
+    import auth_cache
+    import database
+    import migrate
+    import models
+    import token_revocation
+
+    migrate.upgrade()
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with database.get_engine().begin() as conn:
+            for table in reversed(models.Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+        auth_cache.clear()
+        token_revocation.clear()
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+
+    import main
+    return TestClient(main.app)
+
+
+def upload(client, path, name=None):
+    """Create a shift report from a file; returns the response"""
+    with open(path, "rb") as f:
+        return client.post("/api/reports/shift", files={"file": (name or os.path.basename(path), f)})
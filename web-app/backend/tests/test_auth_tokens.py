@@ -0,0 +1,88 @@
+import auth
+import auth_cache
+import models
+import token_revocation
+
+
+def _login(client, username="kari"):
+    client.post("/api/auth/register", json={
+        "email": f"{username}@example.com", "username": username, "password": "hemmelig123"
+    })
+    response = client.post("/api/auth/login", json={"username": username, "password": "hemmelig123"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_login_returns_token_pair(client):
+    tokens = _login(client)
+    assert tokens["token_type"] == "bearer"
+    assert auth.decode_token(tokens["access_token"])["type"] == "access"
+    assert auth.decode_token(tokens["refresh_token"], token_type="refresh")["type"] == "refresh"
+
+    me = client.get("/api/auth/me", headers=_bearer(tokens["access_token"]))
+    assert me.status_code == 200
+    assert me.json()["username"] == "kari"
+
+
+def test_refresh_token_is_not_an_access_token(client):
+    tokens = _login(client)
+    assert client.get("/api/auth/me", headers=_bearer(tokens["refresh_token"])).status_code == 401
+    response = client.post("/api/auth/refresh", json={"refresh_token": tokens["access_token"]})
+    assert response.status_code == 401
+
+
+def test_refresh_issues_new_access_token(client):
+    tokens = _login(client)
+    response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+
+    access_token = response.json()["access_token"]
+    assert access_token != tokens["access_token"]
+    assert client.get("/api/auth/me", headers=_bearer(access_token)).status_code == 200
+
+
+def test_logout_revokes_both_tokens(client, db):
+    tokens = _login(client)
+    response = client.post(
+        "/api/auth/logout",
+        json={"refresh_token": tokens["refresh_token"]},
+        headers=_bearer(tokens["access_token"])
+    )
+    assert response.status_code == 200
+
+    assert client.get("/api/auth/me", headers=_bearer(tokens["access_token"])).status_code == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert db.query(models.RevokedToken).count() == 2
+
+    # Another instance picks the revocations up from the table
+    token_revocation.clear()
+    assert client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+
+def _fresh_instance():
+    """Forget this process's cached users, as on another instance or after a restart"""
+    auth_cache.clear()
+
+
+def test_refresh_refuses_disabled_user(client, db):
+    tokens = _login(client)
+    db.query(models.User).filter(models.User.username == "kari").update({"is_active": False})
+    db.commit()
+    _fresh_instance()
+
+    response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 400
+
+
+def test_refresh_refuses_deleted_user(client, db):
+    tokens = _login(client)
+    db.query(models.User).filter(models.User.username == "kari").delete()
+    db.commit()
+    _fresh_instance()
+
+    response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 401
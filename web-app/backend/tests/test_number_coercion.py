@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+import services
+
+MIXED = ["1 234,50", "12.5", "-3", "", None, "nan", "abc", " 7 ", "1,5e2", float("nan"), 4]
+
+
+def test_series_matches_safe_float():
+    series = pd.Series(MIXED, dtype=object)
+    expected = [services.safe_float(value) for value in MIXED]
+    result = services.safe_float_series(series)
+    assert result.dtype == np.float64
+    assert result.tolist() == expected
+
+
+def test_numeric_columns_are_passed_through():
+    series = pd.Series([1, 2, None], dtype="float64")
+    assert services.safe_float_series(series).tolist() == [1.0, 2.0, 0.0]
+    assert services.safe_float_series(pd.Series([3, 4])).tolist() == [3.0, 4.0]
+
+
+def test_summary_from_text_amounts():
+    df = pd.DataFrame({
+        "Sjåfør": ["1037", "1037"],
+        "Kontant": ["100,50", "1 000"],
+        "Kreditt": ["200", ""],
+        "Bomtur": ["10", "x"],
+        "Sub_Total": ["300,5", "1000"],
+        "Kreditt_Tips": ["5", None],
+    })
+    summary = services.calculate_shift_summary(df)
+    assert summary["total_kontant"] == 1100.5
+    assert summary["total_kreditt"] == 200.0
+    assert summary["total_bomtur"] == 10.0
+
+    salary = services.calculate_salary(df, 50.0)
+    assert salary["gross_salary"] == 1300.5
+    assert salary["tips"] == 5.0
@@ -0,0 +1,46 @@
+import os
+import pickle
+import stat
+
+import parse_cache
+from conftest import R174_DAT
+
+
+class _Planted:
+    def __reduce__(self):
+        return (os.system, ("touch planted",))
+
+
+def test_cache_dir_is_private():
+    assert parse_cache.PARSE_CACHE_ENABLED
+    assert stat.S_IMODE(os.stat(parse_cache.PARSE_CACHE_DIR).st_mode) & 0o077 == 0
+
+
+def test_shared_dir_is_refused(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    assert not parse_cache.private_dir(str(shared))
+    assert parse_cache.private_dir(str(tmp_path / "private"))
+
+
+def test_reupload_is_served_from_parquet():
+    with open(R174_DAT, "rb") as f:
+        digest = parse_cache.content_hash(f)
+        first, _, _ = parse_cache.parse_excel_file(f)
+        hits = parse_cache.cache_info()["hits"]
+        again, _, _ = parse_cache.parse_excel_file(f)
+
+    assert parse_cache.cache_info()["hits"] == hits + 1
+    assert os.path.exists(os.path.join(parse_cache.PARSE_CACHE_DIR, f"{digest}.parquet"))
+    assert again.equals(first)
+
+
+def test_planted_pickle_is_never_loaded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    digest = "0" * 64
+    with open(os.path.join(parse_cache.PARSE_CACHE_DIR, f"{digest}.pkl"), "wb") as f:
+        pickle.dump(_Planted(), f)
+
+    assert parse_cache.get(digest) is None
+    assert not (tmp_path / "planted").exists()
@@ -0,0 +1,57 @@
+import json
+import os
+
+import payroll
+import summaries
+from conftest import R174_DAT, VE3174_DAT, upload
+
+NOVEMBER = summaries.period_bounds("2025-11")
+
+
+def _fleet(client):
+    for name, code in (("A", "1037"), ("B", "1741")):
+        client.post("/api/drivers", json={"name": name, "driver_id": code})
+    upload(client, R174_DAT, "R174.dat")
+    upload(client, R174_DAT, "R174.dat")  # same file ingested again
+    upload(client, VE3174_DAT, "VE.dat")
+
+
+def test_plan_counts_reingested_shifts_once(client, db):
+    _fleet(client)
+    plan = payroll.plan_payroll(db, *NOVEMBER)
+
+    entries = {entry["driver_code"]: entry for entry in plan["entries"]}
+    assert set(entries) == {"1037", "1741"}
+    assert entries["1037"]["salary"]["row_count"] == 4
+    assert entries["1037"]["salary"]["net_salary"] == 29778.3
+    assert entries["1037"]["file_names"] == ["R174.dat"]
+    assert entries["1741"]["salary"]["net_salary"] == 16710.75
+    assert plan["unknown_drivers"] == ["1013", "1016", "1038"]
+
+
+def test_run_writes_reports_and_pdfs(client, db, tmp_path):
+    _fleet(client)
+    events = []
+    done = payroll.run_payroll(db, *NOVEMBER, pdf_dir=str(tmp_path), progress=events.append)
+
+    assert [event["event"] for event in events] == ["planned", "reports", "pdf", "pdf", "done"]
+    assert done["report_count"] == 2
+    assert done["pdf_count"] == 2
+    assert done["net_salary_total"] == round(29778.3 + 16710.75, 2)
+    assert all(os.path.exists(event["pdf_path"]) for event in events if event["event"] == "pdf")
+
+    # A second run skips drivers that already have a report for the period
+    again = payroll.plan_payroll(db, *NOVEMBER)
+    assert again["entries"] == []
+    assert len(again["skipped_existing"]) == 2
+
+
+def test_run_endpoint_streams_events(client):
+    _fleet(client)
+    response = client.post("/api/payroll/run", json={"period": "2025-11", "generate_pdfs": False})
+    assert response.status_code == 200
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[-1]["event"] == "done"
+    assert events[-1]["report_count"] == 2
+    assert events[-1]["pdf_count"] == 0
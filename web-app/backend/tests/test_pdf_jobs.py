@@ -0,0 +1,108 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import models
+import pdf_jobs
+from conftest import VE3174_DAT, upload
+
+
+def _wait(client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/pdf-jobs/{job_id}").json()
+        if job["status"] not in pdf_jobs.ACTIVE_STATUSES or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def report_id(client):
+    return upload(client, VE3174_DAT).json()["id"]
+
+
+@pytest.fixture
+def failing_renderer(monkeypatch):
+    def render(db, report_id, pdf_dir):
+        raise RuntimeError("disk full")
+    monkeypatch.setitem(pdf_jobs.RENDERERS, "shift", render)
+
+
+def _make_due(db, job_id):
+    db.query(models.PdfJob).filter(models.PdfJob.id == job_id).update(
+        {"run_after": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+
+
+def test_enqueue_poll_download(client, report_id):
+    response = client.post(f"/api/reports/shift/{report_id}/pdf-jobs")
+    assert response.status_code == 202
+    assert response.json()["status"] in pdf_jobs.ACTIVE_STATUSES
+
+    job = _wait(client, response.json()["id"])
+    assert job["status"] == "done"
+    assert job["attempts"] == 1
+
+    pdf = client.get(f"/api/pdf-jobs/{job['id']}/download")
+    assert pdf.status_code == 200
+    assert pdf.headers["content-type"] == "application/pdf"
+    assert pdf.content.startswith(b"%PDF")
+
+
+def test_enqueue_errors(client, report_id):
+    assert client.post("/api/reports/invoice/1/pdf-jobs").status_code == 404
+    assert client.post("/api/reports/salary/999/pdf-jobs").status_code == 404
+    assert client.get("/api/pdf-jobs/999").status_code == 404
+
+
+def test_unfinished_job_is_reused_and_not_downloadable(client, db, report_id):
+    job = pdf_jobs.enqueue(db, "shift", report_id)
+    assert pdf_jobs.enqueue(db, "shift", report_id).id == job.id
+    assert client.get(f"/api/pdf-jobs/{job.id}/download").status_code == 409
+
+
+def test_failed_render_is_retried_with_backoff(db, report_id, failing_renderer):
+    job_id = pdf_jobs.enqueue(db, "shift", report_id).id
+
+    assert pdf_jobs.claim(db) == job_id
+    job = pdf_jobs.run_job(db, job_id)
+    assert (job.status, job.attempts, job.error) == ("queued", 1, "disk full")
+    assert job.run_after > datetime.utcnow()
+    assert pdf_jobs.claim(db) is None  # not due yet
+
+    for attempt in range(2, pdf_jobs.PDF_JOB_MAX_ATTEMPTS + 1):
+        _make_due(db, job_id)
+        assert pdf_jobs.claim(db) == job_id
+        job = pdf_jobs.run_job(db, job_id)
+        assert job.attempts == attempt
+
+    assert job.status == "failed"
+    assert job.finished_at is not None
+    _make_due(db, job_id)
+    assert pdf_jobs.claim(db) is None
+
+
+def test_missing_report_fails_without_retry(db):
+    job_id = pdf_jobs.enqueue(db, "salary", 12345).id
+    assert pdf_jobs.claim(db) == job_id
+    job = pdf_jobs.run_job(db, job_id)
+    assert (job.status, job.attempts) == ("failed", 1)
+
+
+def test_lapsed_claim_is_claimed_again(db, report_id):
+    job_id = pdf_jobs.enqueue(db, "shift", report_id).id
+    assert pdf_jobs.claim(db) == job_id
+    assert pdf_jobs.claim(db) is None  # claim still held
+
+    _make_due(db, job_id)  # the worker holding it died
+    assert pdf_jobs.claim(db) == job_id
+    assert pdf_jobs.get_job(db, job_id).attempts == 2
+
+
+def test_metrics(client, db, report_id):
+    pdf_jobs.enqueue(db, "shift", report_id)
+    metrics = client.get("/api/metrics/pdf-jobs").json()
+    assert metrics["workers"] == pdf_jobs.PDF_JOB_WORKERS
+    assert metrics["jobs"]["queued"] + metrics["jobs"]["running"] + metrics["jobs"]["done"] == 1
@@ -0,0 +1,58 @@
+import crud
+import summaries
+from conftest import R174_DAT, VE3174_DAT, upload
+
+NOVEMBER = summaries.period_bounds("2025-11")
+
+
+def test_period_bounds():
+    start, end = NOVEMBER
+    assert (start.year, start.month, start.day) == (2025, 11, 1)
+    assert (end.year, end.month, end.day) == (2025, 12, 1)
+    assert summaries.period_label(start) == "November 2025"
+
+
+def test_salary_from_rows_matches_upload_path(client):
+    driver = client.post("/api/drivers", json={"name": "Test", "driver_id": "1037"}).json()
+    assert upload(client, R174_DAT).status_code == 200
+
+    salary = client.get("/api/salary/calculate", params={"driver_id": driver["id"], "period": "2025-11"}).json()
+    assert salary["row_count"] == 4
+    assert salary["gross_salary"] == 66174.0
+    assert salary["net_salary"] == 29778.3
+    assert salary["total_bomtur"] == 4000.0
+
+
+def test_reingested_file_is_counted_once(client, db):
+    driver = client.post("/api/drivers", json={"name": "Test", "driver_id": "1037"}).json()
+    first = upload(client, R174_DAT, "R174.dat").json()
+    second = upload(client, R174_DAT, "R174.dat").json()
+    upload(client, VE3174_DAT)
+
+    salary = client.get("/api/salary/calculate", params={"driver_id": driver["id"], "period": "2025-11"}).json()
+    assert salary["row_count"] == 4
+    assert salary["net_salary"] == 29778.3
+
+    # Each report still has all of its own rows
+    assert crud.get_shift_row_totals(db, report_id=first["id"])["row_count"] == 4
+    assert crud.get_shift_row_totals(db, report_id=second["id"])["row_count"] == 4
+    assert crud.get_shift_row_file_names(db, driver="1037", start=NOVEMBER[0], end=NOVEMBER[1]) == ["R174.dat"]
+
+
+def test_salary_report_from_rows(client):
+    driver = client.post("/api/drivers", json={"name": "Test", "driver_id": "1741"}).json()
+    upload(client, VE3174_DAT, "VE.dat")
+
+    response = client.post("/api/reports/salary/from-rows", json={"driver_id": driver["id"], "period": "2025-11"})
+    assert response.status_code == 200
+    report = response.json()
+    assert report["gross_salary"] == 37135.0
+    assert report["net_salary"] == 16710.75
+    assert report["file_names"] == ["VE.dat"]
+    assert report["report_period"] == "November 2025"
+
+
+def test_invalid_period_is_rejected(client):
+    driver = client.post("/api/drivers", json={"name": "Test", "driver_id": "1741"}).json()
+    response = client.get("/api/salary/calculate", params={"driver_id": driver["id"], "period": "bad"})
+    assert response.status_code == 400
@@ -0,0 +1,46 @@
+import pandas as pd
+
+import services
+import skiftl
+from conftest import R174_DAT, VE3174_DAT
+
+
+def test_driver_filter_uses_driver_column_not_skiftnr():
+    df = skiftl.parse_skiftl_file(VE3174_DAT)
+    assert list(df.columns[:3]) == ["Skiftnr", "Løyve", "Sjaafor"]
+
+    rows = services.filter_dataframe_by_driver(df, "1741")
+    assert len(rows) == 3
+    assert set(rows["Sjaafor"]) == {"1741"}
+
+
+def test_driver_filter_matches_whole_id():
+    df = skiftl.parse_skiftl_file(VE3174_DAT)
+    # "101" is a prefix of 1016 and 1013 but no driver's id
+    assert services.filter_dataframe_by_driver(df, "101").empty
+    assert len(services.filter_dataframe_by_driver(df, " 1016 ")) == 1
+
+
+def test_driver_filter_whole_number_floats():
+    df = pd.DataFrame({"Sjåfør": [1037.0, 1038.0, None], "Kontant": [1.0, 2.0, 3.0]})
+    assert services.filter_dataframe_by_driver(df, "1037")["Kontant"].tolist() == [1.0]
+
+
+def test_salary_report_from_skiftl_upload(client):
+    driver = client.post("/api/drivers", json={"name": "Test", "driver_id": "1037"}).json()
+    with open(R174_DAT, "rb") as f:
+        response = client.post(
+            "/api/reports/salary",
+            data={"driver_id": driver["id"], "report_period": "November 2025"},
+            files=[("files", ("R174.dat", f))]
+        )
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["gross_salary"] == 66174.0
+    assert report["net_salary"] == 29778.3
+    assert report["cash_amount"] == 405.0
+
+    rows = client.get(f"/api/reports/salary/{report['id']}/rows").json()
+    assert rows["total"] == 4
+    assert {row["Sjaafor"] for row in rows["rows"]} == {"1037"}
@@ -0,0 +1,57 @@
+import pandas as pd
+
+import crud
+import migrate_shift_rows
+import models
+import services
+from conftest import R174_DAT, upload
+
+
+def test_rows_from_frame_are_typed():
+    df = pd.DataFrame({
+        "Løyve": ["R174"], "Skiftnr": [12.0], "Sjåfør": [1037.0],
+        "Start_Dato": ["2025-11-01 08:00"], "Kontant": ["1 000,5"], "Kreditt": [None],
+    })
+    (row,) = services.shift_rows_from_frame(df)
+    assert (row["loyve"], row["skiftnr"], row["driver"]) == ("R174", "12", "1037")
+    assert row["start_dato"] == pd.Timestamp(2025, 11, 1, 8).to_pydatetime()
+    assert row["kontant"] == 1000.5
+    assert row["kreditt"] == 0.0
+    assert row["raw"]["Løyve"] == "R174"
+
+
+def test_upload_stores_shift_rows(client, db):
+    report = upload(client, R174_DAT).json()
+    rows = crud.get_shift_rows(db, report["id"])
+    assert [row.row_index for row in rows] == [0, 1, 2, 3]
+    assert {row.driver for row in rows} == {"1037"}
+    assert rows[0].skiftnr == "1268"
+    assert sum(row.kontant for row in rows) == 4405.0
+
+    page = client.get(f"/api/reports/shift/{report['id']}/rows", params={"offset": 1, "limit": 2}).json()
+    assert page["total"] == 4
+    assert [row["Skiftnr"] for row in page["rows"]] == [1269, 1270]
+
+
+def test_deleting_a_report_deletes_its_rows(client, db):
+    report = upload(client, R174_DAT).json()
+    assert client.delete(f"/api/reports/shift/{report['id']}").status_code == 200
+    assert db.query(models.ShiftRow).count() == 0
+
+
+def test_migrate_script_backfills_legacy_reports(db):
+    legacy = models.ShiftReport(file_name="legacy.dat", data={"rows": [
+        {"Løyve": "R174", "Skiftnr": "1", "Sjåfør": "1037", "Start_Dato": "2025-11-01 08:00", "Kontant": "100,5"},
+        {"Løyve": "R174", "Skiftnr": "2", "Sjåfør": "1037", "Start_Dato": "2025-11-02 08:00", "Kontant": "50"},
+    ]})
+    db.add(legacy)
+    db.commit()
+
+    assert migrate_shift_rows.migrate(batch_size=1)
+    db.expire_all()
+    assert legacy.data == {"columns": ["Løyve", "Skiftnr", "Sjåfør", "Start_Dato", "Kontant"], "row_count": 2}
+    assert crud.get_shift_row_totals(db, report_id=legacy.id)["kontant"] == 150.5
+
+    # A second run finds nothing left to move
+    assert migrate_shift_rows.migrate()
+    assert db.query(models.ShiftRow).count() == 2
@@ -0,0 +1,65 @@
+import io
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import parse_cache
+import skiftl
+from conftest import R174_DAT, VE3174_DAT
+
+
+def test_parse_file():
+    df = skiftl.parse_skiftl_file(R174_DAT)
+    assert list(df.columns) == skiftl.SKIFTL_COLUMNS
+    assert len(df) == 4
+
+    first = df.iloc[0]
+    assert first["Skiftnr"] == 1268
+    assert first["Løyve"] == "R174"
+    assert first["Sjaafor"] == "1037"
+    assert first["Total_Kreditt"] == 17613.0
+    assert first["Kontant_Start"] == 443837.48
+    assert first["Start_Dato Tid"] == pd.Timestamp(2025, 11, 1, 22, 2)
+    assert first["Orgnummer"] == "922900817"
+
+
+def test_small_chunks_give_the_same_records():
+    with open(VE3174_DAT, "rb") as f:
+        data = f.read()
+    whole = list(skiftl.iter_skiftl_records(data))
+    chunked = list(skiftl.iter_skiftl_records(io.BytesIO(data), chunk_size=7))
+    assert chunked == whole
+    assert len(whole) == 6
+    assert whole[0]["Slutt_Dato Tid"] == datetime(2025, 11, 3, 21, 50)
+
+
+def test_count_records_across_chunk_boundaries():
+    with open(VE3174_DAT, "rb") as f:
+        data = f.read()
+    assert skiftl.count_records(data) == 6
+    assert skiftl.count_records(io.BytesIO(data), chunk_size=3) == 6
+
+
+def test_parse_many_files():
+    df = skiftl.parse_skiftl_files([R174_DAT, VE3174_DAT])
+    assert len(df) == 10
+    assert df["Løyve"].value_counts().to_dict() == {"VE3174": 6, "R174": 4}
+
+
+def test_detection():
+    with open(R174_DAT, "rb") as f:
+        assert skiftl.is_skiftl(f.read(64))
+    assert not skiftl.is_skiftl(b"Skiftnr;Sjaafor;Kontant\n")
+
+
+def test_upload_parser_recognizes_skiftl():
+    with open(R174_DAT, "rb") as f:
+        df, _, _ = parse_cache.parse_excel_file(f)
+    assert list(df.columns) == skiftl.SKIFTL_COLUMNS
+    assert len(df) == 4
+
+
+def test_short_record_is_rejected():
+    with pytest.raises(ValueError, match="fields"):
+        skiftl.parse_record(["", "^31", "R174"])
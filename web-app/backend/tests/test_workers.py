@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import pytest
+
+import workers
+
+
+def test_cancelled_queued_job_frees_its_slot():
+    pool = workers.BlockingPool(workers=1, queue_limit=2, thread_name_prefix="test")
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(release.wait, 5))
+        while pool.metrics()["running"] == 0:
+            await asyncio.sleep(0.01)
+
+        waiting = asyncio.ensure_future(pool.run(sum, [1, 2]))
+        await asyncio.sleep(0)
+        assert pool.metrics()["queued"] == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert pool.metrics()["queued"] == 0
+
+        release.set()
+        return await running
+
+    try:
+        assert asyncio.run(scenario()) is True
+    finally:
+        release.set()
+
+    metrics = pool.metrics()
+    assert (metrics["queued"], metrics["running"], metrics["completed"]) == (0, 0, 1)
+
+
+def test_full_queue_rejects_jobs():
+    pool = workers.BlockingPool(workers=1, queue_limit=1, thread_name_prefix="test")
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(release.wait, 5))
+        while pool.metrics()["running"] == 0:
+            await asyncio.sleep(0.01)
+
+        waiting = asyncio.ensure_future(pool.run(sum, [1, 2]))
+        await asyncio.sleep(0)
+        with pytest.raises(workers.PoolBusyError):
+            await pool.run(sum, [3])
+
+        release.set()
+        return await running, await waiting
+
+    try:
+        assert asyncio.run(scenario()) == (True, 3)
+    finally:
+        release.set()
+    assert pool.metrics()["rejected"] == 1
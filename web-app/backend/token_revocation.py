@@ -0,0 +1,90 @@
+"""
+Revoked token ids (jti)
+Logout stores the ids of the tokens it revokes in the revoked_tokens table
+and in an in-process set. Checks read only the set, which is brought up to
+date from the table every TOKEN_REVOCATION_SYNC_SECONDS, so a token revoked
+on another instance is refused here within that time. Only tokens that
+have not expired yet are kept; expired rows are deleted on each revoke.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+import models
+
+TOKEN_REVOCATION_SYNC_SECONDS = float(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", "30"))
+
+_lock = threading.Lock()
+_revoked: Dict[str, datetime] = {}  # jti -> expires_at (UTC)
+_synced_at: Optional[float] = None  # monotonic time of the last sync
+_synced_since: Optional[datetime] = None  # revoked_at the last sync read from
+_stats = {"checks": 0, "refused": 0, "syncs": 0, "revoked": 0}
+
+
+def _prune(now: datetime):
+    for jti in [jti for jti, expires_at in _revoked.items() if expires_at <= now]:
+        del _revoked[jti]
+
+
+def sync(db: Session):
+    """Load revocations made since the last sync (all of them the first time)"""
+    global _synced_at, _synced_since
+    now = datetime.utcnow()
+    query = db.query(models.RevokedToken.jti, models.RevokedToken.expires_at) \
+        .filter(models.RevokedToken.expires_at > now)
+    if _synced_since is not None:
+        # Overlap by one interval so rows committed late on other instances are not missed
+        query = query.filter(models.RevokedToken.revoked_at >= _synced_since)
+    rows = query.all()
+    with _lock:
+        _revoked.update({jti: expires_at for jti, expires_at in rows})
+        _prune(now)
+        _synced_at = time.monotonic()
+        _synced_since = now - timedelta(seconds=max(TOKEN_REVOCATION_SYNC_SECONDS, 1))
+        _stats["syncs"] += 1
+
+
+def is_revoked(db: Session, jti: str) -> bool:
+    """Whether a token id was revoked; queries only when a sync is due"""
+    if _synced_at is None or time.monotonic() - _synced_at >= TOKEN_REVOCATION_SYNC_SECONDS:
+        sync(db)
+    with _lock:
+        _stats["checks"] += 1
+        if jti in _revoked:
+            _stats["refused"] += 1
+            return True
+    return False
+
+
+def revoke(db: Session, jti: str, expires_at: datetime, user_id: Optional[int] = None) -> bool:
+    """Persist a revocation and apply it in this process right away
+
+    Returns False for a token that has already expired.
+    """
+    now = datetime.utcnow()
+    if expires_at <= now:
+        return False  # refused anyway
+    db.query(models.RevokedToken).filter(models.RevokedToken.expires_at <= now) \
+        .delete(synchronize_session=False)
+    db.merge(models.RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at, revoked_at=now))
+    db.commit()
+    with _lock:
+        _revoked[jti] = expires_at
+        _stats["revoked"] += 1
+    return True
+
+
+def clear():
+    global _synced_at, _synced_since
+    with _lock:
+        _revoked.clear()
+        _synced_at = _synced_since = None
+
+
+def info() -> Dict[str, Any]:
+    with _lock:
+        return dict(_stats, size=len(_revoked), sync_seconds=TOKEN_REVOCATION_SYNC_SECONDS)
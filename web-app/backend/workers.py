@@ -0,0 +1,150 @@
+"""
+Bounded worker pool for blocking work in async endpoints
+File saving, pandas parsing, PDF rendering and the SQLAlchemy commits that
+go with them are run on a small dedicated thread pool instead of on the
+event loop. The pool has its own threads, so large uploads queue here
+while small CRUD requests keep using Starlette's threadpool.
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import os
+import threading
+import time
+
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "4"))
+BLOCKING_QUEUE_LIMIT = int(os.getenv("BLOCKING_QUEUE_LIMIT", "32"))
+
+
+class PoolBusyError(Exception):
+    """Raised when the queue is full and a job is rejected"""
+
+
+class BlockingPool:
+    """Thread pool with a concurrency limit, a queue limit and counters"""
+
+    def __init__(
+        self,
+        workers: int = BLOCKING_WORKERS,
+        queue_limit: int = BLOCKING_QUEUE_LIMIT,
+        thread_name_prefix: str = "blocking"
+    ):
+        self.workers = max(1, workers)
+        self.thread_name_prefix = thread_name_prefix
+        self.queue_limit = queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_queued = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.thread_name_prefix)
+        return self._executor
+
+    def _call(self, submitted: float, func: Callable[..., Any], args, kwargs) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.wait_seconds += started - submitted
+        ok = False
+        try:
+            result = func(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.run_seconds += time.perf_counter() - started
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) on the pool and await its result"""
+        with self._lock:
+            if self.queue_limit and self.queued >= self.queue_limit:
+                self.rejected += 1
+                raise PoolBusyError(f"Too many queued jobs ({self.queued})")
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        try:
+            job = self.executor.submit(self._call, time.perf_counter(), func, args, kwargs)
+        except BaseException:
+            self._dequeue()
+            raise
+        job.add_done_callback(self._dequeue_cancelled)
+        return await asyncio.wrap_future(job)
+
+    def _dequeue(self):
+        with self._lock:
+            self.queued -= 1
+
+    def _dequeue_cancelled(self, job: Future):
+        # A job cancelled while still waiting never reaches _call, which is
+        # where queued jobs are otherwise moved over to running
+        if job.cancelled():
+            self._dequeue()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "max_queued": self.max_queued,
+                "avg_wait_seconds": round(self.wait_seconds / finished, 4) if finished else 0.0,
+                "avg_run_seconds": round(self.run_seconds / finished, 4) if finished else 0.0,
+            }
+
+
+class LatencyStats:
+    """Percentiles over the most recent `window` durations"""
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self.count
+        if not samples:
+            return {"count": count, "p50_ms": None, "p99_ms": None, "max_ms": None}
+
+        def pct(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 2)
+
+        return {"count": count, "p50_ms": pct(0.50), "p99_ms": pct(0.99), "max_ms": round(samples[-1] * 1000, 2)}
+
+
+blocking_pool = BlockingPool()
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run blocking work on the shared pool"""
+    return await blocking_pool.run(func, *args, **kwargs)
@@ -21,13 +21,44 @@ apiClient.interceptors.request.use(
   (error) => Promise.reject(error)
 );
 
+// On a 401, trade the refresh token for a new access token once and retry
+let refreshing = null;
+apiClient.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config;
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (error.response?.status !== 401 || !refreshToken || original._retried
+        || original.url === '/api/auth/refresh') {
+      return Promise.reject(error);
+    }
+    original._retried = true;
+    try {
+      refreshing = refreshing || apiClient.post('/api/auth/refresh', { refresh_token: refreshToken });
+      const { data } = await refreshing;
+      localStorage.setItem('token', data.access_token);
+    } catch (refreshError) {
+      localStorage.removeItem('token');
+      localStorage.removeItem('refresh_token');
+      return Promise.reject(error);
+    } finally {
+      refreshing = null;
+    }
+    return apiClient(original);
+  }
+);
+
 // API methods
 export const api = {
   // Authentication
   login: (username, password) => apiClient.post('/api/auth/login', { username, password }),
   register: (userData) => apiClient.post('/api/auth/register', userData),
   getCurrentUser: () => apiClient.get('/api/auth/me'),
-  logout: () => apiClient.post('/api/auth/logout'),
+  logout: (accessToken, refreshToken) => apiClient.post(
+    '/api/auth/logout',
+    { refresh_token: refreshToken },
+    { headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : {} }
+  ),
 
   // Companies
   getCompanies: () => apiClient.get('/api/companies'),
@@ -60,6 +91,7 @@ export const api = {
   // Shift Reports
   getShiftReports: (driverId) => apiClient.get('/api/reports/shift', { params: { driver_id: driverId } }),
   getShiftReport: (id) => apiClient.get(`/api/reports/shift/${id}`),
+  getShiftReportRows: (id, params) => apiClient.get(`/api/reports/shift/${id}/rows`, { params }),
   createShiftReport: (formData) => apiClient.post('/api/reports/shift', formData, {
     headers: { 'Content-Type': 'multipart/form-data' },
   }),
@@ -70,12 +102,18 @@ export const api = {
   // Salary Reports
   getSalaryReports: (driverId) => apiClient.get('/api/reports/salary', { params: { driver_id: driverId } }),
   getSalaryReport: (id) => apiClient.get(`/api/reports/salary/${id}`),
+  getSalaryReportRows: (id, params) => apiClient.get(`/api/reports/salary/${id}/rows`, { params }),
   createSalaryReport: (formData) => apiClient.post('/api/reports/salary', formData, {
     headers: { 'Content-Type': 'multipart/form-data' },
   }),
   deleteSalaryReport: (id) => apiClient.delete(`/api/reports/salary/${id}`),
   generateSalaryPDF: (id) => apiClient.post(`/api/reports/salary/${id}/pdf`, {}, { responseType: 'blob' }),
 
+  // Background PDF jobs: queue, poll getPDFJob until status is 'done', then download
+  queuePDFJob: (reportType, id) => apiClient.post(`/api/reports/${reportType}/${id}/pdf-jobs`),
+  getPDFJob: (jobId) => apiClient.get(`/api/pdf-jobs/${jobId}`),
+  downloadPDFJob: (jobId) => apiClient.get(`/api/pdf-jobs/${jobId}/download`, { responseType: 'blob' }),
+
   // File Upload
   parseFile: (file) => {
     const formData = new FormData();
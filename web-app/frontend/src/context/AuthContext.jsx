@@ -20,6 +20,7 @@ export function AuthProvider({ children }) {
       } catch (error) {
         console.error('Auth check failed:', error);
         localStorage.removeItem('token');
+        localStorage.removeItem('refresh_token');
       }
     }
     setLoading(false);
@@ -29,6 +30,7 @@ export function AuthProvider({ children }) {
     try {
       const { data } = await api.login(username, password);
       localStorage.setItem('token', data.access_token);
+      localStorage.setItem('refresh_token', data.refresh_token);
       const userResponse = await api.getCurrentUser();
       setUser(userResponse.data);
       return { success: true };
@@ -55,9 +57,13 @@ export function AuthProvider({ children }) {
   };
 
   const logout = () => {
+    const token = localStorage.getItem('token');
+    const refreshToken = localStorage.getItem('refresh_token');
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     setUser(null);
-    api.logout();
+    // Revoke both tokens server-side
+    api.logout(token, refreshToken).catch(() => {});
   };
 
   const value = {